@@ -1,13 +1,17 @@
 
 import json
-from flask import Flask,render_template,request,abort, send_file
+from flask import Flask,render_template,request,abort, send_file, jsonify, url_for
 from housing.config.configuration import Configuartion
 from housing.pipeline.pipeline import Pipeline
-from housing.entity.housing_predictor import HousingData, HousingPredictor
+from housing.pipeline.training_worker import get_training_job_queue, get_config_dataset_key, spawn_training_worker
+from housing.entity.housing_predictor import HousingData, HousingPredictor, HousingBatchData
+from housing.entity.micro_batcher import MicroBatcher
+from housing.entity.traffic_profiler import TrafficProfiler
+from housing.pipeline.traffic_drift import TrafficDriftMonitor
 from housing.logger import get_log_dataframe, logging
 from housing.exception import HousingException
 import sys,os
-from housing.constant import CONFIG_DIR, get_current_time_stamp
+from housing.constant import CONFIG_DIR
 from housing.util.util import read_yaml_file, write_yaml_file
 
 ROOT_DIR = os.getcwd()
@@ -20,6 +24,17 @@ PIPELINE_DIR = os.path.join(ROOT_DIR, PIPELINE_FOLDER_NAME)
 MODEL_DIR = os.path.join(ROOT_DIR, SAVED_MODELS_DIR_NAME)
 HOUSING_DATA_KEY = "housing_data"
 MEDIAN_HOUSING_VALUE_KEY = "median_house_value"
+VALIDATION_ERRORS_KEY = "validation_errors"
+
+PREDICTION_CONFIG = Configuartion().get_prediction_config()
+PREDICTION_BATCHER = MicroBatcher(predict_fn=HousingPredictor(model_dir=MODEL_DIR).predict,
+                                max_batch_size=PREDICTION_CONFIG.micro_batch_max_size,
+                                max_wait_ms=PREDICTION_CONFIG.micro_batch_max_wait_ms)
+# feature values of served requests are sketched off the request path and compared with the training data
+TRAFFIC_PROFILER = TrafficProfiler.from_schema_file(profile_dir=PREDICTION_CONFIG.traffic_profile_dir,
+                                schema_file_path=PREDICTION_CONFIG.schema_file_path,
+                                window_seconds=PREDICTION_CONFIG.traffic_profile_window_seconds,
+                                flush_interval=PREDICTION_CONFIG.traffic_profile_flush_interval)
 
 app=Flask(__name__)
 
@@ -63,11 +78,35 @@ def render_artifact_dir(req_path):
     }
     return render_template('files.html',result=result)
 
+EXPERIMENT_HISTORY_PAGE_SIZE = 20
+
+
 @app.route('/view_experiment_hist', methods=['GET', 'POST'])
 def view_experiment_history():
-    experiment_df = Pipeline.get_experiments_status()
+    page = max(request.args.get("page", 1, type=int), 1)
+    page_size = min(max(request.args.get("page_size", EXPERIMENT_HISTORY_PAGE_SIZE, type=int), 1), 500)
+    filters = {
+        "status": request.args.get("status") or None,
+        "min_accuracy": request.args.get("min_accuracy", type=float),
+        "order_by": request.args.get("order_by", "start_time")
+    }
+    try:
+        experiment_df = Pipeline.get_experiments_status(limit=page_size, offset=(page-1)*page_size, **filters)
+    except Exception as e:
+        logging.exception(e)
+        abort(400)
+    query_args = {key: value for key, value in filters.items() if value is not None}
+    stage_profile_df, model_profile_df = Pipeline.get_experiment_profiles(
+        experiment_ids=experiment_df["experiment_id"].tolist())
     context = {
-        "experiment": experiment_df.to_html(classes='table table-striped col-12')
+        "experiment": experiment_df.to_html(classes='table table-striped col-12'),
+        "stage_profile": stage_profile_df.to_html(classes='table table-striped col-12', index=False),
+        "model_profile": model_profile_df.to_html(classes='table table-striped col-12', index=False),
+        "page": page,
+        "previous_page_url": url_for("view_experiment_history", page=page-1, page_size=page_size, **query_args)
+        if page > 1 else None,
+        "next_page_url": url_for("view_experiment_history", page=page+1, page_size=page_size, **query_args)
+        if len(experiment_df) == page_size else None
     }
     return render_template('experiment_history.html', context=context)
 
@@ -75,14 +114,18 @@ def view_experiment_history():
 @app.route('/train',methods=['GET','POST'])
 def train():
     message=""
-    pipeline = Pipeline(config=Configuartion(current_time_stamp=get_current_time_stamp()))
-    if not pipeline.experiment.running_status:
-        message = "Training started"
-        pipeline.start()
+    resume = request.args.get("resume","false").lower() == "true"
+    # training runs in separate worker processes, the web worker only queues the run
+    config = Configuartion()
+    job_queue = get_training_job_queue(config)
+    job, needs_worker = job_queue.enqueue(dataset_key=get_config_dataset_key(config),resume=resume)
+    if needs_worker:
+        spawn_training_worker()
+        message = f"Training {'resume' if job.resume else 'run'} queued as job {job.job_id}"
     else:
-        message="Training is already in progress"
+        message = f"Training is already {job.status} as job {job.job_id}"
     context = {
-            "experiment": pipeline.get_experiments_status().to_html(classes='table table-striped col-12'),
+            "experiment": Pipeline.get_experiments_status().to_html(classes='table table-striped col-12'),
             "message": message
                 }
     return render_template('train.html',context=context)            
@@ -90,12 +133,21 @@ def train():
 
 
 
+@app.route('/api/v1/train/jobs/<job_id>',methods=['GET'])
+def get_training_job(job_id):
+    job = get_training_job_queue().get_job(job_id)
+    if job is None:
+        abort(404)
+    return jsonify(job._asdict())
+
+
 @app.route("/predict",methods=['GET','POST'])
 def predict():
     try:
         context = {
             HOUSING_DATA_KEY:None,
-            MEDIAN_HOUSING_VALUE_KEY:None
+            MEDIAN_HOUSING_VALUE_KEY:None,
+            VALIDATION_ERRORS_KEY:None
                     }
         if request.method== 'POST':
             longitude = float(request.form['longitude'])
@@ -119,8 +171,17 @@ def predict():
                                     ocean_proximity=ocean_proximity)
             
             housing_df =housing_data.get_housing_input_dataframe()
-            housing_predictor = HousingPredictor(model_dir=MODEL_DIR)
-            median_housing_value = housing_predictor.predict(X=housing_df)
+            # form rows are checked against the schema like api rows before they reach the shared
+            # batcher, whose batch would otherwise fail for every request it was merged with
+            housing_batch_data = HousingBatchData(schema_file_path=PREDICTION_CONFIG.schema_file_path,
+                                                max_batch_size=PREDICTION_CONFIG.max_batch_size)
+            housing_df,errors = housing_batch_data.validate_input_dataframe(housing_df)
+            if len(errors) > 0:
+                context[VALIDATION_ERRORS_KEY] = errors
+                return render_template("predict.html",context=context)
+
+            TRAFFIC_PROFILER.observe(housing_df)
+            median_housing_value = PREDICTION_BATCHER.predict(X=housing_df)
             context = {
                 HOUSING_DATA_KEY: housing_data.get_housing_data_as_dict(),
                 MEDIAN_HOUSING_VALUE_KEY:median_housing_value
@@ -130,6 +191,83 @@ def predict():
     except Exception as e:
        return str(e)
 
+@app.route("/api/v1/predict",methods=['POST'])
+def predict_single():
+    try:
+        payload = request.get_json(force=True,silent=True)
+        if not isinstance(payload,dict):
+            return jsonify({"error":"Request body must be a json object of feature values"}),400
+
+        housing_batch_data = HousingBatchData(schema_file_path=PREDICTION_CONFIG.schema_file_path,
+                                            max_batch_size=PREDICTION_CONFIG.max_batch_size)
+        housing_df = housing_batch_data.get_housing_input_dataframe_from_json([payload])
+        housing_df,errors = housing_batch_data.validate_input_dataframe(housing_df)
+        if len(errors) > 0:
+            return jsonify({"error":"Input validation failed","details":errors}),400
+
+        TRAFFIC_PROFILER.observe(housing_df)
+        median_housing_value = PREDICTION_BATCHER.predict(X=housing_df)
+        return jsonify({MEDIAN_HOUSING_VALUE_KEY:float(median_housing_value[0])})
+    except Exception as e:
+        logging.exception(e)
+        return jsonify({"error":str(e)}),500
+
+@app.route("/api/v1/predict/stats",methods=['GET'])
+def predict_stats():
+    return jsonify(PREDICTION_BATCHER.get_stats())
+
+@app.route("/api/v1/predict/drift",methods=['GET'])
+def predict_drift():
+    try:
+        # reports are written by the housing-traffic-drift job, which merges the profiles of all
+        # serving processes, the web tier only serves the latest one
+        report_file_path = TrafficDriftMonitor.get_latest_report_file_path(
+            PREDICTION_CONFIG.traffic_drift_report_dir)
+        if report_file_path is None:
+            return jsonify({"error":"No traffic drift report saved yet, run housing-traffic-drift"}),404
+        with open(report_file_path) as report_file:
+            return jsonify(json.load(report_file))
+    except Exception as e:
+        logging.exception(e)
+        return jsonify({"error":str(e)}),500
+
+@app.route("/api/v1/predict/batch",methods=['POST'])
+def predict_batch():
+    try:
+        housing_batch_data = HousingBatchData(schema_file_path=PREDICTION_CONFIG.schema_file_path,
+                                            max_batch_size=PREDICTION_CONFIG.max_batch_size)
+        if 'file' in request.files:
+            housing_df = housing_batch_data.get_housing_input_dataframe_from_csv(request.files['file'])
+            batch_size = len(housing_df)
+        else:
+            payload = request.get_json(force=True,silent=True)
+            if payload is None:
+                return jsonify({"error":"Request body must be json or a csv file upload"}),400
+            errors = housing_batch_data.get_payload_errors(payload)
+            if len(errors) > 0:
+                return jsonify({"error":"Input validation failed","details":errors}),400
+            batch_size = housing_batch_data.get_batch_size(payload)
+            housing_df = None
+
+        if batch_size > housing_batch_data.max_batch_size:
+            return jsonify({"error":f"Batch size exceeds limit of {housing_batch_data.max_batch_size} rows"}),413
+        if batch_size == 0:
+            return jsonify([])
+
+        if housing_df is None:
+            housing_df = housing_batch_data.get_housing_input_dataframe_from_json(payload)
+        housing_df,errors = housing_batch_data.validate_input_dataframe(housing_df)
+        if len(errors) > 0:
+            return jsonify({"error":"Input validation failed","details":errors}),400
+
+        TRAFFIC_PROFILER.observe(housing_df)
+        housing_predictor = HousingPredictor(model_dir=MODEL_DIR)
+        median_housing_value = housing_predictor.predict(X=housing_df)
+        return jsonify(median_housing_value.tolist())
+    except Exception as e:
+        logging.exception(e)
+        return jsonify({"error":str(e)}),500
+
 @app.route("/update_model_config",methods=['GET','POST'])
 def update_model_config():
     try:
@@ -6,14 +6,23 @@ import numpy as np
 from housing.logger import logging
 from sklearn.model_selection import StratifiedShuffleSplit
 import tarfile
+import contextlib
+import hashlib
+import shutil
 from six.moves import urllib
 import pandas as pd
+from housing.util.util import get_file_hash, read_yaml_file, write_yaml_file, save_dataframe,\
+    cast_dataframe_to_schema, DataFrameChunkWriter
+from housing.constant import DATASET_SCHEMA_COLUMNS_KEY
+
+DOWNLOAD_CHUNK_SIZE = 1024*1024
 
 class DataIngestion:
     def __init__(self,data_ingestion_config:DataIngestionConfig):
         try:
             logging.info(f"{'='*20}Data Ingestion log started.{'='*20}")
             self.data_ingestion_config = data_ingestion_config
+            self.dataset_metadata = None
             
         except Exception as e:
             raise HousingException(e,sys) from e
@@ -22,6 +31,9 @@ class DataIngestion:
         try:
             tgz_file_path = self.download_housing_data()
 
+            if self.data_ingestion_config.streaming_ingestion:
+                return self.split_data_from_tgz_stream(tgz_file_path=tgz_file_path)
+
             self.extract_tgz_file(tgz_file_path= tgz_file_path)
 
             return self.split_data_as_train_test()
@@ -29,25 +41,123 @@ class DataIngestion:
         except Exception as e:
             raise HousingException(e,sys) from e
     
-    def download_housing_data(self)->str:
+    def get_download_cache_file_paths(self,download_url:str):
+        """
+        Returns (dataset file path, metadata file path) of download_url inside the download cache
+        """
         try:
-            #extraction remote url to download dataset
+            url_key = hashlib.sha256(download_url.encode("utf-8")).hexdigest()[:16]
+            cache_dir = os.path.join(self.data_ingestion_config.download_cache_dir,url_key)
+            return os.path.join(cache_dir,os.path.basename(download_url)),os.path.join(cache_dir,"metadata.yaml")
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    @staticmethod
+    def is_same_remote_file(metadata:dict,response_headers)->bool:
+        etag = response_headers.get("ETag")
+        if etag is not None:
+            return etag == metadata.get("etag")
+        last_modified = response_headers.get("Last-Modified")
+        content_length = response_headers.get("Content-Length")
+        return last_modified is not None and last_modified == metadata.get("last_modified") and \
+            content_length is not None and int(content_length) == metadata.get("size")
+
+    def fetch_dataset(self)->dict:
+        """
+        Makes sure the dataset of dataset_download_url is in the download cache and returns its metadata.
+        Cached files are revalidated with a conditional request (ETag/Last-Modified), so unchanged data
+        is not transferred again. Interrupted downloads are resumed with a range request.
+        file:// urls are supported through their Last-Modified and Content-Length headers.
+        """
+        try:
+            if self.dataset_metadata is not None:
+                return self.dataset_metadata
+
             download_url=self.data_ingestion_config.dataset_download_url
+            cached_file_path,metadata_file_path = self.get_download_cache_file_paths(download_url)
+            partial_file_path = f"{cached_file_path}.part"
+            os.makedirs(os.path.dirname(cached_file_path),exist_ok=True)
+
+            metadata = dict()
+            if os.path.exists(metadata_file_path):
+                metadata = read_yaml_file(file_path=metadata_file_path) or dict()
+            if not os.path.exists(cached_file_path) or metadata.get("size") != os.path.getsize(cached_file_path):
+                # only the state of an interrupted download is still usable
+                metadata = {"partial":metadata.get("partial",dict())}
+
+            headers = dict()
+            if metadata.get("etag") is not None:
+                headers["If-None-Match"] = metadata["etag"]
+            if metadata.get("last_modified") is not None:
+                headers["If-Modified-Since"] = metadata["last_modified"]
+            partial_metadata = metadata.get("partial",dict())
+            partial_size = os.path.getsize(partial_file_path) if os.path.exists(partial_file_path) else 0
+            partial_validator = partial_metadata.get("etag") or partial_metadata.get("last_modified")
+            if partial_size > 0 and partial_validator is not None:
+                headers["Range"] = f"bytes={partial_size}-"
+                headers["If-Range"] = partial_validator
+
+            logging.info(f"Requesting :[{download_url}] with headers:{headers}")
+            try:
+                response = urllib.request.urlopen(urllib.request.Request(download_url,headers=headers))
+            except urllib.error.HTTPError as e:
+                if e.code == 304:
+                    logging.info(f"Dataset not modified, using cached file:[{cached_file_path}]")
+                    self.dataset_metadata = metadata
+                    return metadata
+                if e.code == 416 and os.path.exists(partial_file_path):
+                    os.remove(partial_file_path)
+                    return self.fetch_dataset()
+                raise e
+
+            with response:
+                status = response.getcode() or 200
+                if status == 200 and "sha256" in metadata and \
+                    DataIngestion.is_same_remote_file(metadata,response.headers):
+                    logging.info(f"Dataset unchanged, using cached file:[{cached_file_path}]")
+                    self.dataset_metadata = metadata
+                    return metadata
+
+                metadata["partial"] = {"etag":response.headers.get("ETag"),
+                                       "last_modified":response.headers.get("Last-Modified")}
+                write_yaml_file(file_path=metadata_file_path,data=metadata)
+
+                file_mode = "ab" if status == 206 else "wb"
+                logging.info(f"Downloading file from :[{download_url}] into :[{partial_file_path}] "
+                             f"resuming at byte:[{partial_size if status == 206 else 0}]")
+                with open(partial_file_path,file_mode) as partial_file:
+                    shutil.copyfileobj(response,partial_file,DOWNLOAD_CHUNK_SIZE)
+
+            os.replace(partial_file_path,cached_file_path)
+            metadata = {"url":download_url,
+                        "etag":metadata["partial"]["etag"],
+                        "last_modified":metadata["partial"]["last_modified"],
+                        "size":os.path.getsize(cached_file_path),
+                        "sha256":get_file_hash(cached_file_path),
+                        "file_path":cached_file_path}
+            write_yaml_file(file_path=metadata_file_path,data=metadata)
+            logging.info(f"File[{cached_file_path}] downloaded successfully, metadata:{metadata}")
+            self.dataset_metadata = metadata
+            return metadata
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def download_housing_data(self)->str:
+        try:
+            metadata = self.fetch_dataset()
 
             #folder location to download file
             tgz_download_dir=self.data_ingestion_config.tgz_download_dir
-            
-            if os.path.exists(tgz_download_dir):
-                os.remove(tgz_download_dir)
-
             os.makedirs(tgz_download_dir,exist_ok=True)
 
-            housing_file_name=os.path.basename(download_url)
-
-            tgz_file_path = os.path.join(tgz_download_dir,housing_file_name)
-            logging.info(f"Downloading file from :[{download_url}] into :[{tgz_file_path}]")
-            urllib.request.urlretrieve(download_url,tgz_file_path)
-            logging.info(f"File[{tgz_file_path}] downloaded successfully")
+            tgz_file_path = os.path.join(tgz_download_dir,os.path.basename(metadata["file_path"]))
+            if os.path.exists(tgz_file_path):
+                os.remove(tgz_file_path)
+            logging.info(f"Linking cached file :[{metadata['file_path']}] into :[{tgz_file_path}]")
+            try:
+                os.link(metadata["file_path"],tgz_file_path)
+            except OSError:
+                shutil.copy(metadata["file_path"],tgz_file_path)
             return tgz_file_path
 
         except Exception as e:
@@ -91,6 +201,31 @@ class DataIngestion:
         except Exception as e:
             raise HousingException(e,sys) from e
 
+    def get_ingested_file_paths(self,file_name:str):
+        """
+        Returns train and test file path of file_name in the configured ingested file format
+        """
+        try:
+            file_name = f"{os.path.splitext(file_name)[0]}.{self.data_ingestion_config.ingested_file_format}"
+            train_file_path = os.path.join(self.data_ingestion_config.ingested_train_dir,file_name)
+            test_file_path = os.path.join(self.data_ingestion_config.ingested_test_dir,file_name)
+            return train_file_path,test_file_path
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def save_ingested_dataframe(self,file_path:str,dataframe:pd.DataFrame):
+        """
+        Saves dataframe with schema dtypes in the ingested file format and optionally as csv
+        """
+        try:
+            dataset_schema = read_yaml_file(file_path=self.data_ingestion_config.schema_file_path)
+            dataframe = cast_dataframe_to_schema(dataframe,dataset_schema[DATASET_SCHEMA_COLUMNS_KEY])
+            save_dataframe(file_path=file_path,dataframe=dataframe)
+            if self.data_ingestion_config.export_csv and not file_path.endswith(".csv"):
+                save_dataframe(file_path=f"{os.path.splitext(file_path)[0]}.csv",dataframe=dataframe)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
     def split_data_as_train_test(self)->DataIngestionArtifact:
         try:
             raw_data_dir = self.data_ingestion_config.raw_data_dir
@@ -117,20 +252,15 @@ class DataIngestion:
                 strat_train_set = housing_data_frame.loc[train_index].drop(["income_cat"],axis=1)
                 strat_test_set = housing_data_frame.loc[test_index].drop(["income_cat"],axis=1)
 
-            train_file_path = os.path.join(self.data_ingestion_config.ingested_train_dir,
-                                            file_name)
-            test_file_path = os.path.join(self.data_ingestion_config.ingested_test_dir,
-                                            file_name)
+            train_file_path,test_file_path = self.get_ingested_file_paths(file_name)
 
             if strat_test_set is not None:
-                os.makedirs(self.data_ingestion_config.ingested_test_dir,exist_ok=True)
                 logging.info(f"Exporting test dataset to file: [{test_file_path}]")
-                strat_test_set.to_csv(test_file_path,index=False)
+                self.save_ingested_dataframe(file_path=test_file_path,dataframe=strat_test_set)
 
             if strat_train_set is not None:
-                os.makedirs(self.data_ingestion_config.ingested_train_dir,exist_ok=True)
                 logging.info(f"Exporting train dataset to file: [{train_file_path}]")
-                strat_train_set.to_csv(train_file_path,index=False)
+                self.save_ingested_dataframe(file_path=train_file_path,dataframe=strat_train_set)
 
             data_ingestion_artifact = DataIngestionArtifact(train_file_path=train_file_path,
                                     test_file_path=test_file_path,
@@ -145,6 +275,85 @@ class DataIngestion:
         except Exception as e:
             raise HousingException(e,sys) from e
 
+    def split_data_from_tgz_stream(self,tgz_file_path:str,test_size:float=0.2,
+                                   random_state:int=42)->DataIngestionArtifact:
+        """
+        Reads the csv member straight out of the tar stream in chunks and writes the
+        stratified train/test split chunk by chunk, so memory is bounded by the chunk size.
+        Within every income category each chunk contributes test_size of its rows to the
+        test set, the fractional remainder is carried to the next chunk of that category.
+        """
+        try:
+            chunk_size = self.data_ingestion_config.streaming_chunk_size
+            random_generator = np.random.default_rng(random_state)
+            test_row_carry = dict()
+            train_file_path = None
+            test_file_path = None
+            writers = []
+
+            # writers cast every chunk to the schema dtypes, categorical columns included, so streamed
+            # files have the same dtypes as the ones split in memory
+            dataset_schema = read_yaml_file(file_path=self.data_ingestion_config.schema_file_path)
+
+            logging.info(f"Streaming tgz file:[{tgz_file_path}] in chunks of [{chunk_size}] rows")
+            output_file_paths = []
+            try:
+                # writers are closed however the split ends and a failed split leaves no partial outputs
+                with contextlib.ExitStack() as exit_stack:
+                    housing_tgz_file_obj = exit_stack.enter_context(tarfile.open(tgz_file_path,mode="r|*"))
+                    for member in housing_tgz_file_obj:
+                        if member.isfile() and member.name.endswith(".csv"):
+                            break
+                    else:
+                        raise Exception(f"No csv file found in [{tgz_file_path}]")
+
+                    train_file_path,test_file_path = self.get_ingested_file_paths(os.path.basename(member.name))
+                    output_file_paths = [train_file_path,test_file_path]
+                    if self.data_ingestion_config.export_csv and not train_file_path.endswith(".csv"):
+                        output_file_paths.extend([f"{os.path.splitext(file_path)[0]}.csv"
+                                                  for file_path in [train_file_path,test_file_path]])
+                    for file_path in output_file_paths:
+                        writer = DataFrameChunkWriter(file_path=file_path,
+                                                      schema_columns=dataset_schema[DATASET_SCHEMA_COLUMNS_KEY])
+                        exit_stack.callback(writer.close)
+                        writers.append(writer)
+
+                    csv_file_obj = housing_tgz_file_obj.extractfile(member)
+                    for housing_data_frame in pd.read_csv(csv_file_obj,chunksize=chunk_size):
+                        income_cat = pd.cut(
+                            housing_data_frame["median_income"],
+                            bins=[0.0,1.5,3.0,4.5,6.0,np.inf],
+                            labels=[1,2,3,4,5]
+                        ).cat.codes.to_numpy()
+
+                        is_test_row = np.zeros(len(housing_data_frame),dtype=bool)
+                        for category in np.unique(income_cat):
+                            category_positions = np.flatnonzero(income_cat == category)
+                            expected_test_rows = test_row_carry.get(category,0.0) + len(category_positions)*test_size
+                            n_test_rows = int(np.floor(expected_test_rows))
+                            test_row_carry[category] = expected_test_rows - n_test_rows
+                            is_test_row[random_generator.choice(category_positions,n_test_rows,replace=False)] = True
+
+                        for writer_index,writer in enumerate(writers):
+                            writer.write(housing_data_frame[is_test_row if writer_index % 2 else ~is_test_row])
+            except BaseException:
+                for file_path in output_file_paths:
+                    if os.path.exists(file_path):
+                        os.remove(file_path)
+                raise
+
+            logging.info(f"Exported train dataset to file: [{train_file_path}] "
+                         f"and test dataset to file: [{test_file_path}]")
+            data_ingestion_artifact = DataIngestionArtifact(train_file_path=train_file_path,
+                                    test_file_path=test_file_path,
+                                    is_ingested=True,
+                                    message=f"Data Ingestion completed successfully"
+                                    )
+            logging.info(f"Data Ingestion artifact:[{data_ingestion_artifact}]")
+            return data_ingestion_artifact
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
     def __del__(self):
         logging.info(f"{'='*20}Data Ingestion log completed.{'='*20}\n\n")
 
@@ -13,7 +13,11 @@ from sklearn.preprocessing import StandardScaler,OneHotEncoder
 from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
 from sklearn.impute import SimpleImputer
-from housing.util.util import read_yaml_file,load_data,save_object,save_numpy_array_data
+from collections import namedtuple
+from housing.util.util import read_yaml_file,load_data,save_object,save_numpy_array_data,load_object,\
+    get_file_hash,get_code_version
+from housing.entity.preprocessor_cache import PreprocessorCache, PREPROCESSED_OBJECT_FILE_NAME,\
+    COMPILED_PREPROCESSED_OBJECT_FILE_NAME, INPUT_FEATURE_FILE_NAME, TARGET_FEATURE_FILE_NAME
 from housing.constant import *
 
 class FeatureGenerator(BaseEstimator, TransformerMixin):
@@ -70,6 +74,183 @@ class FeatureGenerator(BaseEstimator, TransformerMixin):
             raise HousingException(e, sys) from e
 
 
+class PreprocessorCompileError(Exception):
+    """
+    Raised when a fitted preprocessing object uses steps the compiled plan does not support,
+    callers fall back to the sklearn object
+    """
+
+
+NumericalBlock = namedtuple("NumericalBlock", ["columns", "fill_values", "ratio_feature_indices",
+                                               "shift", "scale"])
+
+CategoricalBlock = namedtuple("CategoricalBlock", ["column", "fill_value", "categories", "handle_unknown",
+                                                   "hot_values", "cold_values"])
+
+
+class CompiledPreprocessor:
+    """
+    Flat NumPy execution plan of a fitted preprocessing ColumnTransformer.
+    Supported pipelines are SimpleImputer -> FeatureGenerator -> StandardScaler for
+    numerical columns and SimpleImputer -> OneHotEncoder -> StandardScaler for
+    categorical columns; anything else raises PreprocessorCompileError while compiling.
+    """
+
+    def __init__(self,blocks:list,n_output_features:int):
+        self.blocks = blocks
+        self.n_output_features = n_output_features
+
+    @staticmethod
+    def get_imputer_fill_values(imputer:SimpleImputer)->np.ndarray:
+        missing_values = imputer.missing_values
+        if not (isinstance(missing_values,float) and np.isnan(missing_values)) or imputer.add_indicator:
+            raise PreprocessorCompileError("Only nan missing values without indicator can be compiled")
+        fill_values = np.asarray(imputer.statistics_)
+        if fill_values.dtype.kind == "f" and np.isnan(fill_values).any():
+            raise PreprocessorCompileError("Imputer drops columns with only missing values")
+        return fill_values
+
+    @staticmethod
+    def get_scaler_shift_and_scale(scaler:StandardScaler,n_features:int):
+        shift = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+        scale = scaler.scale_ if scaler.with_std else np.ones(n_features)
+        return np.asarray(shift,dtype=np.float64),np.asarray(scale,dtype=np.float64)
+
+    @staticmethod
+    def compile_numerical_pipeline(pipeline:Pipeline,columns:list)->NumericalBlock:
+        fill_values = None
+        ratio_feature_indices = []
+        n_features = len(columns)
+        shift,scale = np.zeros(n_features),np.ones(n_features)
+        for _,step in pipeline.steps:
+            if isinstance(step,SimpleImputer):
+                fill_values = CompiledPreprocessor.get_imputer_fill_values(step).astype(np.float64)
+            elif isinstance(step,FeatureGenerator):
+                ratio_feature_indices = [(step.total_rooms_ix,step.households_ix),
+                                         (step.population_ix,step.households_ix)]
+                if step.add_bedrooms_per_room:
+                    ratio_feature_indices.append((step.total_bedrooms_ix,step.total_rooms_ix))
+                n_features = len(columns) + len(ratio_feature_indices)
+                shift,scale = np.zeros(n_features),np.ones(n_features)
+            elif isinstance(step,StandardScaler):
+                shift,scale = CompiledPreprocessor.get_scaler_shift_and_scale(step,n_features)
+            else:
+                raise PreprocessorCompileError(f"Step {type(step).__name__} can not be compiled")
+        return NumericalBlock(columns=list(columns),
+                              fill_values=fill_values,
+                              ratio_feature_indices=np.array(ratio_feature_indices,dtype=int).reshape(-1,2),
+                              shift=shift,
+                              scale=scale)
+
+    @staticmethod
+    def compile_categorical_pipeline(pipeline:Pipeline,columns:list)->list:
+        fill_values = None
+        encoder = None
+        scaler = None
+        for _,step in pipeline.steps:
+            if isinstance(step,SimpleImputer) and encoder is None:
+                fill_values = CompiledPreprocessor.get_imputer_fill_values(step)
+            elif isinstance(step,OneHotEncoder) and encoder is None:
+                encoder = step
+            elif isinstance(step,StandardScaler) and encoder is not None:
+                scaler = step
+            else:
+                raise PreprocessorCompileError(f"Step {type(step).__name__} can not be compiled")
+        if encoder is None or getattr(encoder,"drop_idx_",None) is not None or \
+            getattr(encoder,"_infrequent_enabled",False):
+            raise PreprocessorCompileError("Only plain one hot encoding can be compiled")
+
+        n_features = sum(len(categories) for categories in encoder.categories_)
+        shift,scale = np.zeros(n_features),np.ones(n_features)
+        if scaler is not None:
+            shift,scale = CompiledPreprocessor.get_scaler_shift_and_scale(scaler,n_features)
+
+        blocks = []
+        offset = 0
+        for index,(column,categories) in enumerate(zip(columns,encoder.categories_)):
+            block_slice = slice(offset,offset+len(categories))
+            blocks.append(CategoricalBlock(column=column,
+                            fill_value=None if fill_values is None else fill_values[index],
+                            categories=np.asarray(categories),
+                            handle_unknown=encoder.handle_unknown,
+                            hot_values=(1.0-shift[block_slice])/scale[block_slice],
+                            cold_values=(0.0-shift[block_slice])/scale[block_slice]))
+            offset += len(categories)
+        return blocks
+
+    @classmethod
+    def compile(cls,preprocessing_obj:ColumnTransformer):
+        try:
+            blocks = []
+            for name,transformer,columns in preprocessing_obj.transformers_:
+                if isinstance(transformer,str) and transformer == "drop":
+                    continue
+                if not isinstance(transformer,Pipeline):
+                    raise PreprocessorCompileError(f"Transformer {name} can not be compiled")
+                if any(isinstance(step,OneHotEncoder) for _,step in transformer.steps):
+                    blocks.extend(cls.compile_categorical_pipeline(transformer,columns))
+                else:
+                    blocks.append(cls.compile_numerical_pipeline(transformer,columns))
+            n_output_features = sum(len(block.shift) if isinstance(block,NumericalBlock)
+                                    else len(block.categories) for block in blocks)
+            return cls(blocks=blocks,n_output_features=n_output_features)
+        except PreprocessorCompileError as e:
+            raise e
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    @staticmethod
+    def transform_numerical_block(block:NumericalBlock,X:pd.DataFrame)->np.ndarray:
+        values = X[block.columns].to_numpy(dtype=np.float64)
+        if block.fill_values is not None:
+            values = np.where(np.isnan(values),block.fill_values,values)
+        if len(block.ratio_feature_indices) > 0:
+            ratio_features = values[:,block.ratio_feature_indices[:,0]] / values[:,block.ratio_feature_indices[:,1]]
+            values = np.concatenate([values,ratio_features],axis=1)
+        return (values - block.shift) / block.scale
+
+    @staticmethod
+    def transform_categorical_block(block:CategoricalBlock,X:pd.DataFrame)->np.ndarray:
+        values = X[block.column].to_numpy(dtype=object)
+        if block.fill_value is not None:
+            values = np.where(values != values,block.fill_value,values)
+        category_index = np.searchsorted(block.categories,values)
+        category_index = np.minimum(category_index,len(block.categories)-1)
+        is_known = block.categories[category_index] == values
+        if not is_known.all() and block.handle_unknown == "error":
+            unknown_values = np.unique(values[~is_known].astype(str))
+            raise ValueError(f"Found unknown categories {list(unknown_values)} in column {block.column}")
+        encoded = np.tile(block.cold_values,(len(values),1))
+        rows = np.nonzero(is_known)[0]
+        encoded[rows,category_index[rows]] = block.hot_values[category_index[rows]]
+        return encoded
+
+    def transform(self,X:pd.DataFrame)->np.ndarray:
+        try:
+            transformed_blocks = []
+            for block in self.blocks:
+                if isinstance(block,NumericalBlock):
+                    transformed_blocks.append(CompiledPreprocessor.transform_numerical_block(block,X))
+                else:
+                    transformed_blocks.append(CompiledPreprocessor.transform_categorical_block(block,X))
+            return np.concatenate(transformed_blocks,axis=1)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def is_identical_to(self,preprocessing_obj:ColumnTransformer,X:pd.DataFrame)->bool:
+        """
+        Parity check of the compiled plan against the sklearn preprocessing object on X
+        """
+        try:
+            expected = preprocessing_obj.transform(X)
+            if hasattr(expected,"toarray"):
+                expected = expected.toarray()
+            actual = self.transform(X)
+            return expected.shape == actual.shape and bool(np.array_equal(expected,actual,equal_nan=True))
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+
 class DataTransformation:
 
     def __init__(self,data_transformation_config:DataTransformationConfig,
@@ -123,66 +304,174 @@ class DataTransformation:
         except Exception as e:
             raise HousingException(e,sys) from e
     
-    def initiate_data_transformation(self)->DataTransformationArtifact:
+    @staticmethod
+    def get_contiguous_array(data)->np.ndarray:
+        if hasattr(data,"toarray"):
+            data = data.toarray()
+        return np.ascontiguousarray(np.asarray(data,dtype=np.float64))
+
+    def export_compiled_preprocessing_object(self,preprocessing_obj:ColumnTransformer,
+                                             input_feature_df:pd.DataFrame)->str:
+        """
+        Compiles the fitted preprocessing object into a NumPy plan and saves it
+        only if it reproduces the sklearn output exactly on input_feature_df.
+        return: file path of compiled object or None
+        """
         try:
-            logging.info(f"Obtaining preprocessing object.")
-            preprocessing_obj = self.get_data_transformer_object()
-
-            logging.info(f"Obtaining training and test file path.")
-            train_file_path =self.data_ingestion_artifact.train_file_path
-
-            test_file_path = self.data_ingestion_artifact.test_file_path
-            
-            schema_file_path= self.data_validation_artifact.schema_file_path
-            
-            logging.info(f"Loading training and test data  as pandas dataframe.")
-            train_df = load_data(file_path=train_file_path,
-                                schema_file_path=schema_file_path)
-
-            test_df = load_data(file_path=train_file_path,
-                                schema_file_path=schema_file_path)
-
-            schema = read_yaml_file(file_path=schema_file_path)
-
-            target_column_name = schema[TARGET_COLUMN_KEY]
-
-            logging.info(f"Splitting input and target feature from training and testing dataframe.")
-            input_feature_train_df = train_df.drop(columns=[target_column_name],axis=1)
-            target_feature_train_df = train_df[target_column_name]
-            
-            input_feature_test_df = test_df.drop(columns=[target_column_name],axis=1)
-            target_feature_test_df = test_df[target_column_name]
+            try:
+                compiled_preprocessing_obj = CompiledPreprocessor.compile(preprocessing_obj)
+            except PreprocessorCompileError as e:
+                logging.info(f"Preprocessing object can not be compiled: {e}")
+                return None
+
+            if not compiled_preprocessing_obj.is_identical_to(preprocessing_obj,input_feature_df):
+                logging.info(f"Compiled preprocessing object output differs from sklearn output, skipping export.")
+                return None
+
+            compiled_preprocessing_obj_file_path = self.data_transformation_config.compiled_preprocessed_object_file_path
+            logging.info(f"Saving compiled preprocessing object.")
+            save_object(file_path=compiled_preprocessing_obj_file_path,obj=compiled_preprocessing_obj)
+            return compiled_preprocessing_obj_file_path
+        except Exception as e:
+            raise HousingException(e,sys) from e
 
-            logging.info(f"Applying preprocessing object on training and testing dataframe.")
-            input_feature_train_arr = preprocessing_obj.fit_transform(input_feature_train_df)
-            input_feature_test_arr = preprocessing_obj.transform(input_feature_test_df)
+    @staticmethod
+    def get_transformed_file_paths(file_path:str,transformed_dir:str):
+        """
+        return: (input feature file path, target feature file path) of the transformed file_path
+        """
+        file_name = os.path.splitext(os.path.basename(file_path))[0]
+        return (os.path.join(transformed_dir,f"{file_name}.npy"),
+                os.path.join(transformed_dir,f"{file_name}_target.npy"))
 
-            train_arr = np.c_[input_feature_train_arr,np.array(target_feature_train_df)]
-            test_arr = np.c_[input_feature_test_arr,np.array(target_feature_test_df)]
+    def load_input_and_target_feature(self,file_path:str):
+        try:
+            schema_file_path = self.data_validation_artifact.schema_file_path
+            dataframe = load_data(file_path=file_path,schema_file_path=schema_file_path)
+            target_column_name = read_yaml_file(file_path=schema_file_path)[TARGET_COLUMN_KEY]
+            return dataframe.drop(columns=[target_column_name],axis=1),dataframe[target_column_name]
+        except Exception as e:
+            raise HousingException(e,sys) from e
 
-            transformed_train_dir = self.data_transformation_config.transformed_train_dir
-            transformed_test_dir = self.data_transformation_config.transformed_test_dir
+    @staticmethod
+    def save_transformed_arrays(input_feature_arr,target_feature,input_feature_file_path:str,
+                                target_feature_file_path:str):
+        # input and target feature are stored as separate contiguous arrays, so they can be
+        # memory-mapped by the trainer and its search workers without slicing copies
+        save_numpy_array_data(file_path=input_feature_file_path,
+                              array=DataTransformation.get_contiguous_array(input_feature_arr))
+        save_numpy_array_data(file_path=target_feature_file_path,
+                              array=DataTransformation.get_contiguous_array(target_feature))
+
+    def get_preprocessor_fit_key(self)->str:
+        """
+        Fingerprint of everything the fitted preprocessing object depends on. The test data and
+        model.yaml are not part of it, so a retrain with a new model config reuses the fit.
+        """
+        try:
+            return PreprocessorCache.get_fit_key(
+                train_file_hash=get_file_hash(self.data_ingestion_artifact.train_file_path),
+                schema_file_hash=get_file_hash(self.data_validation_artifact.schema_file_path),
+                options={DATA_TRANSFORMATION_ADD_BEDROOM_PER_ROOM_KEY:
+                         self.data_transformation_config.add_bedroom_per_room},
+                code_version=get_code_version(DataTransformation,load_data))
+        except Exception as e:
+            raise HousingException(e,sys) from e
 
-            train_file_name = os.path.basename(train_file_path).replace(".csv",".npz")
-            test_file_name = os.path.basename(test_file_path).replace(".csv",".npz")
+    def initiate_data_transformation(self)->DataTransformationArtifact:
+        try:
+            logging.info(f"Obtaining training and test file path.")
+            train_file_path =self.data_ingestion_artifact.train_file_path
 
-            transformed_train_file_path = os.path.join(transformed_train_dir,train_file_name)
-            transformed_test_file_path = os.path.join(transformed_test_dir,test_file_name)    
-            
-            logging.info(f"Saving transformed training and testing array.")
-            save_numpy_array_data(file_path=transformed_train_file_path,array=train_arr)
-            save_numpy_array_data(file_path=transformed_test_file_path,array=test_arr)
+            test_file_path = self.data_ingestion_artifact.test_file_path
 
+            transformed_train_file_path,transformed_train_target_file_path = \
+                DataTransformation.get_transformed_file_paths(train_file_path,
+                                                              self.data_transformation_config.transformed_train_dir)
+            transformed_test_file_path,transformed_test_target_file_path = \
+                DataTransformation.get_transformed_file_paths(test_file_path,
+                                                              self.data_transformation_config.transformed_test_dir)
             preprocessing_obj_file_path=self.data_transformation_config.preprocessed_object_file_path
 
-            logging.info(f"Saving preprocessing object.")
-            save_object(file_path=preprocessing_obj_file_path,obj=preprocessing_obj)
+            preprocessor_cache = PreprocessorCache(cache_dir=self.data_transformation_config.preprocessor_cache_dir)
+            fit_key = self.get_preprocessor_fit_key()
+            transform_key = PreprocessorCache.get_transform_key(fit_key=fit_key,
+                                                                file_hash=get_file_hash(test_file_path))
+
+            preprocessing_obj = None
+            cached_fit = preprocessor_cache.get_fit(fit_key)
+            if cached_fit is not None:
+                logging.info(f"Training data, schema and transformer unchanged, reusing fitted preprocessing object "
+                             f"and transformed training array of fit [{fit_key}].")
+                PreprocessorCache.restore_file(cached_fit[PREPROCESSED_OBJECT_FILE_NAME],preprocessing_obj_file_path)
+                PreprocessorCache.restore_file(cached_fit[INPUT_FEATURE_FILE_NAME],transformed_train_file_path)
+                PreprocessorCache.restore_file(cached_fit[TARGET_FEATURE_FILE_NAME],
+                                               transformed_train_target_file_path)
+            else:
+                logging.info(f"Obtaining preprocessing object.")
+                preprocessing_obj = self.get_data_transformer_object()
+
+                logging.info(f"Loading training data as pandas dataframe.")
+                input_feature_train_df,target_feature_train_df = self.load_input_and_target_feature(train_file_path)
+
+                logging.info(f"Fitting preprocessing object on training dataframe.")
+                input_feature_train_arr = preprocessing_obj.fit_transform(input_feature_train_df)
+
+                logging.info(f"Saving transformed training array.")
+                DataTransformation.save_transformed_arrays(input_feature_train_arr,target_feature_train_df,
+                                                           transformed_train_file_path,
+                                                           transformed_train_target_file_path)
+
+                logging.info(f"Saving preprocessing object.")
+                save_object(file_path=preprocessing_obj_file_path,obj=preprocessing_obj)
+                preprocessor_cache.put_fit(fit_key=fit_key,
+                                           preprocessed_object_file_path=preprocessing_obj_file_path,
+                                           input_feature_file_path=transformed_train_file_path,
+                                           target_feature_file_path=transformed_train_target_file_path)
+
+            cached_transform = preprocessor_cache.get_transform(transform_key)
+            if cached_transform is not None:
+                logging.info(f"Reusing transformed testing array of fit [{fit_key}].")
+                PreprocessorCache.restore_file(cached_transform[INPUT_FEATURE_FILE_NAME],transformed_test_file_path)
+                PreprocessorCache.restore_file(cached_transform[TARGET_FEATURE_FILE_NAME],
+                                               transformed_test_target_file_path)
+                compiled_preprocessing_obj_file_path = None
+                if cached_transform[COMPILED_PREPROCESSED_OBJECT_FILE_NAME] is not None:
+                    compiled_preprocessing_obj_file_path = PreprocessorCache.restore_file(
+                        cached_transform[COMPILED_PREPROCESSED_OBJECT_FILE_NAME],
+                        self.data_transformation_config.compiled_preprocessed_object_file_path)
+            else:
+                if preprocessing_obj is None:
+                    preprocessing_obj = load_object(file_path=preprocessing_obj_file_path)
+
+                logging.info(f"Loading testing data as pandas dataframe.")
+                input_feature_test_df,target_feature_test_df = self.load_input_and_target_feature(test_file_path)
+
+                logging.info(f"Applying preprocessing object on testing dataframe.")
+                input_feature_test_arr = preprocessing_obj.transform(input_feature_test_df)
+
+                logging.info(f"Saving transformed testing array.")
+                DataTransformation.save_transformed_arrays(input_feature_test_arr,target_feature_test_df,
+                                                           transformed_test_file_path,
+                                                           transformed_test_target_file_path)
+
+                compiled_preprocessing_obj_file_path = self.export_compiled_preprocessing_object(
+                                                        preprocessing_obj=preprocessing_obj,
+                                                        input_feature_df=input_feature_test_df)
+                preprocessor_cache.put_transform(transform_key=transform_key,
+                                                 input_feature_file_path=transformed_test_file_path,
+                                                 target_feature_file_path=transformed_test_target_file_path,
+                                                 compiled_preprocessed_object_file_path=
+                                                 compiled_preprocessing_obj_file_path)
             
             data_transformation_artifact= DataTransformationArtifact(is_transformed=True,
                             message="Data Transformation Successful",
                             transformed_train_file_path=transformed_train_file_path,
                             transformed_test_file_path=transformed_test_file_path,
-                            preprocessed_object_file_path=preprocessing_obj_file_path
+                            transformed_train_target_file_path=transformed_train_target_file_path,
+                            transformed_test_target_file_path=transformed_test_target_file_path,
+                            preprocessed_object_file_path=preprocessing_obj_file_path,
+                            compiled_preprocessed_object_file_path=compiled_preprocessing_obj_file_path
             )
             logging.info(f"Data transformation artifact:{data_transformation_artifact}")
             return data_transformation_artifact
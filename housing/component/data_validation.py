@@ -5,15 +5,10 @@ from housing.logger import logging
 from housing.entity.config_entity import DataValidationConfig
 from housing.entity.artifact_entity import DataIngestionArtifact,DataValidationArtifact
 import os,sys
-import json
-import pandas as pd
-from evidently.model_profile import Profile
-from evidently.model_profile.sections import DataDriftProfileSection
-from evidently.dashboard.tabs import DataDriftTab
-from evidently.dashboard import Dashboard
-from housing.util.util import read_yaml_file
-from housing.constant import DATASET_SCHEMA_COLUMNS_KEY, DOMAIN_VALUE_KEY,OCEAN_PROXIMITY_KEY
-from collections import Counter
+from housing.entity.data_drift import DataDriftDetector
+from housing.entity.data_sketch import DatasetSketch
+from housing.entity.schema_validator import SchemaValidator
+from housing.util.util import read_dataframe, read_dataframe_chunks
 
 class DataValidation:
 
@@ -23,16 +18,45 @@ class DataValidation:
             logging.info(f"{'='*20}Data Validation log started.{'='*20}\n\n")
             self.data_validation_config=data_validation_config
             self.data_ingestion_artifact=data_ingestion_artifact
+            self.dataset_profiles = None
 
         except Exception as e:
             raise HousingException(e,sys) from e 
 
-    def get_train_and_test_df(self):
+    def get_dataset_profile(self,file_path:str):
+        """
+        Validates the schema of a dataset and sketches its columns in one chunked pass,
+        so the dataset never has to fit in memory
+        return: (SchemaValidationReport, DatasetSketch)
+        """
         try:
-            train_df = pd.read_csv(self.data_ingestion_artifact.train_file_path)
-            test_df = pd.read_csv(self.data_ingestion_artifact.test_file_path)
+            schema_validator = SchemaValidator.from_schema_file(self.data_validation_config.schema_file_path)
+            dataset_sketch = DatasetSketch(numerical_columns=schema_validator.numerical_columns,
+                                           categorical_columns=schema_validator.categorical_columns)
+            schema_report = None
+            for dataframe in read_dataframe_chunks(file_path=file_path,
+                                                   chunk_size=self.data_validation_config.chunk_size):
+                _,chunk_report = schema_validator.validate(dataframe)
+                schema_report = chunk_report if schema_report is None else \
+                    SchemaValidator.merge_reports([schema_report,chunk_report])
+                dataset_sketch.update(dataframe)
+            if schema_report is None:
+                _,schema_report = schema_validator.validate(read_dataframe(file_path))
+            return schema_report,dataset_sketch
+        except Exception as e:
+            raise HousingException(e,sys) from e
 
-            return train_df,test_df
+    def get_dataset_profiles(self)->dict:
+        """
+        Profiles of the train and test datasets, computed once and shared by schema checks and drift reports
+        """
+        try:
+            if self.dataset_profiles is None:
+                self.dataset_profiles = {
+                    "train":self.get_dataset_profile(self.data_ingestion_artifact.train_file_path),
+                    "test":self.get_dataset_profile(self.data_ingestion_artifact.test_file_path)
+                }
+            return self.dataset_profiles
         except Exception as e:
             raise HousingException(e,sys) from e
 
@@ -66,140 +90,99 @@ class DataValidation:
 
     def validate_dataset_schema(self)->bool:
         try:
-            validation_status=False
-            # validate training and testing dataset using schema file
-            train_df,test_df=self.get_train_and_test_df() 
-            #1. checking number of columns in training dataset 
-            chk1 = self.check_length_column(train_df)              
-            logging.info(f"Number of columns in training dataset match with the schema:{chk1}")
-           
-            chk2 = self.check_length_column(test_df)
-            logging.info(f"Number of columns in testing dataset match with the schema:{chk2}")
-           
-                       
-           
-            #2. Check the value of ocean proximity 
-            # acceptable values     <1H OCEAN
-            # INLAND
-            # ISLAND
-            # NEAR BAY
-            # NEAR OCEAN
-            #training dataset
-            chk3= self.check_ocean_proximity_values(train_df)
-            logging.info(f"Ocean proximity values in training dataset match with the schema:{chk3}")
-
-            chk4= self.check_ocean_proximity_values(train_df)
-            logging.info(f"Ocean proximity values in testing dataset match with the schema:{chk4}")
-
-            #3. Check column names in training dataset
-            chk5= self.check_column_names(train_df)
-            logging.info(f"all columns in training dataset are correct: {chk5}")
-
-            chk6= self.check_column_names(test_df)
-            
-            logging.info(f"all columns in testing dataset are correct: {chk6}")
-            
-
-            if (chk1 and chk2 and chk3 and chk4 and chk5 and chk6) is False:
-                validation_status =False
-                raise Exception(f"data is not valid")
-
-            else:
-                validation_status =True
-              
-            return validation_status
-        except Exception as e:
-            raise HousingException(e,sys) from e
-    
-    def check_ocean_proximity_values(self,df:pd.DataFrame)->bool:
-        try:
-            schema = read_yaml_file(self.data_validation_config.schema_file_path)
-            ocean_proximity_values_df = list(Counter(df[OCEAN_PROXIMITY_KEY]).keys())
-            logging.info(f"values of ocean df :[{ocean_proximity_values_df}]")
-            ocean_proximity_values_schema = schema[DOMAIN_VALUE_KEY][OCEAN_PROXIMITY_KEY]
-            logging.info(f"values of ocean schema :[{ocean_proximity_values_schema}]")
-            validation_status = all(val in ocean_proximity_values_df for val in ocean_proximity_values_schema)
-            
-            return validation_status
+            # schema.yaml is compiled once and each dataset chunk is checked in a single vectorized pass
+            errors = dict()
+            for dataset_name,(report,_) in self.get_dataset_profiles().items():
+                logging.info(f"Schema validation report of {dataset_name}ing dataset:{report}")
+                if not report.is_valid:
+                    errors[dataset_name] = SchemaValidator.get_errors(report)
+
+            if len(errors) > 0:
+                raise Exception(f"data is not valid:{errors}")
+            return True
         except Exception as e:
             raise HousingException(e,sys) from e
 
-
-    def check_length_column(self,df:pd.DataFrame)->bool:
+    def get_data_drift_detector(self)->DataDriftDetector:
         try:
-            schema = read_yaml_file(self.data_validation_config.schema_file_path)
-            if len(df.columns)==len(schema[DATASET_SCHEMA_COLUMNS_KEY].keys()):
-                validation_status = True
-            else:
-                validation_status=False
-            return validation_status
+            schema_validator = SchemaValidator.from_schema_file(self.data_validation_config.schema_file_path)
+            return DataDriftDetector(numerical_columns=schema_validator.numerical_columns,
+                                     categorical_columns=schema_validator.categorical_columns,
+                                     p_value_threshold=self.data_validation_config.drift_p_value_threshold,
+                                     drift_share_threshold=self.data_validation_config.drift_share_threshold,
+                                     bins=self.data_validation_config.drift_histogram_bins)
         except Exception as e:
             raise HousingException(e,sys) from e
 
-    def check_column_names(self,df:pd.DataFrame)->bool:
+    def save_dataset_sketches(self):
         try:
-            schema = read_yaml_file(self.data_validation_config.schema_file_path)
-            columns_names = list(df.columns)
-            
-            for col in columns_names:
-                if col not in list(schema[DATASET_SCHEMA_COLUMNS_KEY].keys()):
-                    logging.info(f"{col} not in the dataset")
-                    validation_status=False
-                    break
-                else:
-                    validation_status = True         
-            return validation_status
+            dataset_profiles = self.get_dataset_profiles()
+            dataset_profiles["train"][1].save(self.data_validation_config.train_sketch_file_path)
+            dataset_profiles["test"][1].save(self.data_validation_config.test_sketch_file_path)
         except Exception as e:
             raise HousingException(e,sys) from e
 
-    def save_data_drift_report_page(self):
+    def get_previous_train_sketch_file_path(self)->str:
+        """
+        Train sketch of the latest earlier validation run, None if there is none
+        """
         try:
-            dashboard = Dashboard(tabs=[DataDriftTab()])
-            train_df,test_df = self.get_train_and_test_df()
-            dashboard.calculate(train_df,test_df)
-            
-
-            report_page_file_path = self.data_validation_config.report_page_file_path
-
-            report_page_dir = os.path.dirname(report_page_file_path)
-
-            os.makedirs(report_page_dir,exist_ok=True)
-
-            dashboard.save(report_page_file_path)
+            validation_dir = os.path.dirname(self.data_validation_config.train_sketch_file_path)
+            sketch_file_name = os.path.basename(self.data_validation_config.train_sketch_file_path)
+            validation_root_dir = os.path.dirname(validation_dir)
+            if not os.path.isdir(validation_root_dir):
+                return None
+            # run directories are named by sortable timestamps
+            for run_dir_name in sorted(os.listdir(validation_root_dir),reverse=True):
+                run_dir = os.path.join(validation_root_dir,run_dir_name)
+                sketch_file_path = os.path.join(run_dir,sketch_file_name)
+                if os.path.abspath(run_dir) != os.path.abspath(validation_dir) and run_dir_name < \
+                        os.path.basename(validation_dir) and os.path.exists(sketch_file_path):
+                    return sketch_file_path
+            return None
         except Exception as e:
             raise HousingException(e,sys) from e
 
-    def get_and_save_data_drift_report(self):
+    def save_previous_run_drift_report(self,data_drift_detector:DataDriftDetector):
+        """
+        Compares the train dataset with the one of the previous run from its saved sketch
+        """
         try:
-            profile = Profile(sections=[DataDriftProfileSection()])
-
-            train_df,test_df=self.get_train_and_test_df()
-
-            profile.calculate(train_df,test_df)
-
-            report = json.loads(profile.json())
-
-            report_file_path = self.data_validation_config.report_file_path
-
-            report_dir = os.path.dirname(report_file_path)
-
-            os.makedirs(report_dir,exist_ok=True)    
-
-            with open(report_file_path,"w") as report_file:
-                json.dump(report,report_file,indent=6)
-
-            return report    
-
+            previous_train_sketch_file_path = self.get_previous_train_sketch_file_path()
+            if previous_train_sketch_file_path is None:
+                logging.info("No previous run sketch found, skipping drift against previous run")
+                return None
+            report = data_drift_detector.get_data_drift_report(
+                reference_sketch=DatasetSketch.load(previous_train_sketch_file_path),
+                current_sketch=self.get_dataset_profiles()["train"][1])
+            DataDriftDetector.save_report(report=report,
+                                          report_file_path=self.data_validation_config.previous_run_report_file_path)
+            logging.info(f"Data drift against previous run [{previous_train_sketch_file_path}] "
+                         f"found:[{report.dataset_drift}]")
+            return report
         except Exception as e:
             raise HousingException(e,sys) from e
-    
-    
-    
+
     def is_data_drift_found(self)->bool:
+        """
+        Computes drift once from the dataset sketches and renders the json report and the html page
+        from the same result
+        """
         try:
-            report = self.get_and_save_data_drift_report()
-            self.save_data_drift_report_page()
-            return True
+            data_drift_detector = self.get_data_drift_detector()
+            dataset_profiles = self.get_dataset_profiles()
+            report = data_drift_detector.get_data_drift_report(reference_sketch=dataset_profiles["train"][1],
+                                                               current_sketch=dataset_profiles["test"][1])
+            DataDriftDetector.save_report(report=report,
+                                          report_file_path=self.data_validation_config.report_file_path)
+            DataDriftDetector.save_report_page(report=report,
+                                               report_page_file_path=self.data_validation_config.report_page_file_path)
+            self.save_dataset_sketches()
+            drifted_columns = [column for column,column_drift in report.column_drifts.items()
+                               if column_drift.drift_detected]
+            logging.info(f"Data drift found:[{report.dataset_drift}], drifted columns:{drifted_columns}")
+            self.save_previous_run_drift_report(data_drift_detector=data_drift_detector)
+            return report.dataset_drift
         except Exception as e:
             raise HousingException(e,sys) from e
 
@@ -214,6 +197,8 @@ class DataValidation:
                                     schema_file_path=self.data_validation_config.schema_file_path,
                                     report_file_path=self.data_validation_config.report_file_path,
                                     report_page_file_path=self.data_validation_config.report_page_file_path,
+                                    train_sketch_file_path=self.data_validation_config.train_sketch_file_path,
+                                    test_sketch_file_path=self.data_validation_config.test_sketch_file_path,
                                     is_validated=True,
                                     message="Data Validation performed successfully")
             logging.info(f"Data validation artifact:{data_validation_artifact}")
@@ -1,14 +1,16 @@
 
 from housing.config.configuration import Configuartion
-from housing.entity.model_factory import MetricInfoArtifact, evaluate_regression_model
+from housing.entity.model_factory import MetricInfoArtifact, evaluate_regression_predictions
 from housing.exception import HousingException
 from housing.logger import logging
 import os,sys
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from housing.util.util import load_data, load_object, read_yaml_file,save_object, write_yaml_file
+from housing.util.util import load_data, load_object, read_yaml_file,save_object, write_yaml_file,\
+    load_numpy_arrays, load_numpy_array_data
 from housing.entity.config_entity import ModelEvaluationConfig
 from housing.entity.artifact_entity import DataIngestionArtifact,DataValidationArtifact,\
-     ModelEvaluationArtifact, ModelTrainerArtifact
+     DataTransformationArtifact, ModelEvaluationArtifact, ModelTrainerArtifact
 from housing.constant import *
 
 
@@ -17,13 +19,28 @@ class ModelEvaluation:
     def __init__(self,model_evaluation_config:ModelEvaluationConfig,
                 data_ingestion_artifact:DataIngestionArtifact,
                 data_validation_artifact:DataValidationArtifact,
-                model_trainer_artifact:ModelTrainerArtifact) :
+                model_trainer_artifact:ModelTrainerArtifact,
+                data_transformation_artifact:DataTransformationArtifact=None) :
         try:
             logging.info(f"{'='*20}Model Evaluation log started.{'='*30}\n\n")
             self.model_evaluation_config = model_evaluation_config
             self.data_ingestion_artifact = data_ingestion_artifact
             self.data_validation_artifact = data_validation_artifact
             self.model_trainer_artifact = model_trainer_artifact
+            self.data_transformation_artifact = data_transformation_artifact
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_best_model_path(self)->str:
+        try:
+            model_evaluation_file_path = self.model_evaluation_config.model_evaluation_file_path
+            if not os.path.exists(model_evaluation_file_path):
+                return None
+            model_eval_file_content = read_yaml_file(file_path=model_evaluation_file_path)
+            model_eval_file_content= dict() if model_eval_file_content is None else model_eval_file_content
+            if BEST_MODEL_KEY not in model_eval_file_content:
+                return None
+            return model_eval_file_content[BEST_MODEL_KEY][MODEL_PATH_KEY]
         except Exception as e:
             raise HousingException(e,sys) from e
 
@@ -49,6 +66,97 @@ class ModelEvaluation:
         except Exception as e:
             raise HousingException(e,sys) from e
 
+    def get_best_model_predictions(self,y_train:np.ndarray,y_test:np.ndarray)->dict:
+        """
+        Returns the prediction artifact saved next to the best model by its training run, or None
+        if there is none or it was computed for different training/testing targets
+        """
+        try:
+            best_model_path = self.get_best_model_path()
+            if best_model_path is None:
+                return None
+            prediction_file_path = os.path.join(os.path.dirname(best_model_path),
+                                    os.path.basename(self.model_trainer_artifact.prediction_file_path))
+            if not os.path.exists(prediction_file_path):
+                return None
+            predictions = load_numpy_arrays(file_path=prediction_file_path)
+            if not (np.array_equal(predictions["y_train"],y_train) and np.array_equal(predictions["y_test"],y_test)):
+                logging.info(f"Best model predictions [{prediction_file_path}] belong to another dataset")
+                return None
+            return predictions
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_transformed_input(self):
+        """
+        Returns the memory mapped transformed training and testing input features
+        """
+        try:
+            x_train = load_numpy_array_data(file_path=self.data_transformation_artifact.transformed_train_file_path,
+                                            mmap_mode="r")
+            x_test = load_numpy_array_data(file_path=self.data_transformation_artifact.transformed_test_file_path,
+                                           mmap_mode="r")
+            return x_train,x_test
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_raw_input(self):
+        """
+        Returns the raw training and testing input dataframes without target column
+        """
+        try:
+            train_file_path = self.data_ingestion_artifact.train_file_path
+            test_file_path = self.data_ingestion_artifact.test_file_path
+
+            schema_file_path = self.data_validation_artifact.schema_file_path
+
+            train_dataframe= load_data(file_path=train_file_path,schema_file_path=schema_file_path)
+            test_dataframe = load_data(file_path=test_file_path,schema_file_path=schema_file_path)
+
+            schema_content = read_yaml_file(file_path=schema_file_path)
+            target_column_name = schema_content[TARGET_COLUMN_KEY]
+
+            #dropping target column from the dataframe
+            logging.info(f"Dropping target column from the DataFrame")
+            train_dataframe.drop(target_column_name,axis=1,inplace=True)
+            test_dataframe.drop(target_column_name,axis=1,inplace=True)
+            logging.info(f"Dropping target column from the dataframe completed.")
+            return train_dataframe,test_dataframe
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def predict_with_best_model(self,model,trained_model_object)->dict:
+        """
+        Predicts training and testing dataset with the best model, used when its
+        prediction artifact cannot be reused. When the best model was trained with the same
+        preprocessor as the trained model, its estimator is scored on the already transformed
+        arrays, otherwise the raw data goes through the best model's own preprocessor.
+        Training and testing dataset are predicted concurrently.
+        """
+        try:
+            best_model_fingerprint = getattr(model,"preprocessing_fingerprint",None)
+            trained_model_fingerprint = getattr(trained_model_object,"preprocessing_fingerprint",None)
+            if (self.data_transformation_artifact is not None and best_model_fingerprint is not None
+                    and best_model_fingerprint == trained_model_fingerprint):
+                logging.info(f"Best model shares the preprocessor of the trained model, "
+                             f"predicting on transformed arrays")
+                train_input,test_input = self.get_transformed_input()
+                estimator = model.trained_model_object
+            else:
+                logging.info(f"Best model has a different preprocessor, predicting on raw data")
+                train_input,test_input = self.get_raw_input()
+                estimator = model
+
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                train_prediction = executor.submit(estimator.predict,train_input)
+                test_prediction = executor.submit(estimator.predict,test_input)
+                return {
+                    "train_prediction":train_prediction.result(),
+                    "test_prediction":test_prediction.result()
+                }
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
     def update_evaluation_report(self,model_evaluation_artifact:ModelEvaluationArtifact):
         try:
             eval_file_path = self.model_evaluation_config.model_evaluation_file_path
@@ -85,30 +193,14 @@ class ModelEvaluation:
     def initiate_model_evaluation(self)->ModelEvaluationArtifact:
         try:
             trained_model_file_path =self.model_trainer_artifact.trained_model_file_path
-            trained_model_object = load_object(file_path=trained_model_file_path)
-
-            train_file_path = self.data_ingestion_artifact.train_file_path
-            test_file_path = self.data_ingestion_artifact.test_file_path
 
-            schema_file_path = self.data_validation_artifact.schema_file_path
-
-            train_dataframe= load_data(file_path=train_file_path,schema_file_path=schema_file_path)
-            test_dataframe = load_data(file_path=test_file_path,schema_file_path=schema_file_path)
-
-            schema_content = read_yaml_file(file_path=schema_file_path)
-            target_column_name = schema_content[TARGET_COLUMN_KEY]
-
-            #target column
-            logging.info(f"Converting target column in numpy array.")
-            train_target_arr = np.array(train_dataframe[target_column_name])
-            test_target_arr = np.array(test_dataframe[target_column_name])
-            logging.info(f"Conversion completed target column into numpy array.")
+            if self.get_best_model_path() == trained_model_file_path:
+                # trainer stage was reused from cache and its model is already the best model
+                logging.info(f"Trained model:[{trained_model_file_path}] is already the best model")
+                return ModelEvaluationArtifact(is_model_accepted=False,
+                                               evaluated_model_path=trained_model_file_path)
 
-            #dropping target column from the dataframe
-            logging.info(f"Dropping target column from the DataFrame")
-            train_dataframe.drop(target_column_name,axis=1,inplace=True)
-            test_dataframe.drop(target_column_name,axis=1,inplace=True)
-            logging.info(f"Dropping target column from the dataframe completed.")
+            trained_model_object = load_object(file_path=trained_model_file_path)
 
             model=self.get_best_model()
 
@@ -121,12 +213,26 @@ class ModelEvaluation:
                 logging.info(f"Model accepted.Model eval artifact {model_evaluation_artifact} created")
                 return model_evaluation_artifact
 
+            # trained model is scored from the in-sample predictions its trainer saved, the best model
+            # from the in-sample predictions of its own training run when they were made for the same
+            # targets, otherwise by predicting with it, so both are compared on the same quantity
+            trained_model_predictions = load_numpy_arrays(file_path=self.model_trainer_artifact.prediction_file_path)
+            train_target_arr = trained_model_predictions["y_train"]
+            test_target_arr = trained_model_predictions["y_test"]
+
+            best_model_predictions = self.get_best_model_predictions(y_train=train_target_arr,y_test=test_target_arr)
+            if best_model_predictions is None:
+                best_model_predictions = self.predict_with_best_model(model=model,
+                                                                      trained_model_object=trained_model_object)
+
             model_list =[model,trained_model_object]
 
-            metric_info_artifact = evaluate_regression_model(model_list=model_list,
-                                                X_train=train_dataframe,
+            metric_info_artifact = evaluate_regression_predictions(model_list=model_list,
+                                                train_prediction_list=[best_model_predictions["train_prediction"],
+                                                                       trained_model_predictions["train_prediction"]],
                                                 y_train=train_target_arr,
-                                                X_test=test_dataframe,
+                                                test_prediction_list=[best_model_predictions["test_prediction"],
+                                                                      trained_model_predictions["test_prediction"]],
                                                 y_test=test_target_arr,
                                                 base_accuracy=self.model_trainer_artifact.model_accuracy
                                                 )    
@@ -1,5 +1,5 @@
 import shutil
-from housing.entity.artifact_entity import ModelEvaluationArtifact, ModelPusherArtifact
+from housing.entity.artifact_entity import DataValidationArtifact, ModelEvaluationArtifact, ModelPusherArtifact
 from housing.entity.config_entity import ModelPusherConfig
 from housing.exception import HousingException
 from housing.logger import logging
@@ -9,11 +9,13 @@ from housing.constant import *
 class ModelPusher:
     
     def __init__(self,model_pusher_config:ModelPusherConfig,
-                model_evaluation_artifact:ModelEvaluationArtifact):
+                model_evaluation_artifact:ModelEvaluationArtifact,
+                data_validation_artifact:DataValidationArtifact=None):
         try:
             logging.info(f"{'='*30} Model Pusher log started{'='*30}")
             self.model_pusher_config= model_pusher_config
             self.model_evaluation_artifact = model_evaluation_artifact
+            self.data_validation_artifact = data_validation_artifact
 
         except Exception as e:
             raise HousingException(e,sys) from e
@@ -25,14 +27,29 @@ class ModelPusher:
             model_file_name = os.path.basename(evaluated_model_file_path)
             export_model_file_path = os.path.join(export_dir,model_file_name)
             logging.info(f"Exporting model file:[{export_model_file_path}]")
-            os.makedirs(export_dir,exist_ok=True)
 
-            shutil.copy(src=evaluated_model_file_path,dst=export_model_file_path)
+            # model is copied into a hidden staging dir which is renamed into place afterwards,
+            # so the serving side never observes a partially written model directory
+            staging_dir = os.path.join(os.path.dirname(export_dir),f".{os.path.basename(export_dir)}.tmp")
+            os.makedirs(staging_dir,exist_ok=True)
+            shutil.copy(src=evaluated_model_file_path,dst=os.path.join(staging_dir,model_file_name))
+
+            # sketch of the training data travels with the model, serving compares its traffic against it
+            reference_profile_file_path = None
+            if self.data_validation_artifact is not None and \
+                    os.path.exists(self.data_validation_artifact.train_sketch_file_path):
+                shutil.copy(src=self.data_validation_artifact.train_sketch_file_path,
+                            dst=os.path.join(staging_dir,MODEL_REFERENCE_PROFILE_FILE_NAME))
+                reference_profile_file_path = os.path.join(export_dir,MODEL_REFERENCE_PROFILE_FILE_NAME)
+            else:
+                logging.info("No train sketch found, model is exported without reference profile")
+            os.rename(staging_dir,export_dir)
             
             logging.info(f"Trained model:{evaluated_model_file_path} is copied in export dir:{export_model_file_path}")
 
             model_pusher_artifact = ModelPusherArtifact(is_model_pushed=True,
-                                            export_model_file_path=export_model_file_path)
+                                            export_model_file_path=export_model_file_path,
+                                            reference_profile_file_path=reference_profile_file_path)
             logging.info(f"Model Pusher artifact:[{model_pusher_artifact}]")
 
             return model_pusher_artifact
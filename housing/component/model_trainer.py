@@ -2,7 +2,7 @@ from typing import List
 
 from sklearn import preprocessing
 from housing.entity.model_factory import GridSearchedBestModel, MetricInfoArtifact,\
-     ModelFactory, evaluate_regression_model
+     ModelFactory, evaluate_regression_predictions
 from housing.exception import HousingException
 import os,sys
 from housing.logger import logging
@@ -10,20 +10,26 @@ from housing.entity.config_entity import DataTransformationConfig,ModelTrainerCo
 from housing.entity.artifact_entity import DataTransformationArtifact,ModelTrainerArtifact
 import numpy as np
 import pandas as pd
-from housing.util.util import load_object,save_object,load_numpy_array_data
+from housing.util.util import load_object,save_object,load_numpy_array_data,save_numpy_arrays,get_file_hash
 from housing.constant import *
 
 
 class HousingEstimatorModel:
 
-    def __init__(self,preprocessing_object,trained_model_object):
+    def __init__(self,preprocessing_object,trained_model_object,compiled_preprocessing_object=None,
+                 preprocessing_fingerprint:str=None):
         """
         TrainedModel constructor
         preprocessing_object: preprocessing_object
         trained_model_object: trained_model_object
+        compiled_preprocessing_object: optional CompiledPreprocessor of preprocessing_object
+        preprocessing_fingerprint: sha256 of the saved preprocessing_object, models with the same
+        fingerprint can be scored on the same transformed arrays
         """
         self.preprocessing_object= preprocessing_object
         self.trained_model_object = trained_model_object
+        self.compiled_preprocessing_object = compiled_preprocessing_object
+        self.preprocessing_fingerprint = preprocessing_fingerprint
 
     def predict(self,X):
         """
@@ -31,7 +37,11 @@ class HousingEstimatorModel:
         which gurantees that the inputs are in the same format as the training data
         At last it perform prediction on transformed features
         """
-        transformed_feature = self.preprocessing_object.transform(X)
+        compiled_preprocessing_object = getattr(self,"compiled_preprocessing_object",None)
+        if compiled_preprocessing_object is not None and isinstance(X,pd.DataFrame):
+            transformed_feature = compiled_preprocessing_object.transform(X)
+        else:
+            transformed_feature = self.preprocessing_object.transform(X)
         return self.trained_model_object.predict(transformed_feature)
 
     def __repr__(self) -> str:
@@ -64,22 +74,29 @@ class ModelTrainer:
             8. Returning model trainer artifact"""
         
         try:
-            logging.info(f"Loading transformed training dataset")
-            transformed_train_file_path = self.data_transformation_artifact.transformed_train_file_path
-            train_array = load_numpy_array_data(file_path=transformed_train_file_path)
+            # arrays are memory-mapped read only, so the trainer and parallel search workers
+            # share the same page cache pages instead of holding private copies
+            logging.info(f"Memory mapping transformed training dataset")
+            x_train = load_numpy_array_data(file_path=self.data_transformation_artifact.transformed_train_file_path,
+                                            mmap_mode="r")
+            y_train = load_numpy_array_data(
+                        file_path=self.data_transformation_artifact.transformed_train_target_file_path,
+                        mmap_mode="r")
             
-            logging.info(f"Loading transformed testing dataset")
-            transformed_test_file_path = self.data_transformation_artifact.transformed_test_file_path
-            test_array = load_numpy_array_data(file_path=transformed_test_file_path)
-
-            logging.info(f"Splitting training and testing dataset into input and target feature")
-            x_train,y_train,x_test,y_test=train_array[:,:-1],train_array[:,-1],test_array[:,:-1],test_array[:,-1]
+            logging.info(f"Memory mapping transformed testing dataset")
+            x_test = load_numpy_array_data(file_path=self.data_transformation_artifact.transformed_test_file_path,
+                                           mmap_mode="r")
+            y_test = load_numpy_array_data(
+                        file_path=self.data_transformation_artifact.transformed_test_target_file_path,
+                        mmap_mode="r")
 
             logging.info(f"Extracting model config file path")
             model_config_file_path = self.model_trainer_config.model_config_file_path
 
             logging.info(f"Initialising model factory class using above model config file:{model_config_file_path}")
-            model_factory = ModelFactory(model_config_path=model_config_file_path)
+            model_factory = ModelFactory(model_config_path=model_config_file_path,
+                                         fit_cache_dir=self.model_trainer_config.fit_cache_dir,
+                                         checkpoint_dir=self.model_trainer_config.search_checkpoint_dir)
 
             base_accuracy = self.model_trainer_config.base_accuracy
             logging.info(f"Expected accuracy:{base_accuracy}")
@@ -94,21 +111,46 @@ class ModelTrainer:
 
             model_list =[model.best_model for model in grid_searched_best_model]
 
+            # train scores are always in-sample predictions of the refit model, the train/test gap gate
+            # of evaluate_regression_predictions is calibrated for them and every candidate and the
+            # best model of earlier runs are compared on the same quantity
+            logging.info(f"Collecting training and testing dataset predictions of all trained models")
+            train_prediction_list = [model.predict(x_train) for model in model_list]
+            test_prediction_list = [model.predict(x_test) for model in model_list]
+
             logging.info(f"Evaluation all trained model on training and testing dataset both")
-            metric_info:MetricInfoArtifact =evaluate_regression_model(
+            metric_info:MetricInfoArtifact =evaluate_regression_predictions(
                                     model_list=model_list,
-                                    X_train=x_train,
+                                    train_prediction_list=train_prediction_list,
                                     y_train=y_train,
-                                    X_test=x_test,
+                                    test_prediction_list=test_prediction_list,
                                     y_test=y_test)
 
+            prediction_file_path = self.model_trainer_config.prediction_file_path
+            logging.info(f"Saving prediction artifact at path:{prediction_file_path}")
+            save_numpy_arrays(file_path=prediction_file_path,
+                              y_train=np.asarray(y_train),
+                              y_test=np.asarray(y_test),
+                              train_prediction=train_prediction_list[metric_info.index_number],
+                              test_prediction=test_prediction_list[metric_info.index_number],
+                              best_model_index=np.array(metric_info.index_number),
+                              candidate_train_predictions=np.vstack(train_prediction_list),
+                              candidate_test_predictions=np.vstack(test_prediction_list))
+
             logging.info(f"Best model found on  both training and testing dataset.")
             preprocessing_obj=load_object(file_path=self.data_transformation_artifact.preprocessed_object_file_path) 
+            compiled_preprocessing_obj = None
+            if self.data_transformation_artifact.compiled_preprocessed_object_file_path is not None:
+                compiled_preprocessing_obj = load_object(
+                    file_path=self.data_transformation_artifact.compiled_preprocessed_object_file_path)
             model_object = metric_info.model_object
 
             trained_model_file_path = self.model_trainer_config.trained_model_file_path
             housing_model = HousingEstimatorModel(preprocessing_object=preprocessing_obj,
-                                    trained_model_object=model_object)
+                                    trained_model_object=model_object,
+                                    compiled_preprocessing_object=compiled_preprocessing_obj,
+                                    preprocessing_fingerprint=get_file_hash(
+                                        self.data_transformation_artifact.preprocessed_object_file_path))
 
             logging.info(f"Saving model at path:{trained_model_file_path}")
             save_object(file_path=trained_model_file_path,obj=housing_model) 
@@ -120,7 +162,8 @@ class ModelTrainer:
                                     test_rmse  =metric_info.test_rmse,
                                     train_accuracy = metric_info.train_accuracy,
                                     test_accuracy = metric_info.test_accuracy,
-                                    model_accuracy = metric_info.model_accuracy)
+                                    model_accuracy = metric_info.model_accuracy,
+                                    prediction_file_path=prediction_file_path)
 
             logging.info(f"Model Trainer Artifact:{model_trainer_artifact}")
             return model_trainer_artifact
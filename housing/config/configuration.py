@@ -1,5 +1,5 @@
 from housing.entity.config_entity import DataIngestionConfig, DataTransformationConfig,DataValidationConfig,   \
-ModelTrainerConfig,ModelEvaluationConfig,ModelPusherConfig,TrainingPipelineConfig
+ModelTrainerConfig,ModelEvaluationConfig,ModelPusherConfig,TrainingPipelineConfig,PredictionConfig
 from housing.util.util import read_yaml_file
 from housing.logger import logging
 import sys,os
@@ -38,6 +38,10 @@ class Configuartion:
             tgz_download_dir = os.path.join(data_ingestion_artifact_dir,
                             data_ingestion_info[DATA_INGESTION_TGZ_DOWNLOAD_DIR_KEY])
             
+            # download cache is shared across runs, so it is not placed under the time stamped dir
+            download_cache_dir = os.path.join(artifact_dir,
+                            data_ingestion_info[DATA_INGESTION_DOWNLOAD_CACHE_DIR_KEY])
+
             raw_data_dir = os.path.join(data_ingestion_artifact_dir,
                         data_ingestion_info[DATA_INGESTION_RAW_DATA_DIR_KEY]
                         )
@@ -57,7 +61,13 @@ class Configuartion:
                 tgz_download_dir=tgz_download_dir,
                 raw_data_dir=raw_data_dir,
                 ingested_train_dir=ingested_train_dir,
-                ingested_test_dir=ingested_test_dir)
+                ingested_test_dir=ingested_test_dir,
+                download_cache_dir=download_cache_dir,
+                streaming_ingestion=data_ingestion_info.get(DATA_INGESTION_STREAMING_KEY,False),
+                streaming_chunk_size=data_ingestion_info.get(DATA_INGESTION_STREAMING_CHUNK_SIZE_KEY,100000),
+                ingested_file_format=data_ingestion_info.get(DATA_INGESTION_FILE_FORMAT_KEY,CSV_FILE_FORMAT),
+                export_csv=data_ingestion_info.get(DATA_INGESTION_EXPORT_CSV_KEY,False),
+                schema_file_path=self.get_data_validation_config().schema_file_path)
             logging.info(f"Data Ingestion config:{data_ingestion_config}")
             return data_ingestion_config
         except Exception as e:
@@ -83,11 +93,30 @@ class Configuartion:
 
             report_page_file_path = os.path.join(data_validation_artifact_dir,
                                     data_validation_config[DATA_VALIDATION_REPORT_PAGE_FILE_NAME_KEY])
+
+            train_sketch_file_path = os.path.join(data_validation_artifact_dir,
+                                    data_validation_config.get(DATA_VALIDATION_TRAIN_SKETCH_FILE_NAME_KEY,
+                                                               "train_sketch.json"))
+
+            test_sketch_file_path = os.path.join(data_validation_artifact_dir,
+                                    data_validation_config.get(DATA_VALIDATION_TEST_SKETCH_FILE_NAME_KEY,
+                                                               "test_sketch.json"))
+
+            previous_run_report_file_path = os.path.join(data_validation_artifact_dir,
+                                    data_validation_config.get(DATA_VALIDATION_PREVIOUS_RUN_REPORT_FILE_NAME_KEY,
+                                                               "previous_run_report.json"))
            
             data_validation_config = DataValidationConfig(
                 schema_file_path=schema_file_path,
                 report_file_path=report_file_path,
-                report_page_file_path=report_page_file_path
+                report_page_file_path=report_page_file_path,
+                drift_p_value_threshold=data_validation_config.get(DATA_VALIDATION_DRIFT_P_VALUE_THRESHOLD_KEY,0.05),
+                drift_share_threshold=data_validation_config.get(DATA_VALIDATION_DRIFT_SHARE_THRESHOLD_KEY,0.5),
+                drift_histogram_bins=data_validation_config.get(DATA_VALIDATION_DRIFT_HISTOGRAM_BINS_KEY,10),
+                chunk_size=data_validation_config.get(DATA_VALIDATION_CHUNK_SIZE_KEY,100000),
+                train_sketch_file_path=train_sketch_file_path,
+                test_sketch_file_path=test_sketch_file_path,
+                previous_run_report_file_path=previous_run_report_file_path
             )
             return data_validation_config
         except Exception as e:
@@ -113,6 +142,12 @@ class Configuartion:
                                             data_transformation_config_info[DATA_TRANSFORMATION_PREPROCESSING_DIR_KEY],
                                             data_transformation_config_info[DATA_TRANSFORMATION_PREPROCESSED_FILE_NAME_KEY]
                                             )
+
+            compiled_preprocessed_object_file_path = os.path.join(
+                                            data_transformation_artifact_dir,
+                                            data_transformation_config_info[DATA_TRANSFORMATION_PREPROCESSING_DIR_KEY],
+                                            data_transformation_config_info[DATA_TRANSFORMATION_COMPILED_PREPROCESSED_FILE_NAME_KEY]
+                                            )
             
             transformed_train_dir = os.path.join(
                                     data_transformation_artifact_dir,
@@ -125,6 +160,12 @@ class Configuartion:
                                     data_transformation_config_info[DATA_TRANSFORMATION_DIR_NAME_KEY],
                                     data_transformation_config_info[DATA_TRANSFORMATION_TEST_DIR_NAME_KEY]
                                     )
+
+            # fitted preprocessors are shared across runs, so the cache is not under the timestamped directory
+            preprocessor_cache_dir = os.path.join(artifact_dir,
+                                    DATA_TRANSFORMATION_ARTIFACT_DIR,
+                                    data_transformation_config_info.get(DATA_TRANSFORMATION_PREPROCESSOR_CACHE_DIR_KEY,
+                                                                        "preprocessor_cache"))
             
             
 
@@ -132,7 +173,9 @@ class Configuartion:
                                         add_bedroom_per_room=add_bedroom_per_room,
                                         transformed_train_dir=transformed_train_dir,
                                         transformed_test_dir=transformed_test_dir,
-                                        preprocessed_object_file_path=preprocessed_object_file_path)
+                                        preprocessed_object_file_path=preprocessed_object_file_path,
+                                        compiled_preprocessed_object_file_path=compiled_preprocessed_object_file_path,
+                                        preprocessor_cache_dir=preprocessor_cache_dir)
             
             logging.info(f"Data transformation config:{data_transformation_config}")
             return data_transformation_config
@@ -155,15 +198,30 @@ class Configuartion:
                                     model_trainer_config_info[MODEL_TRAINER_TRAINED_MODEL_DIR_KEY],
                                     model_trainer_config_info[MODEL_TRAINER_TRAINED_MODEL_FILE_NAME_KEY])
             
+            # predictions are kept next to the model, so they travel with it once it becomes the best model
+            prediction_file_path = os.path.join(os.path.dirname(trained_model_file_path),
+                                    model_trainer_config_info[MODEL_TRAINER_PREDICTION_FILE_NAME_KEY])
+
             base_accuracy= model_trainer_config_info[MODEL_TRAINER_BASE_ACCURACY_KEY]
             
             model_config_file_path=os.path.join(model_trainer_config_info[MODEL_TRAINER_MODEL_CONFIG_DIR_KEY],
                                     model_trainer_config_info[MODEL_TRAINER_MODEL_CONFIG_FILE_NAME_KEY])
 
+            # fit results are shared across runs, so the cache is not under the timestamped directory
+            fit_cache_dir = os.path.join(artifact_dir,
+                                    MODEL_TRAINER_ARTIFACT_DIR,
+                                    model_trainer_config_info[MODEL_TRAINER_FIT_CACHE_DIR_KEY])
+
+            search_checkpoint_dir = os.path.join(model_trainer_artifact_dir,
+                                    model_trainer_config_info[MODEL_TRAINER_SEARCH_CHECKPOINT_DIR_KEY])
+
             model_trainer_config = ModelTrainerConfig(
                                 trained_model_file_path=trained_model_file_path,
                                 base_accuracy=base_accuracy,
-                                model_config_file_path=model_config_file_path)
+                                model_config_file_path=model_config_file_path,
+                                fit_cache_dir=fit_cache_dir,
+                                search_checkpoint_dir=search_checkpoint_dir,
+                                prediction_file_path=prediction_file_path)
             
             logging.info(f"Model trainer config:{model_trainer_config}")
             return model_trainer_config
@@ -201,6 +259,31 @@ class Configuartion:
         except Exception as e:
             raise HousingException(e,sys) from e
 
+    def get_prediction_config(self) -> PredictionConfig:
+        try:
+            prediction_config_info = self.config_info[PREDICTION_CONFIG_KEY]
+            schema_file_path = self.get_data_validation_config().schema_file_path
+
+            prediction_config = PredictionConfig(
+                schema_file_path=schema_file_path,
+                max_batch_size=int(prediction_config_info[PREDICTION_MAX_BATCH_SIZE_KEY]),
+                micro_batch_max_size=int(prediction_config_info[PREDICTION_MICRO_BATCH_MAX_SIZE_KEY]),
+                micro_batch_max_wait_ms=float(prediction_config_info[PREDICTION_MICRO_BATCH_MAX_WAIT_MS_KEY]),
+                traffic_profile_dir=os.path.join(ROOT_DIR,
+                    prediction_config_info.get(PREDICTION_TRAFFIC_PROFILE_DIR_KEY,"traffic_profiles")),
+                traffic_profile_window_seconds=int(
+                    prediction_config_info.get(PREDICTION_TRAFFIC_PROFILE_WINDOW_SECONDS_KEY,3600)),
+                traffic_profile_flush_interval=float(
+                    prediction_config_info.get(PREDICTION_TRAFFIC_PROFILE_FLUSH_INTERVAL_KEY,30)),
+                traffic_drift_report_dir=os.path.join(ROOT_DIR,
+                    prediction_config_info.get(PREDICTION_TRAFFIC_DRIFT_REPORT_DIR_KEY,"traffic_drift")),
+                traffic_drift_lookback_seconds=int(
+                    prediction_config_info.get(PREDICTION_TRAFFIC_DRIFT_LOOKBACK_SECONDS_KEY,86400)))
+            logging.info(f"Prediction config:{prediction_config}")
+            return prediction_config
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
     def get_training_pipeline_config(self) ->TrainingPipelineConfig:
         try:
             training_pipeline_config = self.config_info[TRAINING_PIPELINE_CONFIG_KEY]
@@ -209,7 +292,16 @@ class Configuartion:
             training_pipeline_config[TRAINING_PIPELINE_ARTIFACT_DIR_KEY]
             )
 
-            training_pipeline_config = TrainingPipelineConfig(artifact_dir=artifact_dir)
+            stage_cache_dir = os.path.join(artifact_dir,
+                                    training_pipeline_config[TRAINING_PIPELINE_STAGE_CACHE_DIR_KEY])
+            use_stage_cache = training_pipeline_config.get(TRAINING_PIPELINE_USE_STAGE_CACHE_KEY,False)
+            checkpoint_dir = os.path.join(artifact_dir,
+                                    training_pipeline_config[TRAINING_PIPELINE_CHECKPOINT_DIR_KEY])
+
+            training_pipeline_config = TrainingPipelineConfig(artifact_dir=artifact_dir,
+                                                            stage_cache_dir=stage_cache_dir,
+                                                            use_stage_cache=use_stage_cache,
+                                                            checkpoint_dir=checkpoint_dir)
             logging.info(f"Training pipleine config: {training_pipeline_config}")
             return training_pipeline_config
         except Exception as e:
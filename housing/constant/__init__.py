@@ -16,6 +16,9 @@ CURRENT_TIME_STAMP = get_current_time_stamp()
 TRAINING_PIPELINE_CONFIG_KEY = "training_pipeline_config"
 TRAINING_PIPELINE_ARTIFACT_DIR_KEY = "artifact_dir"
 TRAINING_PIPELINE_NAME_KEY = "pipeline_name"
+TRAINING_PIPELINE_STAGE_CACHE_DIR_KEY = "stage_cache_dir"
+TRAINING_PIPELINE_USE_STAGE_CACHE_KEY = "use_stage_cache"
+TRAINING_PIPELINE_CHECKPOINT_DIR_KEY = "checkpoint_dir"
 
 #Data Ingestion related variable
 DATA_INGESTION_ARTIFACT_DIR="data_ingestion"
@@ -23,9 +26,19 @@ DATA_INGESTION_CONFIG_KEY="data_ingestion_config"
 DATA_INGESTION_DOWNLOAD_URL_KEY="dataset_download_url"
 DATA_INGESTION_RAW_DATA_DIR_KEY="raw_data_dir"
 DATA_INGESTION_TGZ_DOWNLOAD_DIR_KEY="tgz_download_dir"
+DATA_INGESTION_DOWNLOAD_CACHE_DIR_KEY="download_cache_dir"
 DATA_INGESTION_INGESTED_DIR_NAME_KEY="ingested_dir"
 DATA_INGESTION_TRAIN_DIR_KEY="ingested_train_dir"
 DATA_INGESTION_TEST_DIR_KEY="ingested_test_dir"
+DATA_INGESTION_STREAMING_KEY="streaming_ingestion"
+DATA_INGESTION_STREAMING_CHUNK_SIZE_KEY="streaming_chunk_size"
+DATA_INGESTION_FILE_FORMAT_KEY="ingested_file_format"
+DATA_INGESTION_EXPORT_CSV_KEY="export_csv"
+
+CSV_FILE_FORMAT="csv"
+PARQUET_FILE_FORMAT="parquet"
+FEATHER_FILE_FORMAT="feather"
+DATAFRAME_FILE_FORMATS=[CSV_FILE_FORMAT,PARQUET_FILE_FORMAT,FEATHER_FILE_FORMAT]
 
 #Data Validation related variables
 DATA_VALIDATION_CONFIG_KEY = "data_validation_config"
@@ -34,6 +47,13 @@ DATA_VALIDATION_SCHEMA_DIR_KEY= "schema_dir"
 DATA_VALIDATION_ARTIFACT_DIR_NAME = "data_validation"
 DATA_VALIDATION_REPORT_FILE_NAME_KEY= "report_file_name"
 DATA_VALIDATION_REPORT_PAGE_FILE_NAME_KEY = "report_page_file_name"
+DATA_VALIDATION_DRIFT_P_VALUE_THRESHOLD_KEY = "drift_p_value_threshold"
+DATA_VALIDATION_DRIFT_SHARE_THRESHOLD_KEY = "drift_share_threshold"
+DATA_VALIDATION_DRIFT_HISTOGRAM_BINS_KEY = "drift_histogram_bins"
+DATA_VALIDATION_CHUNK_SIZE_KEY = "chunk_size"
+DATA_VALIDATION_TRAIN_SKETCH_FILE_NAME_KEY = "train_sketch_file_name"
+DATA_VALIDATION_TEST_SKETCH_FILE_NAME_KEY = "test_sketch_file_name"
+DATA_VALIDATION_PREVIOUS_RUN_REPORT_FILE_NAME_KEY = "previous_run_report_file_name"
 
 #Data Transformation related variables
 DATA_TRANSFORMATION_ARTIFACT_DIR = "data_transformation"
@@ -44,6 +64,8 @@ DATA_TRANSFORMATION_TRAIN_DIR_NAME_KEY = "transformed_train_dir"
 DATA_TRANSFORMATION_TEST_DIR_NAME_KEY = "transformed_test_dir"
 DATA_TRANSFORMATION_PREPROCESSING_DIR_KEY = "preprocessing_dir"
 DATA_TRANSFORMATION_PREPROCESSED_FILE_NAME_KEY = "preprocessed_object_file_name"
+DATA_TRANSFORMATION_COMPILED_PREPROCESSED_FILE_NAME_KEY = "compiled_preprocessed_object_file_name"
+DATA_TRANSFORMATION_PREPROCESSOR_CACHE_DIR_KEY = "preprocessor_cache_dir"
 
 
 COLUMN_TOTAL_ROOMS="total_rooms"
@@ -59,6 +81,10 @@ CATEGORICAL_COLUMN_KEY = "categorical_columns"
 TARGET_COLUMN_KEY="target_column"
 
 DOMAIN_VALUE_KEY="domain_value"
+NULLABLE_COLUMN_KEY="nullable_columns"
+VALUE_RANGE_KEY="value_range"
+VALUE_RANGE_MIN_KEY="min"
+VALUE_RANGE_MAX_KEY="max"
 OCEAN_PROXIMITY_KEY="ocean_proximity"
 
 # Model Training related variables
@@ -70,6 +96,9 @@ MODEL_TRAINER_TRAINED_MODEL_FILE_NAME_KEY = "model_file_name"
 MODEL_TRAINER_BASE_ACCURACY_KEY = "base_accuracy"
 MODEL_TRAINER_MODEL_CONFIG_DIR_KEY = "model_config_dir"
 MODEL_TRAINER_MODEL_CONFIG_FILE_NAME_KEY = "model_config_file_name"
+MODEL_TRAINER_FIT_CACHE_DIR_KEY = "fit_cache_dir"
+MODEL_TRAINER_SEARCH_CHECKPOINT_DIR_KEY = "search_checkpoint_dir"
+MODEL_TRAINER_PREDICTION_FILE_NAME_KEY = "prediction_file_name"
 
 # Model Evaluation related variables
 MODEL_EVALUATION_CONFIG_KEY= "model_evaluation_config"
@@ -83,6 +112,25 @@ HISTORY_KEY = "history"
 # Model Pusher
 MODEL_PUSHER_CONFIG_KEY = "model_pusher_config"
 MODEL_PUSHER_MODEL_EXPORT_DIR_KEY = "model_export_dir" 
+# train dataset sketch shipped with each exported model, the reference of drift against prediction traffic
+MODEL_REFERENCE_PROFILE_FILE_NAME = "reference_profile.json"
 
 EXPERIMENT_DIR_NAME="experiment"
-EXPERIMENT_FILE_NAME="experiment.csv"
\ No newline at end of file
+EXPERIMENT_FILE_NAME="experiment.csv"
+EXPERIMENT_DB_FILE_NAME="experiment.db"
+TRAINING_JOB_QUEUE_FILE_NAME="training_queue.db"
+TRAINING_LOCK_DIR_NAME="locks"
+
+# Model serving related variables
+MODEL_RELOAD_INTERVAL_SECONDS = 5
+PREDICTION_CONFIG_KEY = "prediction_config"
+PREDICTION_MAX_BATCH_SIZE_KEY = "max_batch_size"
+PREDICTION_MICRO_BATCH_MAX_SIZE_KEY = "micro_batch_max_size"
+PREDICTION_MICRO_BATCH_MAX_WAIT_MS_KEY = "micro_batch_max_wait_ms"
+PREDICTION_TRAFFIC_PROFILE_DIR_KEY = "traffic_profile_dir"
+PREDICTION_TRAFFIC_PROFILE_WINDOW_SECONDS_KEY = "traffic_profile_window_seconds"
+PREDICTION_TRAFFIC_PROFILE_FLUSH_INTERVAL_KEY = "traffic_profile_flush_interval_seconds"
+PREDICTION_TRAFFIC_DRIFT_REPORT_DIR_KEY = "traffic_drift_report_dir"
+PREDICTION_TRAFFIC_DRIFT_LOOKBACK_SECONDS_KEY = "traffic_drift_lookback_seconds"
+TRAFFIC_DRIFT_REPORT_FILE_NAME = "report.json"
+TRAFFIC_DRIFT_REPORT_PAGE_FILE_NAME = "report.html"
@@ -5,18 +5,21 @@ DataIngestionArtifact= namedtuple("DataIngestionArtifact",
 ["train_file_path","test_file_path","is_ingested","message"])
 
 DataValidationArtifact = namedtuple("DataValidationArtifact",
-["schema_file_path","report_file_path","report_page_file_path","is_validated","message"])
+["schema_file_path","report_file_path","report_page_file_path","train_sketch_file_path","test_sketch_file_path",
+ "is_validated","message"])
 
 DataTransformationArtifact = namedtuple("DataTransformationArtifact",
  ["is_transformed", "message", "transformed_train_file_path","transformed_test_file_path",
-     "preprocessed_object_file_path"])
+     "transformed_train_target_file_path","transformed_test_target_file_path",
+     "preprocessed_object_file_path", "compiled_preprocessed_object_file_path"])
 
 ModelTrainerArtifact = namedtuple("ModelTrainerArtifact", 
                             ["is_trained", "message", "trained_model_file_path",
                             "train_rmse", "test_rmse", "train_accuracy", "test_accuracy",
-                              "model_accuracy"])
+                              "model_accuracy", "prediction_file_path"])
 
 ModelEvaluationArtifact = namedtuple("ModelEvaluationArtifact",
                          ["is_model_accepted", "evaluated_model_path"])
 
-ModelPusherArtifact = namedtuple("ModelPusherArtifact", ["is_model_pushed", "export_model_file_path"])
+ModelPusherArtifact = namedtuple("ModelPusherArtifact", ["is_model_pushed", "export_model_file_path",
+                                                         "reference_profile_file_path"])
@@ -2,26 +2,45 @@ from collections import namedtuple
 
 
 DataIngestionConfig=namedtuple("DataIngestionConfig",
-["dataset_download_url","tgz_download_dir","raw_data_dir","ingested_train_dir","ingested_test_dir"])
+["dataset_download_url","tgz_download_dir","raw_data_dir","ingested_train_dir","ingested_test_dir",
+ "download_cache_dir","streaming_ingestion","streaming_chunk_size","ingested_file_format","export_csv",
+ "schema_file_path"])
 
 
 DataValidationConfig = namedtuple("DataValidationConfig", ["schema_file_path",
                                     "report_file_path",
-                                    "report_page_file_path"])
+                                    "report_page_file_path",
+                                    "drift_p_value_threshold",
+                                    "drift_share_threshold",
+                                    "drift_histogram_bins",
+                                    "chunk_size",
+                                    "train_sketch_file_path",
+                                    "test_sketch_file_path",
+                                    "previous_run_report_file_path"])
 
 DataTransformationConfig = namedtuple("DataTransformationConfig", ["add_bedroom_per_room",
                                                                    "transformed_train_dir",
                                                                    "transformed_test_dir",
-                                                                   "preprocessed_object_file_path"])
+                                                                   "preprocessed_object_file_path",
+                                                                   "compiled_preprocessed_object_file_path",
+                                                                   "preprocessor_cache_dir"])
 
 
 ModelTrainerConfig = namedtuple("ModelTrainerConfig", 
                                 ["trained_model_file_path",
-                                "base_accuracy","model_config_file_path"])
+                                "base_accuracy","model_config_file_path","fit_cache_dir",
+                                "search_checkpoint_dir","prediction_file_path"])
 
 ModelEvaluationConfig = namedtuple("ModelEvaluationConfig", ["model_evaluation_file_path","time_stamp"])
 
 
 ModelPusherConfig = namedtuple("ModelPusherConfig", ["export_dir_path"])
 
-TrainingPipelineConfig = namedtuple("TrainingPipelineConfig", ["artifact_dir"])
\ No newline at end of file
+TrainingPipelineConfig = namedtuple("TrainingPipelineConfig", ["artifact_dir","stage_cache_dir","use_stage_cache",
+                                                               "checkpoint_dir"])
+
+PredictionConfig = namedtuple("PredictionConfig", ["schema_file_path","max_batch_size",
+                                                   "micro_batch_max_size","micro_batch_max_wait_ms",
+                                                   "traffic_profile_dir","traffic_profile_window_seconds",
+                                                   "traffic_profile_flush_interval",
+                                                   "traffic_drift_report_dir","traffic_drift_lookback_seconds"])
\ No newline at end of file
@@ -0,0 +1,294 @@
+import os,sys
+import html
+import json
+from collections import namedtuple
+from datetime import datetime
+import numpy as np
+from scipy import stats
+from housing.exception import HousingException
+from housing.entity.data_sketch import CategoricalSketch, DatasetSketch, NumericalSketch
+
+NUMERICAL_COLUMN_TYPE = "numerical"
+CATEGORICAL_COLUMN_TYPE = "categorical"
+KS_TEST_NAME = "ks"
+CHI_SQUARE_TEST_NAME = "chi_square"
+# floor of bin shares in the population stability index, so empty bins do not make it infinite
+PSI_MIN_SHARE = 1e-4
+# values outside the heavy hitters of categorical sketches
+OTHER_CATEGORY = "__other__"
+
+# bins: upper edges of the histogram bins of numerical columns, categories of categorical columns
+# reference_counts, current_counts: rows of each dataset per bin or category
+ColumnDrift = namedtuple("ColumnDrift", ["column", "column_type", "test", "statistic", "p_value", "psi",
+                                         "drift_detected", "bins", "reference_counts", "current_counts",
+                                         "reference_null_count", "current_null_count"])
+
+DataDriftReport = namedtuple("DataDriftReport", ["created_at", "reference_rows", "current_rows",
+                                                 "p_value_threshold", "drift_share_threshold",
+                                                 "number_of_columns", "number_of_drifted_columns",
+                                                 "share_of_drifted_columns", "dataset_drift", "column_drifts"])
+
+
+def get_population_stability_index(reference_counts:np.ndarray,current_counts:np.ndarray)->float:
+    reference_counts = np.asarray(reference_counts,dtype=float)
+    current_counts = np.asarray(current_counts,dtype=float)
+    reference_share = np.clip(reference_counts/max(reference_counts.sum(),1),PSI_MIN_SHARE,None)
+    current_share = np.clip(current_counts/max(current_counts.sum(),1),PSI_MIN_SHARE,None)
+    return float(np.sum((current_share-reference_share)*np.log(current_share/reference_share)))
+
+
+def get_ks_p_value(statistic:float,reference_rows:int,current_rows:int)->float:
+    # asymptotic two sample distribution, as scipy's ks_2samp uses for large samples
+    effective_rows = reference_rows*current_rows/(reference_rows+current_rows)
+    return float(np.clip(stats.kstwo.sf(statistic,np.round(effective_rows)),0.0,1.0))
+
+
+def get_chi_square_test(reference_counts:np.ndarray,current_counts:np.ndarray):
+    """
+    Chi-square test of homogeneity of the 2 x categories contingency table
+    return: (statistic, p value)
+    """
+    observed = np.vstack([reference_counts,current_counts]).astype(float)
+    observed = observed[:,observed.sum(axis=0) > 0]
+    expected = observed.sum(axis=1,keepdims=True)*observed.sum(axis=0,keepdims=True)/observed.sum()
+    statistic = float(np.sum((observed-expected)**2/expected))
+    return statistic,float(stats.chi2.sf(statistic,observed.shape[1]-1))
+
+
+def get_numerical_column_drift(column:str,reference_sketch:NumericalSketch,current_sketch:NumericalSketch,
+                               bins:int,p_value_threshold:float)->ColumnDrift:
+    """
+    KS statistic on the bucket boundaries of both quantile sketches, so it is exact up to the mass of one
+    bucket, and PSI on reference quantile bins made of whole buckets
+    """
+    reference_keys,reference_bucket_counts = reference_sketch.get_buckets()
+    current_keys,current_bucket_counts = current_sketch.get_buckets()
+    keys = np.union1d(reference_keys,current_keys)
+    reference_counts = current_counts = np.array([],dtype=np.int64)
+    bin_edges = np.array([])
+    statistic,p_value = None,None
+    if reference_sketch.count > 0 and current_sketch.count > 0:
+        reference_cdf = np.cumsum(np.bincount(np.searchsorted(keys,reference_keys),weights=reference_bucket_counts,
+                                              minlength=len(keys)))/reference_sketch.count
+        current_cdf = np.cumsum(np.bincount(np.searchsorted(keys,current_keys),weights=current_bucket_counts,
+                                            minlength=len(keys)))/current_sketch.count
+        statistic = float(np.max(np.abs(reference_cdf-current_cdf)))
+        p_value = get_ks_p_value(statistic,reference_sketch.count,current_sketch.count)
+    if reference_sketch.count > 0:
+        boundary_keys = np.unique(reference_sketch.get_keys(
+            reference_sketch.get_quantiles(np.linspace(0,1,bins+1)[1:-1])))
+        bin_edges = reference_sketch.get_bucket_upper_bounds(boundary_keys)
+        # bin i holds the buckets after boundary i-1 up to and including boundary i
+        reference_counts = np.bincount(np.searchsorted(boundary_keys,reference_keys,side="left"),
+                                       weights=reference_bucket_counts,minlength=len(boundary_keys)+1)
+        current_counts = np.bincount(np.searchsorted(boundary_keys,current_keys,side="left"),
+                                     weights=current_bucket_counts,minlength=len(boundary_keys)+1)
+    return ColumnDrift(column=column,
+                       column_type=NUMERICAL_COLUMN_TYPE,
+                       test=KS_TEST_NAME,
+                       statistic=statistic,
+                       p_value=p_value,
+                       psi=get_population_stability_index(reference_counts,current_counts)
+                       if len(reference_counts) > 0 else None,
+                       drift_detected=p_value is not None and p_value < p_value_threshold,
+                       bins=bin_edges.tolist(),
+                       reference_counts=reference_counts.astype(np.int64).tolist(),
+                       current_counts=current_counts.astype(np.int64).tolist(),
+                       reference_null_count=reference_sketch.null_count,
+                       current_null_count=current_sketch.null_count)
+
+
+def get_categorical_column_drift(column:str,reference_sketch:CategoricalSketch,current_sketch:CategoricalSketch,
+                                 p_value_threshold:float)->ColumnDrift:
+    """
+    Chi-square test and PSI on the heavy hitters of both sketches, values which are not tracked
+    are counted together as one other category
+    """
+    categories = sorted(set(reference_sketch.value_counts) | set(current_sketch.value_counts))
+    reference_counts = [reference_sketch.value_counts.get(category,0) for category in categories]
+    current_counts = [current_sketch.value_counts.get(category,0) for category in categories]
+    if reference_sketch.get_other_count() > 0 or current_sketch.get_other_count() > 0:
+        categories.append(OTHER_CATEGORY)
+        reference_counts.append(reference_sketch.get_other_count())
+        current_counts.append(current_sketch.get_other_count())
+    reference_counts = np.array(reference_counts,dtype=np.int64)
+    current_counts = np.array(current_counts,dtype=np.int64)
+    statistic,p_value = None,None
+    if len(categories) > 1 and reference_counts.sum() > 0 and current_counts.sum() > 0:
+        statistic,p_value = get_chi_square_test(reference_counts,current_counts)
+    return ColumnDrift(column=column,
+                       column_type=CATEGORICAL_COLUMN_TYPE,
+                       test=CHI_SQUARE_TEST_NAME,
+                       statistic=statistic,
+                       p_value=p_value,
+                       psi=get_population_stability_index(reference_counts,current_counts),
+                       drift_detected=p_value is not None and p_value < p_value_threshold,
+                       bins=categories,
+                       reference_counts=reference_counts.tolist(),
+                       current_counts=current_counts.tolist(),
+                       reference_null_count=reference_sketch.null_count,
+                       current_null_count=current_sketch.null_count)
+
+
+class DataDriftDetector:
+    """
+    Compares the distribution of every column of a current dataset with a reference dataset from their
+    DatasetSketches, so neither dataset has to be in memory and a saved sketch of any earlier run can serve
+    as reference. Numerical columns use the two sample Kolmogorov-Smirnov test on the quantile sketch buckets
+    and the population stability index on reference quantile bins, categorical columns the chi-square test
+    on heavy hitter counts. The dataset drifts once the share of drifted columns reaches drift_share_threshold.
+    One DataDriftReport serves both the json report and the html page.
+    """
+
+    def __init__(self,numerical_columns:list,categorical_columns:list,p_value_threshold:float=0.05,
+                 drift_share_threshold:float=0.5,bins:int=10):
+        try:
+            self.numerical_columns = numerical_columns
+            self.categorical_columns = categorical_columns
+            self.p_value_threshold = p_value_threshold
+            self.drift_share_threshold = drift_share_threshold
+            self.bins = bins
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_dataset_sketch(self)->DatasetSketch:
+        """
+        Empty sketch of the compared columns, to be updated chunk by chunk
+        """
+        return DatasetSketch(numerical_columns=self.numerical_columns,categorical_columns=self.categorical_columns)
+
+    def get_data_drift_report(self,reference_sketch:DatasetSketch,current_sketch:DatasetSketch)->DataDriftReport:
+        try:
+            column_drifts = dict()
+            for column in self.numerical_columns+self.categorical_columns:
+                reference_column_sketch = reference_sketch.column_sketches.get(column)
+                current_column_sketch = current_sketch.column_sketches.get(column)
+                if reference_column_sketch is None or current_column_sketch is None \
+                        or type(reference_column_sketch) != type(current_column_sketch):
+                    continue
+                if isinstance(reference_column_sketch,NumericalSketch):
+                    column_drifts[column] = get_numerical_column_drift(column,reference_column_sketch,
+                                                                       current_column_sketch,
+                                                                       bins=self.bins,
+                                                                       p_value_threshold=self.p_value_threshold)
+                else:
+                    column_drifts[column] = get_categorical_column_drift(column,reference_column_sketch,
+                                                                         current_column_sketch,
+                                                                         p_value_threshold=self.p_value_threshold)
+            return self.get_report(column_drifts=column_drifts,reference_rows=reference_sketch.row_count,
+                                   current_rows=current_sketch.row_count)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_report(self,column_drifts:dict,reference_rows:int,current_rows:int)->DataDriftReport:
+        number_of_drifted_columns = sum(column_drift.drift_detected for column_drift in column_drifts.values())
+        share_of_drifted_columns = number_of_drifted_columns/len(column_drifts) if len(column_drifts) > 0 else 0.0
+        return DataDriftReport(created_at=datetime.now().isoformat(sep=" "),
+                               reference_rows=reference_rows,
+                               current_rows=current_rows,
+                               p_value_threshold=self.p_value_threshold,
+                               drift_share_threshold=self.drift_share_threshold,
+                               number_of_columns=len(column_drifts),
+                               number_of_drifted_columns=number_of_drifted_columns,
+                               share_of_drifted_columns=share_of_drifted_columns,
+                               dataset_drift=len(column_drifts) > 0 and
+                               share_of_drifted_columns >= self.drift_share_threshold,
+                               column_drifts=column_drifts)
+
+    @staticmethod
+    def to_dict(report:DataDriftReport)->dict:
+        report_data = report._asdict()
+        report_data["column_drifts"] = {column:column_drift._asdict()
+                                        for column,column_drift in report.column_drifts.items()}
+        return report_data
+
+    @staticmethod
+    def save_report(report:DataDriftReport,report_file_path:str):
+        try:
+            os.makedirs(os.path.dirname(report_file_path),exist_ok=True)
+            with open(report_file_path,"w") as report_file:
+                json.dump(DataDriftDetector.to_dict(report),report_file,indent=6)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    @staticmethod
+    def get_histogram_html(column_drift:ColumnDrift)->str:
+        """
+        Side by side bars of reference and current shares per bin
+        """
+        reference_total = max(sum(column_drift.reference_counts),1)
+        current_total = max(sum(column_drift.current_counts),1)
+        if column_drift.column_type == NUMERICAL_COLUMN_TYPE:
+            edges = [f"{edge:.4g}" for edge in column_drift.bins]
+            labels = [f"<= {edges[0]}" if len(edges) > 0 else "all"] + \
+                [f"{low} - {high}" for low,high in zip(edges[:-1],edges[1:])] + \
+                ([f"> {edges[-1]}"] if len(edges) > 0 else [])
+        else:
+            labels = column_drift.bins
+        rows = []
+        for label,reference_count,current_count in zip(labels,column_drift.reference_counts,
+                                                        column_drift.current_counts):
+            reference_share = 100*reference_count/reference_total
+            current_share = 100*current_count/current_total
+            rows.append(f"<tr><td>{html.escape(str(label))}</td>"
+                        f"<td><div class='bar reference' style='width:{reference_share:.1f}%'></div></td>"
+                        f"<td><div class='bar current' style='width:{current_share:.1f}%'></div></td>"
+                        f"<td>{reference_share:.1f}% / {current_share:.1f}%</td></tr>")
+        return f"<table class='histogram'>{''.join(rows)}</table>"
+
+    @staticmethod
+    def save_report_page(report:DataDriftReport,report_page_file_path:str):
+        try:
+            def format_number(value):
+                return "-" if value is None else f"{value:.4g}"
+
+            rows = []
+            for column_drift in report.column_drifts.values():
+                rows.append(f"<tr class='{'drift' if column_drift.drift_detected else ''}'>"
+                            f"<td>{html.escape(column_drift.column)}</td>"
+                            f"<td>{column_drift.column_type}</td>"
+                            f"<td>{column_drift.test}</td>"
+                            f"<td>{format_number(column_drift.statistic)}</td>"
+                            f"<td>{format_number(column_drift.p_value)}</td>"
+                            f"<td>{format_number(column_drift.psi)}</td>"
+                            f"<td>{column_drift.reference_null_count} / {column_drift.current_null_count}</td>"
+                            f"<td>{'yes' if column_drift.drift_detected else 'no'}</td>"
+                            f"<td>{DataDriftDetector.get_histogram_html(column_drift)}</td></tr>")
+            page = f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Data drift report</title>
+<style>
+body {{font-family: sans-serif; margin: 2em;}}
+table {{border-collapse: collapse;}}
+td, th {{border-bottom: 1px solid #ddd; padding: 4px 8px; text-align: left; vertical-align: top;}}
+tr.drift > td:first-child {{color: #c0392b; font-weight: bold;}}
+table.histogram td {{border: none; padding: 1px 4px; font-size: 11px;}}
+table.histogram td:nth-child(2), table.histogram td:nth-child(3) {{width: 120px;}}
+.bar {{height: 10px;}}
+.bar.reference {{background: #7f8c8d;}}
+.bar.current {{background: #2980b9;}}
+</style>
+</head>
+<body>
+<h2>Data drift report</h2>
+<p>Dataset drift: <b>{'detected' if report.dataset_drift else 'not detected'}</b>,
+{report.number_of_drifted_columns} of {report.number_of_columns} columns drifted
+(share threshold {report.drift_share_threshold}, p-value threshold {report.p_value_threshold}).
+Reference rows: {report.reference_rows}, current rows: {report.current_rows}. Created at {report.created_at}.</p>
+<p>Histograms compare reference (grey) and current (blue) shares per reference quantile bin or category.
+Nulls are not part of the tests.</p>
+<table>
+<tr><th>Column</th><th>Type</th><th>Test</th><th>Statistic</th><th>p-value</th><th>PSI</th><th>Nulls</th><th>Drift</th>
+<th>Histogram</th></tr>
+{''.join(rows)}
+</table>
+</body>
+</html>
+"""
+            os.makedirs(os.path.dirname(report_page_file_path),exist_ok=True)
+            with open(report_page_file_path,"w") as report_page_file:
+                report_page_file.write(page)
+        except Exception as e:
+            raise HousingException(e,sys) from e
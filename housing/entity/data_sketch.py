@@ -0,0 +1,257 @@
+import os,sys
+import json
+import math
+import numpy as np
+import pandas as pd
+from housing.exception import HousingException
+
+NUMERICAL_SKETCH_TYPE = "numerical"
+CATEGORICAL_SKETCH_TYPE = "categorical"
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_HEAVY_HITTER_CAPACITY = 100
+# absolute values up to this share the zero bucket
+MIN_INDEXABLE_VALUE = 1e-9
+
+
+class NumericalSketch:
+    """
+    Mergeable quantile sketch of a numerical column with logarithmic buckets (as in DDSketch).
+    Every quantile is returned within relative_accuracy of a true value and two sketches of the same
+    accuracy merge exactly by adding bucket counts, so cdfs of different datasets compare bucket by bucket.
+    Bucket keys are ordered like the values: negative keys for negative values, 0 around zero.
+    """
+
+    def __init__(self,relative_accuracy:float=DEFAULT_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1+relative_accuracy)/(1-relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        # smallest indexable value falls in bucket 1
+        self.key_offset = math.ceil(math.log(MIN_INDEXABLE_VALUE)/self.log_gamma)-1
+        self.bucket_counts = dict()
+        self.count = 0
+        self.null_count = 0
+        self.min = None
+        self.max = None
+        self.sum = 0.0
+
+    def get_keys(self,values:np.ndarray)->np.ndarray:
+        abs_values = np.abs(values)
+        keys = np.zeros(len(values),dtype=np.int64)
+        indexable = abs_values > MIN_INDEXABLE_VALUE
+        keys[indexable] = np.ceil(np.log(abs_values[indexable])/self.log_gamma).astype(np.int64)-self.key_offset
+        return np.where(values < 0,-keys,keys)
+
+    def get_bucket_values(self,keys:np.ndarray)->np.ndarray:
+        """
+        Value representing each bucket, within relative_accuracy of every value in it
+        """
+        exponents = np.abs(keys)+self.key_offset
+        values = 2*np.power(self.gamma,exponents.astype(float))/(self.gamma+1)
+        return np.where(keys == 0,0.0,np.sign(keys)*values)
+
+    def get_bucket_upper_bounds(self,keys:np.ndarray)->np.ndarray:
+        """
+        Upper bound of the values in each bucket, exclusive for negative buckets
+        """
+        exponents = (np.abs(keys)+self.key_offset).astype(float)
+        return np.where(keys > 0,np.power(self.gamma,exponents),
+                        np.where(keys < 0,-np.power(self.gamma,exponents-1),MIN_INDEXABLE_VALUE))
+
+    def update(self,series:pd.Series):
+        values = pd.to_numeric(series,errors="coerce").to_numpy(dtype=float,na_value=np.nan)
+        is_valid = np.isfinite(values)
+        self.null_count += int(len(values)-is_valid.sum())
+        values = values[is_valid]
+        if len(values) == 0:
+            return
+        keys,counts = np.unique(self.get_keys(values),return_counts=True)
+        for key,count in zip(keys.tolist(),counts.tolist()):
+            self.bucket_counts[key] = self.bucket_counts.get(key,0)+count
+        self.count += len(values)
+        self.sum += float(values.sum())
+        self.min = float(values.min()) if self.min is None else min(self.min,float(values.min()))
+        self.max = float(values.max()) if self.max is None else max(self.max,float(values.max()))
+
+    def merge(self,other:"NumericalSketch"):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError(f"Sketches of relative accuracy [{self.relative_accuracy}] and "
+                             f"[{other.relative_accuracy}] can not be merged")
+        for key,count in other.bucket_counts.items():
+            self.bucket_counts[key] = self.bucket_counts.get(key,0)+count
+        self.count += other.count
+        self.null_count += other.null_count
+        self.sum += other.sum
+        if other.count > 0:
+            self.min = other.min if self.min is None else min(self.min,other.min)
+            self.max = other.max if self.max is None else max(self.max,other.max)
+
+    def get_buckets(self):
+        """
+        return: (sorted bucket keys, their counts)
+        """
+        keys = np.array(sorted(self.bucket_counts),dtype=np.int64)
+        counts = np.array([self.bucket_counts[key] for key in keys.tolist()],dtype=np.int64)
+        return keys,counts
+
+    def get_quantiles(self,probabilities)->np.ndarray:
+        keys,counts = self.get_buckets()
+        if len(keys) == 0:
+            return np.full(len(probabilities),np.nan)
+        ranks = np.asarray(probabilities,dtype=float)*(self.count-1)
+        bucket_indices = np.searchsorted(np.cumsum(counts),ranks,side="right")
+        return np.clip(self.get_bucket_values(keys[bucket_indices]),self.min,self.max)
+
+    def to_dict(self)->dict:
+        keys,counts = self.get_buckets()
+        return {"type":NUMERICAL_SKETCH_TYPE,
+                "relative_accuracy":self.relative_accuracy,
+                "count":self.count,
+                "null_count":self.null_count,
+                "min":self.min,
+                "max":self.max,
+                "sum":self.sum,
+                "keys":keys.tolist(),
+                "counts":counts.tolist()}
+
+    @classmethod
+    def from_dict(cls,sketch_data:dict)->"NumericalSketch":
+        sketch = cls(relative_accuracy=sketch_data["relative_accuracy"])
+        sketch.bucket_counts = dict(zip(sketch_data["keys"],sketch_data["counts"]))
+        sketch.count = sketch_data["count"]
+        sketch.null_count = sketch_data["null_count"]
+        sketch.min = sketch_data["min"]
+        sketch.max = sketch_data["max"]
+        sketch.sum = sketch_data["sum"]
+        return sketch
+
+
+class CategoricalSketch:
+    """
+    Mergeable heavy hitter counts of a categorical column (Misra-Gries summary).
+    At most capacity values are tracked; each kept count is below the true count by at most error,
+    which stays 0 while the column has no more than capacity distinct values.
+    """
+
+    def __init__(self,capacity:int=DEFAULT_HEAVY_HITTER_CAPACITY):
+        self.capacity = capacity
+        self.value_counts = dict()
+        self.count = 0
+        self.null_count = 0
+        self.error = 0
+
+    def compact(self):
+        if len(self.value_counts) <= self.capacity:
+            return
+        threshold = sorted(self.value_counts.values(),reverse=True)[self.capacity]
+        self.value_counts = {value:count-threshold for value,count in self.value_counts.items() if count > threshold}
+        self.error += threshold
+
+    def update(self,series:pd.Series):
+        null_count = int(series.isna().sum())
+        self.null_count += null_count
+        self.count += len(series)-null_count
+        value_counts = series.value_counts(dropna=True)
+        for value,count in zip(value_counts.index.astype(str).tolist(),value_counts.tolist()):
+            if count > 0:
+                self.value_counts[value] = self.value_counts.get(value,0)+count
+        self.compact()
+
+    def merge(self,other:"CategoricalSketch"):
+        for value,count in other.value_counts.items():
+            self.value_counts[value] = self.value_counts.get(value,0)+count
+        self.count += other.count
+        self.null_count += other.null_count
+        self.error += other.error
+        self.compact()
+
+    def get_other_count(self)->int:
+        """
+        Rows of values which are not tracked or not fully counted
+        """
+        return self.count-sum(self.value_counts.values())
+
+    def to_dict(self)->dict:
+        return {"type":CATEGORICAL_SKETCH_TYPE,
+                "capacity":self.capacity,
+                "count":self.count,
+                "null_count":self.null_count,
+                "error":self.error,
+                "value_counts":self.value_counts}
+
+    @classmethod
+    def from_dict(cls,sketch_data:dict)->"CategoricalSketch":
+        sketch = cls(capacity=sketch_data["capacity"])
+        sketch.value_counts = dict(sketch_data["value_counts"])
+        sketch.count = sketch_data["count"]
+        sketch.null_count = sketch_data["null_count"]
+        sketch.error = sketch_data["error"]
+        return sketch
+
+
+class DatasetSketch:
+    """
+    Column sketches of one dataset, built chunk by chunk in a single pass and mergeable with the
+    sketch of another part of the same dataset. Saved as a small json file, so drift against the data
+    of any previous run is computed without reading that data again.
+    """
+
+    def __init__(self,numerical_columns:list,categorical_columns:list,
+                 relative_accuracy:float=DEFAULT_RELATIVE_ACCURACY,capacity:int=DEFAULT_HEAVY_HITTER_CAPACITY):
+        self.row_count = 0
+        self.column_sketches = dict()
+        for column in numerical_columns:
+            self.column_sketches[column] = NumericalSketch(relative_accuracy=relative_accuracy)
+        for column in categorical_columns:
+            self.column_sketches[column] = CategoricalSketch(capacity=capacity)
+
+    def update(self,dataframe:pd.DataFrame):
+        try:
+            self.row_count += len(dataframe)
+            for column,column_sketch in self.column_sketches.items():
+                if column in dataframe.columns:
+                    column_sketch.update(dataframe[column])
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def merge(self,other:"DatasetSketch"):
+        try:
+            self.row_count += other.row_count
+            for column,column_sketch in other.column_sketches.items():
+                if column in self.column_sketches:
+                    self.column_sketches[column].merge(column_sketch)
+                else:
+                    self.column_sketches[column] = column_sketch
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def to_dict(self)->dict:
+        return {"row_count":self.row_count,
+                "columns":{column:column_sketch.to_dict() for column,column_sketch in self.column_sketches.items()}}
+
+    @classmethod
+    def from_dict(cls,sketch_data:dict)->"DatasetSketch":
+        dataset_sketch = cls(numerical_columns=[],categorical_columns=[])
+        dataset_sketch.row_count = sketch_data["row_count"]
+        for column,column_sketch_data in sketch_data["columns"].items():
+            if column_sketch_data["type"] == NUMERICAL_SKETCH_TYPE:
+                dataset_sketch.column_sketches[column] = NumericalSketch.from_dict(column_sketch_data)
+            else:
+                dataset_sketch.column_sketches[column] = CategoricalSketch.from_dict(column_sketch_data)
+        return dataset_sketch
+
+    def save(self,file_path:str):
+        try:
+            os.makedirs(os.path.dirname(file_path),exist_ok=True)
+            with open(f"{file_path}.tmp","w") as sketch_file:
+                json.dump(self.to_dict(),sketch_file)
+            os.replace(f"{file_path}.tmp",file_path)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    @classmethod
+    def load(cls,file_path:str)->"DatasetSketch":
+        try:
+            with open(file_path) as sketch_file:
+                return cls.from_dict(json.load(sketch_file))
+        except Exception as e:
+            raise HousingException(e,sys) from e
@@ -0,0 +1,102 @@
+import os,sys
+import joblib
+import sklearn
+from housing.exception import HousingException
+from housing.logger import logging
+from housing.util.util import read_yaml_file, write_yaml_file, load_object, save_object
+
+SCORE_DIR_NAME = "scores"
+ESTIMATOR_DIR_NAME = "estimators"
+SCORE_KEY = "score"
+
+
+class FitResultCache:
+    """
+    On-disk store of cross validation scores and refitted estimators
+    of ModelFactory searches.
+    A key covers estimator class, its full parameter set, cv splitter, fold, scoring,
+    a hash of the training matrix and the sklearn version, so a result is only reused
+    when refitting would reproduce it.
+    """
+
+    def __init__(self,cache_dir:str,cache_estimators:bool=True):
+        try:
+            self.cache_dir = cache_dir
+            self.cache_estimators = cache_estimators
+            self.hits = 0
+            self.misses = 0
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    @staticmethod
+    def get_data_fingerprint(X,y)->str:
+        # joblib hashes numpy buffers directly, including memory mapped arrays
+        return joblib.hash((X,y))
+
+    @staticmethod
+    def get_key(estimator,parameters:dict,data_fingerprint:str,cv=None,fold_index:int=None,scoring=None)->str:
+        try:
+            estimator_params = {**estimator.get_params(deep=False),**parameters}
+            return joblib.hash({
+                "estimator":f"{type(estimator).__module__}.{type(estimator).__qualname__}",
+                "params":sorted((name,repr(value)) for name,value in estimator_params.items()),
+                "cv":repr(cv),
+                "fold_index":fold_index,
+                "scoring":repr(scoring),
+                "data":data_fingerprint,
+                "sklearn_version":sklearn.__version__
+            })
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_score_file_path(self,key:str)->str:
+        return os.path.join(self.cache_dir,SCORE_DIR_NAME,key[:2],f"{key}.yaml")
+
+    def get_estimator_file_path(self,key:str)->str:
+        return os.path.join(self.cache_dir,ESTIMATOR_DIR_NAME,key[:2],f"{key}.pkl")
+
+    def get_fit_result(self,key:str):
+        """
+        Returns the cached cv score of a fit or None
+        """
+        try:
+            score_file_path = self.get_score_file_path(key)
+            score_data = read_yaml_file(file_path=score_file_path) if os.path.exists(score_file_path) else None
+            if not isinstance(score_data,dict) or SCORE_KEY not in score_data:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return score_data[SCORE_KEY]
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def put_fit_result(self,key:str,score:float):
+        try:
+            # written aside and renamed so a killed run never leaves a truncated entry behind
+            score_file_path = self.get_score_file_path(key)
+            write_yaml_file(file_path=f"{score_file_path}.tmp",data={SCORE_KEY:float(score)})
+            os.replace(f"{score_file_path}.tmp",score_file_path)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_estimator(self,key:str):
+        """
+        Returns the cached fitted estimator or None
+        """
+        try:
+            estimator_file_path = self.get_estimator_file_path(key)
+            if not self.cache_estimators or not os.path.exists(estimator_file_path):
+                return None
+            logging.info(f"Reusing fitted estimator from [{estimator_file_path}]")
+            return load_object(file_path=estimator_file_path)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def put_estimator(self,key:str,estimator):
+        try:
+            if self.cache_estimators:
+                estimator_file_path = self.get_estimator_file_path(key)
+                save_object(file_path=f"{estimator_file_path}.tmp",obj=estimator)
+                os.replace(f"{estimator_file_path}.tmp",estimator_file_path)
+        except Exception as e:
+            raise HousingException(e,sys) from e
@@ -1,7 +1,12 @@
 import os,sys
+import threading
+import time
+from collections import namedtuple
 from housing.logger import logging
 from housing.exception import HousingException
+from housing.entity.schema_validator import SchemaValidator
 from housing.util.util import load_object
+from housing.constant import MODEL_RELOAD_INTERVAL_SECONDS, MODEL_REFERENCE_PROFILE_FILE_NAME
 
 import pandas as pd
 
@@ -59,28 +64,171 @@ class HousingData:
 
 
 
+class HousingBatchData:
+    """
+    Builds and validates a multi-row input dataframe for batch prediction.
+    Accepted payloads are a list of records, a columnar dict of lists or a csv file.
+    """
+
+    def __init__(self,schema_file_path:str,max_batch_size:int):
+        try:
+            self.schema_validator = SchemaValidator.from_schema_file(schema_file_path=schema_file_path)
+            self.numerical_columns = [column for column in self.schema_validator.numerical_columns
+                                      if column in self.schema_validator.input_columns]
+            self.categorical_columns = [column for column in self.schema_validator.categorical_columns
+                                        if column in self.schema_validator.input_columns]
+            self.max_batch_size = max_batch_size
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_payload_errors(self,payload)->dict:
+        """
+        Errors of a json payload which cannot be built into a dataframe, empty if it can
+        """
+        try:
+            if isinstance(payload,list):
+                if not all(isinstance(record,dict) for record in payload):
+                    return {"payload":"Every record of a list payload must be a json object of feature values"}
+                return dict()
+            if isinstance(payload,dict):
+                column_lengths = {column:len(value) for column,value in payload.items() if isinstance(value,list)}
+                if len(set(column_lengths.values())) > 1:
+                    return {"payload":f"Columns of a columnar payload must have the same length, got {column_lengths}"}
+                return dict()
+            return {"payload":"Payload must be a list of records or a dict of columns"}
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_batch_size(self,payload)->int:
+        try:
+            if isinstance(payload,list):
+                return len(payload)
+            if isinstance(payload,dict):
+                return max([len(value) if isinstance(value,list) else 1 for value in payload.values()],default=0)
+            raise ValueError("Payload must be a list of records or a dict of columns")
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_housing_input_dataframe_from_json(self,payload)->pd.DataFrame:
+        try:
+            if isinstance(payload,list):
+                return pd.DataFrame.from_records(payload)
+            if not any(isinstance(value,list) for value in payload.values()):
+                # a dict of scalars is a single record
+                return pd.DataFrame([payload])
+            return pd.DataFrame(payload)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_housing_input_dataframe_from_csv(self,file_obj)->pd.DataFrame:
+        try:
+            # reading one row beyond the limit is enough to reject oversized files
+            return pd.read_csv(file_obj,nrows=self.max_batch_size+1)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def validate_input_dataframe(self,dataframe:pd.DataFrame):
+        """
+        Validates all rows against the schema at once.
+        Missing values are accepted as the preprocessing pipeline imputes them.
+        return: tuple of (dataframe restricted to input columns, dict of column errors)
+        """
+        try:
+            input_columns = self.numerical_columns + self.categorical_columns
+            dataframe,report = self.schema_validator.validate(dataframe,columns=input_columns,allow_nulls=True)
+            errors = SchemaValidator.get_errors(report)
+            if len(report.missing_columns) > 0:
+                return None,errors
+            return dataframe,errors
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+
+LoadedModel = namedtuple("LoadedModel", ["model_path", "model_dir_mtime", "model", "checked_at"])
+
+
 class HousingPredictor:
-    def __init__(self,model_dir:str):
+    """
+    Serves predictions from the latest model exported under model_dir.
+    Loaded models are kept in a process wide cache shared by every instance, so the
+    model is unpickled once and only reloaded when a newer model directory is pushed.
+    """
+    _model_cache = {}
+    _model_cache_lock = threading.Lock()
+
+    def __init__(self,model_dir:str,reload_interval:float=MODEL_RELOAD_INTERVAL_SECONDS):
         try:
             self.model_dir = model_dir 
+            self.reload_interval = reload_interval
         except Exception as e:
            raise HousingException(e,sys) from e
 
     def get_latest_model_path(self):
         try:
-            folder_name =list(map(int,os.listdir(self.model_dir)))
+            folder_name =[int(name) for name in os.listdir(self.model_dir)
+                            if name.isdigit() and os.listdir(os.path.join(self.model_dir,name))]
             latest_model_dir= os.path.join(self.model_dir,f"{max(folder_name)}")
-            file_name = os.listdir(latest_model_dir)[0]
+            file_name = [name for name in os.listdir(latest_model_dir)
+                         if name != MODEL_REFERENCE_PROFILE_FILE_NAME][0]
             latest_model_path = os.path.join(latest_model_dir,file_name)
             return latest_model_path
         except Exception as e:
             raise HousingException(e,sys) from e
 
-
-    def predict(self,X):
+    def refresh_model(self,loaded_model:LoadedModel=None)->LoadedModel:
+        """
+        Polls model_dir and loads the latest model if it differs from loaded_model.
+        The new model is fully unpickled before it replaces the cached entry, so
+        concurrent readers keep using the previous model until the swap.
+        """
         try:
+            model_dir_mtime = os.stat(self.model_dir).st_mtime
+            checked_at = time.monotonic()
+            if loaded_model is not None and loaded_model.model_dir_mtime == model_dir_mtime:
+                return loaded_model._replace(checked_at=checked_at)
+
             model_path = self.get_latest_model_path()
+            if loaded_model is not None and loaded_model.model_path == model_path:
+                return loaded_model._replace(model_dir_mtime=model_dir_mtime,checked_at=checked_at)
+
+            logging.info(f"Loading model from :[{model_path}]")
             model = load_object(file_path=model_path)
+            return LoadedModel(model_path=model_path,
+                               model_dir_mtime=model_dir_mtime,
+                               model=model,
+                               checked_at=checked_at)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_model(self):
+        try:
+            loaded_model = HousingPredictor._model_cache.get(self.model_dir)
+            if loaded_model is not None and \
+                time.monotonic() - loaded_model.checked_at < self.reload_interval:
+                return loaded_model.model
+
+            # only one thread polls at a time, the others keep serving the cached model
+            if not HousingPredictor._model_cache_lock.acquire(blocking=loaded_model is None):
+                return loaded_model.model
+            try:
+                cached_model = HousingPredictor._model_cache.get(self.model_dir)
+                try:
+                    loaded_model = self.refresh_model(cached_model)
+                except Exception as e:
+                    if cached_model is None:
+                        raise e
+                    logging.exception(f"Model reload failed, serving cached model:[{cached_model.model_path}]")
+                    loaded_model = cached_model._replace(checked_at=time.monotonic())
+                HousingPredictor._model_cache[self.model_dir] = loaded_model
+            finally:
+                HousingPredictor._model_cache_lock.release()
+            return loaded_model.model
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def predict(self,X):
+        try:
+            model = self.get_model()
             median_house_value = model.predict(X)
             return median_house_value
         except Exception as e:
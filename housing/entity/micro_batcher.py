@@ -0,0 +1,160 @@
+import os,sys
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+from housing.exception import HousingException
+from housing.logger import logging
+
+PendingPrediction = namedtuple("PendingPrediction", ["input_dataframe", "future", "enqueued_at"])
+
+QUEUE_WAIT_BUCKETS_MS = [0.5, 1, 2, 5, 10, 20, 50, 100]
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent prediction requests into one batch.
+    Requests arriving within max_wait_ms of the first queued request (or until
+    max_batch_size rows are collected) are concatenated, scored by a single
+    predict_fn call and the results are fanned back out to each caller.
+    """
+
+    def __init__(self,predict_fn,max_batch_size:int=64,max_wait_ms:float=2.0):
+        try:
+            self.predict_fn = predict_fn
+            self.max_batch_size = max_batch_size
+            self.max_wait_ms = max_wait_ms
+
+            self.request_queue = queue.Queue()
+            self.worker = None
+            self.worker_pid = None
+            self.worker_lock = threading.Lock()
+
+            self.stats_lock = threading.Lock()
+            self.batch_size_buckets = [2**power for power in range(int(np.log2(max(max_batch_size,1)))+1)]
+            if self.batch_size_buckets[-1] < max_batch_size:
+                self.batch_size_buckets.append(max_batch_size)
+            self.reset_stats()
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def reset_stats(self):
+        with self.stats_lock:
+            self.total_requests = 0
+            self.total_batches = 0
+            self.total_rows = 0
+            self.max_queue_depth = 0
+            self.batch_size_histogram = [0]*(len(self.batch_size_buckets)+1)
+            self.queue_wait_histogram = [0]*(len(QUEUE_WAIT_BUCKETS_MS)+1)
+
+    def ensure_worker(self):
+        # worker thread is started lazily and per process, so the batcher survives a gunicorn fork
+        if self.worker is not None and self.worker_pid == os.getpid() and self.worker.is_alive():
+            return
+        with self.worker_lock:
+            if self.worker is not None and self.worker_pid == os.getpid() and self.worker.is_alive():
+                return
+            self.request_queue = queue.Queue()
+            self.worker_pid = os.getpid()
+            self.worker = threading.Thread(target=self.run,daemon=True,name="micro_batcher")
+            self.worker.start()
+            logging.info(f"Micro batcher started with max_batch_size:[{self.max_batch_size}] "
+                         f"max_wait_ms:[{self.max_wait_ms}]")
+
+    def submit(self,X:pd.DataFrame)->Future:
+        try:
+            self.ensure_worker()
+            future = Future()
+            self.request_queue.put(PendingPrediction(input_dataframe=X,
+                                                    future=future,
+                                                    enqueued_at=time.perf_counter()))
+            queue_depth = self.request_queue.qsize()
+            with self.stats_lock:
+                self.max_queue_depth = max(self.max_queue_depth,queue_depth)
+            return future
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def predict(self,X:pd.DataFrame,timeout:float=None):
+        try:
+            return self.submit(X).result(timeout=timeout)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def collect_batch(self):
+        pending = [self.request_queue.get()]
+        n_rows = len(pending[0].input_dataframe)
+        deadline = time.perf_counter() + self.max_wait_ms/1000
+        while n_rows < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                pending_prediction = self.request_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append(pending_prediction)
+            n_rows += len(pending_prediction.input_dataframe)
+        return pending
+
+    def execute_batch(self,pending:list):
+        started_at = time.perf_counter()
+        row_counts = [len(pending_prediction.input_dataframe) for pending_prediction in pending]
+        try:
+            if len(pending) == 1:
+                batch_df = pending[0].input_dataframe
+            else:
+                batch_df = pd.concat([pending_prediction.input_dataframe for pending_prediction in pending],
+                                     ignore_index=True)
+            predictions = np.asarray(self.predict_fn(batch_df))
+            for pending_prediction,prediction in zip(pending,np.split(predictions,np.cumsum(row_counts)[:-1])):
+                pending_prediction.future.set_result(prediction)
+        except Exception as e:
+            logging.exception(f"Micro batch of [{len(pending)}] requests failed")
+            for pending_prediction in pending:
+                if not pending_prediction.future.done():
+                    pending_prediction.future.set_exception(e)
+
+        with self.stats_lock:
+            self.total_requests += len(pending)
+            self.total_batches += 1
+            self.total_rows += sum(row_counts)
+            self.batch_size_histogram[int(np.searchsorted(self.batch_size_buckets,sum(row_counts)))] += 1
+            for pending_prediction in pending:
+                queue_wait_ms = (started_at - pending_prediction.enqueued_at)*1000
+                self.queue_wait_histogram[int(np.searchsorted(QUEUE_WAIT_BUCKETS_MS,queue_wait_ms))] += 1
+
+    def run(self):
+        while True:
+            pending = self.collect_batch()
+            self.execute_batch(pending)
+
+    @staticmethod
+    def get_histogram_as_dict(buckets:list,counts:list)->dict:
+        histogram = {f"<={bucket}":count for bucket,count in zip(buckets,counts)}
+        histogram[f">{buckets[-1]}"] = counts[-1]
+        return histogram
+
+    def get_stats(self)->dict:
+        try:
+            with self.stats_lock:
+                return {
+                    "max_batch_size":self.max_batch_size,
+                    "max_wait_ms":self.max_wait_ms,
+                    "queue_depth":self.request_queue.qsize(),
+                    "max_queue_depth":self.max_queue_depth,
+                    "total_requests":self.total_requests,
+                    "total_batches":self.total_batches,
+                    "total_rows":self.total_rows,
+                    "mean_batch_size":self.total_rows/self.total_batches if self.total_batches else 0,
+                    "batch_size_histogram":MicroBatcher.get_histogram_as_dict(self.batch_size_buckets,
+                                                                            self.batch_size_histogram),
+                    "queue_wait_ms_histogram":MicroBatcher.get_histogram_as_dict(QUEUE_WAIT_BUCKETS_MS,
+                                                                               self.queue_wait_histogram)
+                }
+        except Exception as e:
+            raise HousingException(e,sys) from e
@@ -6,27 +6,57 @@ import yaml
 from housing.exception import HousingException
 import os
 import sys
+import inspect
+import time
 
 from collections import namedtuple
 from typing import List
 from housing.logger import logging
-from sklearn.metrics import r2_score,mean_squared_error
+from housing.entity.fit_result_cache import FitResultCache
+from housing.entity.search_checkpoint import SearchCheckpoint
+from housing.util.resource_profiler import ResourceProfile, ResourceProfiler, add_resource_usage, run_profiled
+from joblib import Parallel, delayed
+from sklearn.base import clone, is_classifier, is_regressor
+from sklearn.metrics import r2_score,mean_squared_error,check_scoring
+from sklearn.model_selection import ParameterGrid, check_cv
+from scipy import stats
 GRID_SEARCH_KEY = 'grid_search'
 MODULE_KEY = 'module'
 CLASS_KEY = 'class'
 PARAM_KEY = 'params'
 MODEL_SELECTION_KEY = 'model_selection'
 SEARCH_PARAM_GRID_KEY = "search_param_grid"
+EXECUTOR_KEY = "executor"
+EXECUTOR_MODE_KEY = "mode"
+EXECUTOR_N_JOBS_KEY = "n_jobs"
+SEQUENTIAL_EXECUTOR_MODE = "sequential"
+PARALLEL_EXECUTOR_MODE = "parallel"
+SEARCH_STRATEGY_KEY = "search_strategy"
+TIME_BUDGET_SECONDS_KEY = "time_budget_seconds"
+DISTRIBUTION_KEY = "distribution"
+EXHAUSTIVE_SEARCH_CLASS_NAME = "GridSearchCV"
+HALVING_SEARCH_CLASS_PREFIX = "Halving"
+FIT_CACHE_KEY = "fit_cache"
+FIT_CACHE_ENABLED_KEY = "enabled"
+FIT_CACHE_ESTIMATORS_KEY = "cache_estimators"
+WARM_START_KEY = "warm_start"
+WARM_START_PARAM_KEY = "param"
+EARLY_STOPPING_KEY = "early_stopping"
+EARLY_STOPPING_PATIENCE_KEY = "patience"
+EARLY_STOPPING_TOL_KEY = "tol"
+# GridSearchCV params the pooled executor honours, any other one is rejected
+POOLED_SEARCH_PARAMS = ["cv", "scoring", "error_score", "refit", "n_jobs", "verbose"]
+ERROR_SCORE_RAISE = "raise"
 
 InitializedModelDetail = namedtuple("InitializedModelDetail",
-                                    ["model_serial_number", "model", "param_grid_search", "model_name"])
+                                    ["model_serial_number", "model", "param_grid_search", "model_name",
+                                     "search_strategy", "warm_start"])
 
 GridSearchedBestModel = namedtuple("GridSearchedBestModel", ["model_serial_number",
                                                              "model",
                                                              "best_model",
                                                              "best_parameters",
-                                                             "best_score",
-                                                             ])
+                                                             "best_score", ])
 
 BestModel = namedtuple("BestModel", ["model_serial_number",
                                      "model",
@@ -38,6 +68,125 @@ MetricInfoArtifact = namedtuple("MetricInfoArtifact",
                                 ["model_name", "model_object", "train_rmse", "test_rmse", "train_accuracy",
                                  "test_accuracy", "model_accuracy", "index_number"])
 
+FitTask = namedtuple("FitTask", ["model_index", "parameter_index", "parameters", "fold_index", "estimated_cost",
+                                 "cache_key"])
+
+# fit tasks of one model and fold which only differ in the warm start parameter, ordered by it
+GrowthTask = namedtuple("GrowthTask", ["model_index", "fold_index", "fit_tasks", "estimated_cost"])
+
+
+def get_estimated_fit_cost(estimator, parameters: dict) -> float:
+    """
+    Rough relative cost of fitting estimator with parameters, used to start expensive fits first.
+    Ensembles and iterative models scale with their number of estimators/iterations.
+    """
+    estimator_params = {**estimator.get_params(deep=False), **parameters}
+    estimated_cost = 1.0
+    for param_name in ["n_estimators", "max_iter"]:
+        param_value = estimator_params.get(param_name)
+        if isinstance(param_value, (int, float)) and not isinstance(param_value, bool):
+            estimated_cost *= param_value
+    return estimated_cost
+
+
+def fit_and_score(estimator, parameters: dict, X, y, train_index, test_index, scoring=None, error_score=np.nan):
+    """
+    Fits a clone of estimator with parameters on the train fold and scores it on the test fold.
+    Like GridSearchCV, a failing fit scores error_score unless error_score is "raise".
+    return: test fold score
+    """
+    try:
+        estimator = clone(estimator).set_params(**parameters)
+        estimator.fit(X[train_index], y[train_index])
+        return score_predictions(estimator, estimator.predict(X[test_index]), X[test_index], y[test_index],
+                                 scoring=scoring)
+    except Exception as e:
+        if isinstance(error_score, str) and error_score == ERROR_SCORE_RAISE:
+            raise
+        logging.info(f"Fit of {type(estimator).__name__} with {parameters} failed, "
+                     f"scored error_score [{error_score}]: {e}")
+        return error_score
+
+
+def score_predictions(estimator, predictions, X_test, y_test, scoring=None) -> float:
+    if scoring is None and is_regressor(estimator):
+        # default regressor score is r2, computed from the fold predictions already at hand
+        return r2_score(y_test, predictions)
+    scorer = check_scoring(estimator, scoring=scoring)
+    return scorer(estimator, X_test, y_test)
+
+
+def fit_growth_path(estimator, parameter_list: list, X, y, train_index, test_index, scoring=None,
+                    patience: int = None, tol: float = 0.0, error_score=np.nan) -> list:
+    """
+    Grows one warm started clone of estimator through parameter_list, which only differ in an
+    increasing size parameter such as n_estimators, and scores it on the test fold after every step.
+    With patience, growing stops once the score did not improve by more than tol for patience steps.
+    A failing step and every later step score error_score unless error_score is "raise".
+    return: test fold score per step, None for steps skipped by early stopping
+    """
+    estimator = clone(estimator).set_params(warm_start=True)
+    X_train, y_train = X[train_index], y[train_index]
+    X_test, y_test = X[test_index], y[test_index]
+    fit_results = []
+    best_score = -np.inf
+    steps_without_improvement = 0
+    for parameters in parameter_list:
+        if patience is not None and steps_without_improvement >= patience:
+            fit_results.append(None)
+            continue
+        try:
+            estimator.set_params(**parameters).fit(X_train, y_train)
+            score = score_predictions(estimator, estimator.predict(X_test), X_test, y_test, scoring=scoring)
+        except Exception as e:
+            if isinstance(error_score, str) and error_score == ERROR_SCORE_RAISE:
+                raise
+            logging.info(f"Fit of {type(estimator).__name__} with {parameters} failed, "
+                         f"scored error_score [{error_score}] for the rest of its growth path: {e}")
+            fit_results.extend([error_score] * (len(parameter_list) - len(fit_results)))
+            break
+        fit_results.append(score)
+        if score > best_score + tol:
+            best_score = score
+            steps_without_improvement = 0
+        else:
+            steps_without_improvement += 1
+    return fit_results
+
+
+def refit(estimator, parameters: dict, X, y):
+    return clone(estimator).set_params(**parameters).fit(X, y)
+
+
+def is_distribution_spec(param_value) -> bool:
+    return isinstance(param_value, dict) and DISTRIBUTION_KEY in param_value
+
+
+def get_search_space(param_grid_search):
+    """
+    Converts search_param_grid of model.yaml into the search space of a sklearn search class.
+    A parameter is either a list of candidate values or a scipy.stats distribution given as
+    {distribution: <scipy.stats name>, params: [<positional args>]}, e.g. {distribution: randint, params: [1, 20]}
+    """
+    try:
+        if isinstance(param_grid_search, list):
+            return [get_search_space(param_grid) for param_grid in param_grid_search]
+        search_space = {}
+        for param_name, param_value in param_grid_search.items():
+            if is_distribution_spec(param_value):
+                distribution_ref = getattr(stats, param_value[DISTRIBUTION_KEY])
+                param_value = distribution_ref(*param_value.get(PARAM_KEY, []))
+            search_space[param_name] = param_value
+        return search_space
+    except Exception as e:
+        raise HousingException(e, sys) from e
+
+
+def has_distribution(param_grid_search) -> bool:
+    param_grids = param_grid_search if isinstance(param_grid_search, list) else [param_grid_search]
+    return any(is_distribution_spec(param_value)
+               for param_grid in param_grids for param_value in param_grid.values())
+
 
 
 def evaluate_classification_model(model_list: list, X_train:np.ndarray, y_train:np.ndarray, X_test:np.ndarray, y_test:np.ndarray, base_accuracy:float=0.6)->MetricInfoArtifact:
@@ -62,17 +211,41 @@ def evaluate_regression_model(model_list: list, X_train:np.ndarray, y_train:np.n
                                  "test_accuracy", "model_accuracy", "index_number"])
     """
     try:
-        
-    
+        #Getting prediction for training and testing dataset
+        train_prediction_list = [model.predict(X_train) for model in model_list]
+        test_prediction_list = [model.predict(X_test) for model in model_list]
+        return evaluate_regression_predictions(model_list=model_list,
+                                               train_prediction_list=train_prediction_list,
+                                               y_train=y_train,
+                                               test_prediction_list=test_prediction_list,
+                                               y_test=y_test,
+                                               base_accuracy=base_accuracy)
+    except Exception as e:
+        raise HousingException(e, sys) from e
+
+
+def evaluate_regression_predictions(model_list: list, train_prediction_list: list, y_train:np.ndarray,
+                                    test_prediction_list: list, y_test:np.ndarray,
+                                    base_accuracy:float=0.6) -> MetricInfoArtifact:
+    """
+    Description:
+    Same comparison as evaluate_regression_model but from already computed predictions,
+    e.g. predictions saved by an earlier run instead of predicting the datasets again
+    Params:
+    model_list: List of model
+    train_prediction_list: predictions of every model for y_train
+    y_train: Training dataset target feature
+    test_prediction_list: predictions of every model for y_test
+    y_test: Testing dataset target feature
+    return
+    It retured a named tuple MetricInfoArtifact
+    """
+    try:
         index_number = 0
         metric_info_artifact = None
-        for model in model_list:
+        for model, y_train_pred, y_test_pred in zip(model_list, train_prediction_list, test_prediction_list):
             model_name = str(model)  #getting model name based on model object
             logging.info(f"{'>>'*30}Started evaluating model: [{type(model).__name__}] {'<<'*30}")
-            
-            #Getting prediction for training and testing dataset
-            y_train_pred = model.predict(X_train)
-            y_test_pred = model.predict(X_test)
 
             #Calculating r squared score on training and testing dataset
             train_acc = r2_score(y_train, y_train_pred)
@@ -128,6 +301,14 @@ def get_sample_model_config_yaml_file(export_dir: str):
                 PARAM_KEY: {
                     "cv": 3,
                     "verbose": 1
+                },
+                EXECUTOR_KEY: {
+                    EXECUTOR_MODE_KEY: SEQUENTIAL_EXECUTOR_MODE,
+                    EXECUTOR_N_JOBS_KEY: -1
+                },
+                FIT_CACHE_KEY: {
+                    FIT_CACHE_ENABLED_KEY: True,
+                    FIT_CACHE_ESTIMATORS_KEY: True
                 }
 
             },
@@ -144,6 +325,39 @@ def get_sample_model_config_yaml_file(export_dir: str):
                     }
 
                 },
+                "module_1": {
+                    MODULE_KEY: "module_of_model",
+                    CLASS_KEY: "ModelClassName",
+                    SEARCH_STRATEGY_KEY: {
+                        MODULE_KEY: "sklearn.model_selection",
+                        CLASS_KEY: "HalvingRandomSearchCV",
+                        PARAM_KEY: {
+                            "resource": "n_estimators",
+                            "max_resources": 300,
+                            "random_state": 42
+                        },
+                        TIME_BUDGET_SECONDS_KEY: 1800
+                    },
+                    SEARCH_PARAM_GRID_KEY: {
+                        "param_name": {DISTRIBUTION_KEY: "randint", PARAM_KEY: [1, 20]}
+                    }
+
+                },
+                "module_2": {
+                    MODULE_KEY: "module_of_model",
+                    CLASS_KEY: "ModelClassName",
+                    WARM_START_KEY: {
+                        WARM_START_PARAM_KEY: "n_estimators",
+                        EARLY_STOPPING_KEY: {
+                            EARLY_STOPPING_PATIENCE_KEY: 2,
+                            EARLY_STOPPING_TOL_KEY: 0.0005
+                        }
+                    },
+                    SEARCH_PARAM_GRID_KEY: {
+                        "n_estimators": [50, 100, 200, 400]
+                    }
+
+                },
             }
         }
         os.makedirs(export_dir, exist_ok=True)
@@ -156,13 +370,24 @@ def get_sample_model_config_yaml_file(export_dir: str):
 
 
 class ModelFactory:
-    def __init__(self, model_config_path: str = None,):
+    def __init__(self, model_config_path: str = None, fit_cache_dir: str = None, checkpoint_dir: str = None):
         try:
             self.config: dict = ModelFactory.read_params(model_config_path)
 
             self.grid_search_cv_module: str = self.config[GRID_SEARCH_KEY][MODULE_KEY]
             self.grid_search_class_name: str = self.config[GRID_SEARCH_KEY][CLASS_KEY]
             self.grid_search_property_data: dict = dict(self.config[GRID_SEARCH_KEY][PARAM_KEY])
+            self.executor_config: dict = dict(self.config[GRID_SEARCH_KEY].get(EXECUTOR_KEY) or {})
+
+            fit_cache_config: dict = dict(self.config[GRID_SEARCH_KEY].get(FIT_CACHE_KEY) or {})
+            self.fit_result_cache = None
+            if fit_cache_dir is not None and fit_cache_config.get(FIT_CACHE_ENABLED_KEY, False):
+                self.fit_result_cache = FitResultCache(
+                    cache_dir=fit_cache_dir,
+                    cache_estimators=fit_cache_config.get(FIT_CACHE_ESTIMATORS_KEY, True))
+            self.search_checkpoint = None
+            if checkpoint_dir is not None:
+                self.search_checkpoint = SearchCheckpoint(checkpoint_dir=checkpoint_dir)
 
             self.models_initialization_config: dict = dict(self.config[MODEL_SELECTION_KEY])
 
@@ -206,6 +431,100 @@ class ModelFactory:
         except Exception as e:
             raise HousingException(e, sys) from e
 
+    @staticmethod
+    def search_class_for_name(module_name: str, class_name: str):
+        try:
+            if class_name.startswith(HALVING_SEARCH_CLASS_PREFIX):
+                # successive halving searches are experimental in sklearn and have to be enabled before import
+                importlib.import_module("sklearn.experimental.enable_halving_search_cv")
+            return ModelFactory.class_for_name(module_name=module_name, class_name=class_name)
+        except Exception as e:
+            raise HousingException(e, sys) from e
+
+    def get_search_strategy(self, initialized_model: InitializedModelDetail) -> dict:
+        """
+        Returns the search strategy of a model: its own search_strategy section of model.yaml
+        layered over the global grid_search section.
+        A time_budget_seconds is only kept for randomized searches, a grid search always fits its whole grid.
+        """
+        try:
+            search_strategy = dict(initialized_model.search_strategy or {})
+            search_property_data = dict(self.grid_search_property_data)
+            search_property_data.update(search_strategy.get(PARAM_KEY) or {})
+            class_name = search_strategy.get(CLASS_KEY, self.grid_search_class_name)
+            time_budget = search_strategy.get(TIME_BUDGET_SECONDS_KEY)
+            if time_budget is not None and class_name.endswith(EXHAUSTIVE_SEARCH_CLASS_NAME):
+                logging.info(f"{TIME_BUDGET_SECONDS_KEY} of [{initialized_model.model_serial_number}] is ignored, "
+                             f"{class_name} fits every candidate of its grid, use a randomized search class "
+                             f"to search within a time budget")
+                time_budget = None
+            return {
+                MODULE_KEY: search_strategy.get(MODULE_KEY, self.grid_search_cv_module),
+                CLASS_KEY: class_name,
+                PARAM_KEY: search_property_data,
+                TIME_BUDGET_SECONDS_KEY: time_budget
+            }
+        except Exception as e:
+            raise HousingException(e, sys) from e
+
+    def is_exhaustive_grid_search(self, initialized_model: InitializedModelDetail) -> bool:
+        search_strategy = self.get_search_strategy(initialized_model)
+        return (search_strategy[CLASS_KEY] == EXHAUSTIVE_SEARCH_CLASS_NAME
+                and not has_distribution(initialized_model.param_grid_search))
+
+    def get_pooled_search_params(self, initialized_model: InitializedModelDetail) -> dict:
+        """
+        Returns the GridSearchCV params of a model for the pooled executor, which honours cv, a single
+        metric scoring, error_score, refit=True, n_jobs and verbose. Any other param raises instead of
+        being ignored silently.
+        """
+        try:
+            search_property_data = dict(self.get_search_strategy(initialized_model)[PARAM_KEY])
+            unsupported_params = [param_name for param_name in search_property_data
+                                  if param_name not in POOLED_SEARCH_PARAMS]
+            if search_property_data.get("refit", True) is not True:
+                unsupported_params.append(f"refit={search_property_data['refit']}")
+            if isinstance(search_property_data.get("scoring"), (list, tuple, set, dict)):
+                unsupported_params.append("multi metric scoring")
+            if len(unsupported_params) > 0:
+                raise Exception(f"{unsupported_params} of the grid search of [{initialized_model.model_serial_number}] "
+                                f"are not supported by the pooled search executor, which is used in parallel mode "
+                                f"and for checkpointing and warm start. Supported params: {POOLED_SEARCH_PARAMS}")
+            return search_property_data
+        except Exception as e:
+            raise HousingException(e, sys) from e
+
+    def get_search_cv(self, initialized_model: InitializedModelDetail, search_round: int = 0, n_iter: int = None):
+        """
+        Instantiates the configured search class of a model. Exhaustive searches take param_grid,
+        randomized searches param_distributions; later rounds of a randomized search get a shifted random_state
+        so that they sample new candidates. n_iter overrides the number of candidates a randomized search samples.
+        """
+        try:
+            search_strategy = self.get_search_strategy(initialized_model)
+            search_cv_ref = ModelFactory.search_class_for_name(module_name=search_strategy[MODULE_KEY],
+                                                               class_name=search_strategy[CLASS_KEY])
+            search_property_data = dict(search_strategy[PARAM_KEY])
+            search_space = get_search_space(initialized_model.param_grid_search)
+
+            if "param_grid" in inspect.signature(search_cv_ref).parameters:
+                if has_distribution(initialized_model.param_grid_search):
+                    raise Exception(f"{search_strategy[CLASS_KEY]} of [{initialized_model.model_serial_number}] "
+                                    f"requires a list of values for every parameter, "
+                                    f"use a randomized search class for distributions")
+                search_cv = search_cv_ref(estimator=initialized_model.model, param_grid=search_space)
+            else:
+                search_cv = search_cv_ref(estimator=initialized_model.model, param_distributions=search_space)
+                random_state = search_property_data.get("random_state")
+                if search_round > 0 and isinstance(random_state, int):
+                    search_property_data["random_state"] = random_state + search_round
+                if n_iter is not None and hasattr(search_cv, "n_iter"):
+                    search_property_data["n_iter"] = n_iter
+
+            return ModelFactory.update_property_of_class(search_cv, search_property_data)
+        except Exception as e:
+            raise HousingException(e, sys) from e
+
     def execute_grid_search_operation(self, initialized_model: InitializedModelDetail, input_feature,
                                       output_feature) -> GridSearchedBestModel:
         """
@@ -215,38 +534,356 @@ class ModelFactory:
         param_grid: dictionary of paramter to perform search operation
         input_feature: your all input features
         output_feature: Target/Dependent features
+        Randomized searches with a time_budget_seconds treat it as a wall-clock deadline: a first round
+        samples a single candidate to measure the cost of one fit, every later round samples as many
+        candidates (at most the configured n_iter) as are expected to be fitted before the deadline.
+        No round is started once the deadline has passed.
         ================================================================================
         return: Function will return GridSearchOperation object
         """
         try:
-            # instantiating GridSearchCV class
-            
-           
-            grid_search_cv_ref = ModelFactory.class_for_name(module_name=self.grid_search_cv_module,
-                                                             class_name=self.grid_search_class_name
-                                                             )
-
-            grid_search_cv = grid_search_cv_ref(estimator=initialized_model.model,
-                                                param_grid=initialized_model.param_grid_search)
-            grid_search_cv = ModelFactory.update_property_of_class(grid_search_cv,
-                                                                   self.grid_search_property_data)
+            search_strategy = self.get_search_strategy(initialized_model)
+            time_budget = search_strategy[TIME_BUDGET_SECONDS_KEY]
+            max_n_iter = search_strategy[PARAM_KEY].get("n_iter")
+            if initialized_model.warm_start:
+                logging.info(f"Warm start of [{initialized_model.model_serial_number}] is only used "
+                             f"by exhaustive grid searches, ignoring it")
 
-            
             message = f'{">>"* 30} f"Training {type(initialized_model.model).__name__} Started." {"<<"*30}'
             logging.info(message)
-            grid_search_cv.fit(input_feature, output_feature)
+            best_search_cv = None
+            search_round = 0
+            deadline = None if time_budget is None else time.perf_counter() + time_budget
+            n_iter = None if deadline is None else 1
+            fit_count = 0
+            fit_time = 0.0
+            while True:
+                grid_search_cv = self.get_search_cv(initialized_model=initialized_model, search_round=search_round,
+                                                    n_iter=n_iter)
+                round_started_at = time.perf_counter()
+                grid_search_cv.fit(input_feature, output_feature)
+                round_finished_at = time.perf_counter()
+                logging.info(f"Search round [{search_round}] of [{initialized_model.model_serial_number}] "
+                             f"finished in [{round_finished_at - round_started_at:.1f}]s "
+                             f"with best score [{grid_search_cv.best_score_}]")
+                if best_search_cv is None or grid_search_cv.best_score_ > best_search_cv.best_score_:
+                    best_search_cv = grid_search_cv
+                search_round += 1
+
+                is_randomized = not hasattr(grid_search_cv, "param_grid")
+                if deadline is None or not is_randomized:
+                    break
+                remaining_time = deadline - round_finished_at
+                if remaining_time <= 0:
+                    break
+                if not hasattr(grid_search_cv, "n_iter"):
+                    # candidates of a halving search are fitted on growing resources, only whole rounds are timed
+                    if round_finished_at - round_started_at > remaining_time:
+                        break
+                    continue
+                # every candidate is fitted on every fold, then the best one is refitted on the whole data
+                n_splits = grid_search_cv.n_splits_
+                fit_count += len(grid_search_cv.cv_results_["params"]) * n_splits + 1
+                fit_time += round_finished_at - round_started_at
+                n_iter = int((remaining_time / (fit_time / fit_count) - 1) // n_splits)
+                if max_n_iter is not None:
+                    n_iter = min(n_iter, max_n_iter)
+                if n_iter < 1:
+                    break
+            if deadline is not None:
+                logging.info(f"Search of [{initialized_model.model_serial_number}] ran [{search_round}] rounds "
+                             f"in [{time.perf_counter() - deadline + time_budget:.1f}]s "
+                             f"of its [{time_budget}]s time budget")
             message = f'{">>"* 30} f"Training {type(initialized_model.model).__name__}" completed {"<<"*30}'
+            logging.info(message)
             grid_searched_best_model = GridSearchedBestModel(model_serial_number=initialized_model.model_serial_number,
                                                              model=initialized_model.model,
-                                                             best_model=grid_search_cv.best_estimator_,
-                                                             best_parameters=grid_search_cv.best_params_,
-                                                             best_score=grid_search_cv.best_score_
+                                                             best_model=best_search_cv.best_estimator_,
+                                                             best_parameters=best_search_cv.best_params_,
+                                                             best_score=best_search_cv.best_score_
                                                              )
             
             return grid_searched_best_model
         except Exception as e:
             raise HousingException(e, sys) from e
 
+    def execute_parallel_grid_search_operation(self, initialized_model_list: List[InitializedModelDetail],
+                                               input_feature, output_feature,
+                                               n_jobs: int = None,
+                                               data_fingerprint: str = None) -> List[GridSearchedBestModel]:
+        """
+        execute_parallel_grid_search_operation(): schedules every (model, parameter combination, cv fold)
+        fit of all initialized models into one shared process pool, most expensive fits first.
+        Best parameters are chosen by mean cv score like GridSearchCV and refitted on the whole data.
+        cv, scoring and error_score of each model's GridSearchCV params apply to its fits, see get_pooled_search_params.
+        Fits whose score (and refits whose estimator) is in the fit result cache are not run again,
+        neither are fits already journaled by the search checkpoint of this run.
+        Every fit is measured in its worker and the totals per model are reported to the active ResourceProfiler.
+        With a time_budget_seconds in the executor section no task is submitted once that wall-clock deadline
+        has passed; running tasks finish and parameters missing a fold score are never chosen.
+        ================================================================================
+        return: Function will return list of GridSearchedBestModel in initialized model order
+        """
+        try:
+            search_params = [self.get_pooled_search_params(initialized_model)
+                             for initialized_model in initialized_model_list]
+            if n_jobs is None:
+                n_jobs = self.executor_config.get(EXECUTOR_N_JOBS_KEY, self.grid_search_property_data.get("n_jobs", -1))
+            time_budget = self.executor_config.get(TIME_BUDGET_SECONDS_KEY)
+            deadline = None if time_budget is None else time.perf_counter() + time_budget
+            fit_result_cache = self.fit_result_cache
+            search_checkpoint = self.search_checkpoint
+            use_fit_keys = fit_result_cache is not None or search_checkpoint is not None
+            if use_fit_keys and data_fingerprint is None:
+                data_fingerprint = FitResultCache.get_data_fingerprint(input_feature, output_feature)
+            verbose = self.grid_search_property_data.get("verbose", 0)
+
+            parameter_lists = [list(ParameterGrid(initialized_model.param_grid_search))
+                               for initialized_model in initialized_model_list]
+            cv_splits = []
+            fit_tasks = []
+            for model_index, initialized_model in enumerate(initialized_model_list):
+                scoring = search_params[model_index].get("scoring")
+                splitter = check_cv(search_params[model_index].get("cv", 5), output_feature,
+                                    classifier=is_classifier(initialized_model.model))
+                cv_splits.append(list(splitter.split(input_feature, output_feature)))
+                for parameter_index, parameters in enumerate(parameter_lists[model_index]):
+                    estimated_cost = get_estimated_fit_cost(initialized_model.model, parameters)
+                    for fold_index in range(len(cv_splits[model_index])):
+                        cache_key = None
+                        if use_fit_keys:
+                            cache_key = FitResultCache.get_key(initialized_model.model, parameters,
+                                                               data_fingerprint=data_fingerprint,
+                                                               cv=splitter, fold_index=fold_index, scoring=scoring)
+                        fit_tasks.append(FitTask(model_index=model_index,
+                                                 parameter_index=parameter_index,
+                                                 parameters=parameters,
+                                                 fold_index=fold_index,
+                                                 estimated_cost=estimated_cost,
+                                                 cache_key=cache_key))
+
+            fold_scores = [np.full((len(parameter_list), len(cv_splits[model_index])), np.nan)
+                           for model_index, parameter_list in enumerate(parameter_lists)]
+            pending_fit_tasks = []
+            for fit_task in fit_tasks:
+                score = None
+                if search_checkpoint is not None:
+                    score = search_checkpoint.get_fit_result(fit_task.cache_key)
+                if score is None and fit_result_cache is not None:
+                    score = fit_result_cache.get_fit_result(fit_task.cache_key)
+                if score is None:
+                    pending_fit_tasks.append(fit_task)
+                else:
+                    fold_scores[fit_task.model_index][fit_task.parameter_index, fit_task.fold_index] = score
+            pending_tasks = ModelFactory.get_growth_tasks(pending_fit_tasks, initialized_model_list)
+            pending_tasks.sort(key=lambda task: task.estimated_cost, reverse=True)
+
+            logging.info(f"{'>>' * 30} Parallel search of [{len(pending_fit_tasks)}] fits "
+                         f"in [{len(pending_tasks)}] tasks "
+                         f"([{len(fit_tasks) - len(pending_fit_tasks)}] cached) "
+                         f"across [{len(initialized_model_list)}] models started. {'<<' * 30}")
+            # results are consumed as they arrive so every finished fit is checkpointed right away
+            with Parallel(n_jobs=n_jobs, verbose=verbose, return_as="generator") as parallel:
+                # joblib pulls tasks from this generator as workers free up, so the deadline is checked between tasks
+                task_results = parallel(
+                    self.get_delayed_task(task=task,
+                                          initialized_model_list=initialized_model_list,
+                                          cv_splits=cv_splits,
+                                          input_feature=input_feature,
+                                          output_feature=output_feature,
+                                          scoring=search_params[task.model_index].get("scoring"),
+                                          error_score=search_params[task.model_index].get("error_score", np.nan))
+                    for task in ModelFactory.iter_until_deadline(pending_tasks, deadline))
+
+                early_stopped_fits = 0
+                finished_tasks = 0
+                model_usages = {}
+                for task_result, task_usage in task_results:
+                    task = pending_tasks[finished_tasks]
+                    finished_tasks += 1
+                    model_usages[task.model_index] = add_resource_usage(model_usages.get(task.model_index),
+                                                                        task_usage)
+                    if isinstance(task, GrowthTask):
+                        fit_task_results = zip(task.fit_tasks, task_result)
+                    else:
+                        fit_task_results = [(task, task_result)]
+                    for fit_task, score in fit_task_results:
+                        if score is None:
+                            early_stopped_fits += 1
+                            continue
+                        fold_scores[fit_task.model_index][fit_task.parameter_index, fit_task.fold_index] = score
+                        if search_checkpoint is not None:
+                            search_checkpoint.put_fit_result(fit_task.cache_key, score)
+                        if fit_result_cache is not None:
+                            fit_result_cache.put_fit_result(fit_task.cache_key, score)
+                if early_stopped_fits > 0:
+                    logging.info(f"[{early_stopped_fits}] fits skipped by early stopping")
+                if finished_tasks < len(pending_tasks):
+                    logging.info(f"[{len(pending_tasks) - finished_tasks}] tasks not submitted, "
+                                 f"time budget of [{time_budget}]s exhausted")
+
+                # parameters with a fold skipped by early stopping or the time budget have no mean score
+                # and are never chosen
+                best_parameter_indices = []
+                for model_index, model_fold_scores in enumerate(fold_scores):
+                    mean_scores = model_fold_scores.mean(axis=1)
+                    if np.all(np.isnan(mean_scores)):
+                        raise Exception(f"No parameters of [{initialized_model_list[model_index].model_serial_number}] "
+                                        f"were scored on every cv fold, fits were skipped by early stopping "
+                                        f"or the time budget, or every fit scored NaN")
+                    best_parameter_indices.append(int(np.argmax(np.where(np.isnan(mean_scores), -np.inf,
+                                                                         mean_scores))))
+                best_models = {}
+                refit_cache_keys = {}
+                for model_index, initialized_model in enumerate(initialized_model_list):
+                    if fit_result_cache is None:
+                        continue
+                    refit_cache_keys[model_index] = FitResultCache.get_key(
+                        initialized_model.model,
+                        parameter_lists[model_index][best_parameter_indices[model_index]],
+                        data_fingerprint=data_fingerprint)
+                    cached_estimator = fit_result_cache.get_estimator(refit_cache_keys[model_index])
+                    if cached_estimator is not None:
+                        best_models[model_index] = cached_estimator
+
+                refit_order = sorted([model_index for model_index in range(len(initialized_model_list))
+                                      if model_index not in best_models],
+                                     key=lambda model_index: get_estimated_fit_cost(
+                                         initialized_model_list[model_index].model,
+                                         parameter_lists[model_index][best_parameter_indices[model_index]]),
+                                     reverse=True)
+                refitted_models = parallel(
+                    delayed(run_profiled)(refit,
+                                          initialized_model_list[model_index].model,
+                                          parameter_lists[model_index][best_parameter_indices[model_index]],
+                                          input_feature,
+                                          output_feature)
+                    for model_index in refit_order)
+                for model_index, (refitted_model, refit_usage) in zip(refit_order, refitted_models):
+                    model_usages[model_index] = add_resource_usage(model_usages.get(model_index), refit_usage)
+                    best_models[model_index] = refitted_model
+                    if fit_result_cache is not None:
+                        fit_result_cache.put_estimator(refit_cache_keys[model_index], refitted_model)
+            if fit_result_cache is not None:
+                logging.info(f"Fit result cache hits:[{fit_result_cache.hits}] misses:[{fit_result_cache.misses}]")
+
+            grid_searched_best_model_list = []
+            for model_index, initialized_model in enumerate(initialized_model_list):
+                best_parameter_index = best_parameter_indices[model_index]
+                grid_searched_best_model = GridSearchedBestModel(
+                    model_serial_number=initialized_model.model_serial_number,
+                    model=initialized_model.model,
+                    best_model=best_models[model_index],
+                    best_parameters=parameter_lists[model_index][best_parameter_index],
+                    best_score=float(fold_scores[model_index][best_parameter_index].mean())
+                )
+                logging.info(f"Parallel search result: {grid_searched_best_model}")
+                grid_searched_best_model_list.append(grid_searched_best_model)
+                ResourceProfiler.add_child_profile(ModelFactory.get_pooled_model_profile(
+                    initialized_model=initialized_model,
+                    model_usage=model_usages.get(model_index),
+                    rows_in=len(output_feature)))
+            return grid_searched_best_model_list
+        except Exception as e:
+            raise HousingException(e, sys) from e
+
+    @staticmethod
+    def get_model_profile_name(initialized_model: InitializedModelDetail) -> str:
+        return f"{initialized_model.model_serial_number} {initialized_model.model_name}"
+
+    @staticmethod
+    def get_pooled_model_profile(initialized_model: InitializedModelDetail, model_usage=None,
+                                 rows_in: int = None) -> ResourceProfile:
+        """
+        Profile of one model of a pooled search from the usage its fits and refit measured in the workers.
+        Wall and cpu time are summed over those fits, peak rss is the largest worker peak.
+        A model whose fits all came from a cache or checkpoint reports zero time.
+        """
+        return ResourceProfile(name=ModelFactory.get_model_profile_name(initialized_model),
+                               start_time=None,
+                               stop_time=None,
+                               wall_time=model_usage.wall_time if model_usage is not None else 0.0,
+                               cpu_time=model_usage.cpu_time if model_usage is not None else 0.0,
+                               peak_rss=model_usage.peak_rss if model_usage is not None else None,
+                               rows_in=rows_in,
+                               rows_out=None,
+                               read_bytes=model_usage.read_bytes if model_usage is not None else None,
+                               write_bytes=model_usage.write_bytes if model_usage is not None else None,
+                               children=[])
+
+    @staticmethod
+    def get_growth_tasks(fit_tasks: List[FitTask], initialized_model_list: List[InitializedModelDetail]) -> list:
+        """
+        Groups fit tasks of warm start models, which only differ in the warm start parameter,
+        into GrowthTasks so one warm started estimator sweeps them all. Other fit tasks are kept as they are.
+        """
+        try:
+            tasks = []
+            growth_groups = {}
+            for fit_task in fit_tasks:
+                warm_start = initialized_model_list[fit_task.model_index].warm_start
+                growth_param = warm_start[WARM_START_PARAM_KEY] if warm_start else None
+                if growth_param is None or growth_param not in fit_task.parameters:
+                    tasks.append(fit_task)
+                    continue
+                other_parameters = repr(sorted((param_name, param_value)
+                                               for param_name, param_value in fit_task.parameters.items()
+                                               if param_name != growth_param))
+                growth_groups.setdefault((fit_task.model_index, fit_task.fold_index, other_parameters),
+                                         []).append(fit_task)
+
+            for (model_index, fold_index, _), growth_fit_tasks in growth_groups.items():
+                if len(growth_fit_tasks) == 1:
+                    tasks.extend(growth_fit_tasks)
+                    continue
+                growth_param = initialized_model_list[model_index].warm_start[WARM_START_PARAM_KEY]
+                growth_fit_tasks.sort(key=lambda fit_task: fit_task.parameters[growth_param])
+                tasks.append(GrowthTask(model_index=model_index,
+                                        fold_index=fold_index,
+                                        fit_tasks=growth_fit_tasks,
+                                        estimated_cost=max(fit_task.estimated_cost for fit_task in growth_fit_tasks)))
+            return tasks
+        except Exception as e:
+            raise HousingException(e, sys) from e
+
+    @staticmethod
+    def iter_until_deadline(tasks: list, deadline: float = None):
+        """
+        Yields tasks until the perf_counter deadline has passed, all of them without a deadline
+        """
+        for task in tasks:
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            yield task
+
+    @staticmethod
+    def get_delayed_task(task, initialized_model_list: List[InitializedModelDetail], cv_splits: list,
+                         input_feature, output_feature, scoring=None, error_score=np.nan):
+        initialized_model = initialized_model_list[task.model_index]
+        train_index, test_index = cv_splits[task.model_index][task.fold_index]
+        if isinstance(task, GrowthTask):
+            early_stopping = dict(initialized_model.warm_start.get(EARLY_STOPPING_KEY) or {})
+            return delayed(run_profiled)(fit_growth_path,
+                                         initialized_model.model,
+                                         [fit_task.parameters for fit_task in task.fit_tasks],
+                                         input_feature,
+                                         output_feature,
+                                         train_index,
+                                         test_index,
+                                         scoring=scoring,
+                                         patience=early_stopping.get(EARLY_STOPPING_PATIENCE_KEY),
+                                         tol=early_stopping.get(EARLY_STOPPING_TOL_KEY, 0.0),
+                                         error_score=error_score)
+        return delayed(run_profiled)(fit_and_score,
+                                     initialized_model.model,
+                                     task.parameters,
+                                     input_feature,
+                                     output_feature,
+                                     train_index,
+                                     test_index,
+                                     scoring=scoring,
+                                     error_score=error_score)
+
     def get_initialized_model_list(self) -> List[InitializedModelDetail]:
         """
         This function will return a list of model details.
@@ -268,12 +905,18 @@ class ModelFactory:
                                                                   property_data=model_obj_property_data)
 
                 param_grid_search = model_initialization_config[SEARCH_PARAM_GRID_KEY]
+                search_strategy = model_initialization_config.get(SEARCH_STRATEGY_KEY)
+                warm_start = model_initialization_config.get(WARM_START_KEY)
+                if warm_start is not None and WARM_START_KEY not in model.get_params():
+                    raise Exception(f"{type(model).__name__} of [{model_serial_number}] does not support warm start")
                 model_name = f"{model_initialization_config[MODULE_KEY]}.{model_initialization_config[CLASS_KEY]}"
 
                 model_initialization_config = InitializedModelDetail(model_serial_number=model_serial_number,
                                                                      model=model,
                                                                      param_grid_search=param_grid_search,
-                                                                     model_name=model_name
+                                                                     model_name=model_name,
+                                                                     search_strategy=search_strategy,
+                                                                     warm_start=warm_start
                                                                      )
 
                 initialized_model_list.append(model_initialization_config)
@@ -309,14 +952,62 @@ class ModelFactory:
                                                               output_feature) -> List[GridSearchedBestModel]:
 
         try:
-            self.grid_searched_best_model_list = []
-            for initialized_model_list in initialized_model_list:
-                grid_searched_best_model = self.initiate_best_parameter_search_for_initialized_model(
-                    initialized_model=initialized_model_list,
-                    input_feature=input_feature,
-                    output_feature=output_feature
-                )
-                self.grid_searched_best_model_list.append(grid_searched_best_model)
+            data_fingerprint = None
+            if self.fit_result_cache is not None or self.search_checkpoint is not None:
+                data_fingerprint = FitResultCache.get_data_fingerprint(input_feature, output_feature)
+
+            grid_searched_best_models = {}
+            search_keys = {}
+            if self.search_checkpoint is not None:
+                for initialized_model in initialized_model_list:
+                    search_key = SearchCheckpoint.get_search_key(
+                        initialized_model=initialized_model,
+                        search_strategy=self.get_search_strategy(initialized_model),
+                        data_fingerprint=data_fingerprint)
+                    search_keys[initialized_model.model_serial_number] = search_key
+                    grid_searched_best_model = self.search_checkpoint.get_search_result(search_key)
+                    if grid_searched_best_model is not None:
+                        grid_searched_best_models[initialized_model.model_serial_number] = grid_searched_best_model
+            remaining_model_list = [initialized_model for initialized_model in initialized_model_list
+                                    if initialized_model.model_serial_number not in grid_searched_best_models]
+
+            def checkpoint_search_result(grid_searched_best_model: GridSearchedBestModel):
+                grid_searched_best_models[grid_searched_best_model.model_serial_number] = grid_searched_best_model
+                if self.search_checkpoint is not None:
+                    self.search_checkpoint.put_search_result(
+                        search_keys[grid_searched_best_model.model_serial_number], grid_searched_best_model)
+
+            executor_mode = self.executor_config.get(EXECUTOR_MODE_KEY, SEQUENTIAL_EXECUTOR_MODE)
+            has_warm_start = any(initialized_model.warm_start for initialized_model in remaining_model_list)
+            if executor_mode == PARALLEL_EXECUTOR_MODE or self.search_checkpoint is not None or has_warm_start:
+                # exhaustive grids share one pool of fits, budgeted/randomized searches run on their own.
+                # Checkpointing and warm start need per fit control, so the pooled executor is used in
+                # sequential mode too, with one job. The fit cache alone keeps GridSearchCV in sequential mode
+                n_jobs = None if executor_mode == PARALLEL_EXECUTOR_MODE else 1
+                exhaustive_model_list = [initialized_model for initialized_model in remaining_model_list
+                                         if self.is_exhaustive_grid_search(initialized_model)]
+                if len(exhaustive_model_list) > 0:
+                    for grid_searched_best_model in self.execute_parallel_grid_search_operation(
+                            initialized_model_list=exhaustive_model_list,
+                            input_feature=input_feature,
+                            output_feature=output_feature,
+                            n_jobs=n_jobs,
+                            data_fingerprint=data_fingerprint):
+                        checkpoint_search_result(grid_searched_best_model)
+
+            for initialized_model in remaining_model_list:
+                if initialized_model.model_serial_number not in grid_searched_best_models:
+                    with ResourceProfiler(name=ModelFactory.get_model_profile_name(initialized_model),
+                                          rows_in=len(output_feature)):
+                        grid_searched_best_model = self.initiate_best_parameter_search_for_initialized_model(
+                            initialized_model=initialized_model,
+                            input_feature=input_feature,
+                            output_feature=output_feature
+                        )
+                    checkpoint_search_result(grid_searched_best_model)
+
+            self.grid_searched_best_model_list = [grid_searched_best_models[initialized_model.model_serial_number]
+                                                  for initialized_model in initialized_model_list]
             return self.grid_searched_best_model_list
         except Exception as e:
             raise HousingException(e, sys) from e
@@ -0,0 +1,134 @@
+import os,sys
+import shutil
+import uuid
+import sklearn
+from housing.exception import HousingException
+from housing.logger import logging
+from housing.util.util import get_fingerprint
+
+FIT_DIR_NAME = "fits"
+TRANSFORM_DIR_NAME = "transforms"
+PREPROCESSED_OBJECT_FILE_NAME = "preprocessed.pkl"
+COMPILED_PREPROCESSED_OBJECT_FILE_NAME = "compiled_preprocessed.pkl"
+INPUT_FEATURE_FILE_NAME = "input_feature.npy"
+TARGET_FEATURE_FILE_NAME = "target_feature.npy"
+
+
+class PreprocessorCache:
+    """
+    On-disk store of fitted preprocessing objects and the arrays they produced, shared across runs.
+    A fit entry holds the fitted preprocessing object and the transformed training arrays and is keyed
+    by everything the fit depends on: training data, schema, transformation options and transformer
+    code version. A transform entry holds the arrays of another dataset, e.g. the test data, transformed
+    by the object of a fit entry, plus the compiled object checked for parity on that data.
+    """
+
+    def __init__(self,cache_dir:str):
+        try:
+            self.cache_dir = cache_dir
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    @staticmethod
+    def get_fit_key(train_file_hash:str,schema_file_hash:str,options:dict,code_version:str)->str:
+        try:
+            return get_fingerprint({
+                "train":train_file_hash,
+                "schema":schema_file_hash,
+                "options":options,
+                "code":code_version,
+                "sklearn_version":sklearn.__version__
+            })
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    @staticmethod
+    def get_transform_key(fit_key:str,file_hash:str)->str:
+        try:
+            return get_fingerprint({"fit":fit_key,"data":file_hash})
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_fit_dir(self,fit_key:str)->str:
+        return os.path.join(self.cache_dir,FIT_DIR_NAME,fit_key[:2],fit_key)
+
+    def get_transform_dir(self,transform_key:str)->str:
+        return os.path.join(self.cache_dir,TRANSFORM_DIR_NAME,transform_key[:2],transform_key)
+
+    @staticmethod
+    def get_entry(entry_dir:str,required_file_names:list,optional_file_names:list=None)->dict:
+        """
+        Returns file paths of a complete entry keyed by file name, None if there is none.
+        Missing optional files are mapped to None.
+        """
+        try:
+            if not all(os.path.exists(os.path.join(entry_dir,file_name)) for file_name in required_file_names):
+                return None
+            entry = {file_name:os.path.join(entry_dir,file_name) for file_name in required_file_names}
+            for file_name in optional_file_names or []:
+                file_path = os.path.join(entry_dir,file_name)
+                entry[file_name] = file_path if os.path.exists(file_path) else None
+            return entry
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    @staticmethod
+    def put_entry(entry_dir:str,file_paths:dict):
+        """
+        file_paths: source file path keyed by the file name in the entry, None values are skipped
+        """
+        try:
+            if os.path.exists(entry_dir):
+                return
+            # files are copied into a staging dir which is renamed into place afterwards,
+            # so a killed run never leaves a partial entry behind
+            staging_dir = f"{entry_dir}.{uuid.uuid4().hex}.tmp"
+            os.makedirs(staging_dir,exist_ok=True)
+            for file_name,file_path in file_paths.items():
+                if file_path is not None:
+                    shutil.copyfile(file_path,os.path.join(staging_dir,file_name))
+            try:
+                os.rename(staging_dir,entry_dir)
+            except OSError:
+                # another run stored the same entry first
+                shutil.rmtree(staging_dir,ignore_errors=True)
+            logging.info(f"Preprocessor cache entry saved at [{entry_dir}]")
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_fit(self,fit_key:str)->dict:
+        return PreprocessorCache.get_entry(self.get_fit_dir(fit_key),
+                                           [PREPROCESSED_OBJECT_FILE_NAME,INPUT_FEATURE_FILE_NAME,
+                                            TARGET_FEATURE_FILE_NAME])
+
+    def put_fit(self,fit_key:str,preprocessed_object_file_path:str,input_feature_file_path:str,
+                target_feature_file_path:str):
+        PreprocessorCache.put_entry(self.get_fit_dir(fit_key),
+                                    {PREPROCESSED_OBJECT_FILE_NAME:preprocessed_object_file_path,
+                                     INPUT_FEATURE_FILE_NAME:input_feature_file_path,
+                                     TARGET_FEATURE_FILE_NAME:target_feature_file_path})
+
+    def get_transform(self,transform_key:str)->dict:
+        return PreprocessorCache.get_entry(self.get_transform_dir(transform_key),
+                                           [INPUT_FEATURE_FILE_NAME,TARGET_FEATURE_FILE_NAME],
+                                           [COMPILED_PREPROCESSED_OBJECT_FILE_NAME])
+
+    def put_transform(self,transform_key:str,input_feature_file_path:str,target_feature_file_path:str,
+                      compiled_preprocessed_object_file_path:str=None):
+        PreprocessorCache.put_entry(self.get_transform_dir(transform_key),
+                                    {INPUT_FEATURE_FILE_NAME:input_feature_file_path,
+                                     TARGET_FEATURE_FILE_NAME:target_feature_file_path,
+                                     COMPILED_PREPROCESSED_OBJECT_FILE_NAME:compiled_preprocessed_object_file_path})
+
+    @staticmethod
+    def restore_file(cached_file_path:str,file_path:str)->str:
+        """
+        Copies a cached file to file_path of this run. Files are not hard linked, since
+        a rewrite of the run's file in place would then change the cache entry too.
+        """
+        try:
+            os.makedirs(os.path.dirname(file_path),exist_ok=True)
+            shutil.copyfile(cached_file_path,file_path)
+            return file_path
+        except Exception as e:
+            raise HousingException(e,sys) from e
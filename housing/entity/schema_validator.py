@@ -0,0 +1,229 @@
+import os,sys
+from collections import namedtuple
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from housing.exception import HousingException
+from housing.util.util import read_yaml_file
+from housing.constant import DATASET_SCHEMA_COLUMNS_KEY, DOMAIN_VALUE_KEY, NULLABLE_COLUMN_KEY, \
+    VALUE_RANGE_KEY, VALUE_RANGE_MIN_KEY, VALUE_RANGE_MAX_KEY, NUMERICAL_COLUMN_KEY, CATEGORICAL_COLUMN_KEY
+
+# invalid_rows: index labels of the first invalid rows of the column
+ColumnValidationReport = namedtuple("ColumnValidationReport", ["column", "expected_dtype", "dtype", "null_count",
+                                                               "invalid_type_count", "out_of_range_count",
+                                                               "out_of_domain_count", "invalid_rows", "errors"])
+
+SchemaValidationReport = namedtuple("SchemaValidationReport", ["is_valid", "row_count", "missing_columns",
+                                                               "unexpected_columns", "column_reports"])
+
+
+@lru_cache(maxsize=8)
+def load_schema_validator(schema_file_path:str,modified_time:int):
+    return SchemaValidator(schema=read_yaml_file(file_path=schema_file_path))
+
+
+class SchemaValidator:
+    """
+    Validator compiled once from schema.yaml. It checks column set, dtypes, nullability, numeric
+    ranges and categorical domains of a whole dataframe or chunk with column wise vectorized
+    operations and returns a per column report.
+    """
+
+    def __init__(self,schema:dict):
+        try:
+            self.schema_columns = dict(schema[DATASET_SCHEMA_COLUMNS_KEY])
+            self.numerical_columns = [column for column,dtype in self.schema_columns.items()
+                                      if pd.api.types.is_numeric_dtype(pd.api.types.pandas_dtype(dtype))]
+            self.categorical_columns = [column for column in self.schema_columns
+                                        if column not in self.numerical_columns]
+            # model input features, the schema columns without the target
+            self.input_columns = list(schema.get(NUMERICAL_COLUMN_KEY) or []) + \
+                list(schema.get(CATEGORICAL_COLUMN_KEY) or [])
+            self.nullable_columns = set(schema.get(NULLABLE_COLUMN_KEY) or [])
+            self.domain_value = {column:list(values)
+                                 for column,values in (schema.get(DOMAIN_VALUE_KEY) or dict()).items()}
+            value_range = schema.get(VALUE_RANGE_KEY) or dict()
+            self.min_values = pd.Series({column:value_range.get(column,dict()).get(VALUE_RANGE_MIN_KEY,np.nan)
+                                         for column in self.numerical_columns},dtype=float)
+            self.max_values = pd.Series({column:value_range.get(column,dict()).get(VALUE_RANGE_MAX_KEY,np.nan)
+                                         for column in self.numerical_columns},dtype=float)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    @classmethod
+    def from_schema_file(cls,schema_file_path:str)->"SchemaValidator":
+        """
+        Returns the validator of schema_file_path, compiled again only once the file changed
+        """
+        try:
+            schema_file_path = os.path.abspath(schema_file_path)
+            return load_schema_validator(schema_file_path,os.stat(schema_file_path).st_mtime_ns)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_range_text(self,column:str)->str:
+        bounds = []
+        if not np.isnan(self.min_values[column]):
+            bounds.append(f">= {self.min_values[column]}")
+        if not np.isnan(self.max_values[column]):
+            bounds.append(f"<= {self.max_values[column]}")
+        return " and ".join(bounds)
+
+    def get_out_of_domain_mask(self,series:pd.Series,domain:list)->np.ndarray:
+        if isinstance(series.dtype,pd.CategoricalDtype):
+            # categories are checked once and looked up by code instead of hashing every value
+            codes = series.cat.codes.to_numpy()
+            invalid_categories = np.append(~series.cat.categories.isin(domain),False)
+            return invalid_categories[codes]
+        return (~series.isin(domain) & series.notna()).to_numpy()
+
+    def validate(self,dataframe:pd.DataFrame,columns:list=None,allow_nulls:bool=False,max_invalid_rows:int=10):
+        """
+        Validates every row of dataframe against the schema in one pass over its columns.
+        columns: schema columns to validate, others are ignored. All schema columns if None,
+        columns outside the schema are then reported as unexpected.
+        allow_nulls: accept nulls in columns not listed as nullable, e.g. inputs which are imputed
+        return: tuple of (dataframe of the validated columns with numerical columns coerced
+        to numbers, SchemaValidationReport)
+        """
+        try:
+            is_full_schema = columns is None
+            columns = list(self.schema_columns) if is_full_schema else list(columns)
+            missing_columns = [column for column in columns if column not in dataframe.columns]
+            unexpected_columns = [column for column in dataframe.columns if column not in self.schema_columns] \
+                if is_full_schema else []
+            present_columns = [column for column in columns if column in dataframe.columns]
+            validated_df = dataframe[present_columns]
+
+            numerical_columns = [column for column in present_columns if column in self.numerical_columns]
+            numerical_df = validated_df[numerical_columns]
+            invalid_type_df = pd.DataFrame(False,index=numerical_df.index,columns=numerical_columns)
+            non_numeric_columns = [column for column in numerical_columns
+                                   if not pd.api.types.is_numeric_dtype(numerical_df[column].dtype)]
+            if len(non_numeric_columns) > 0:
+                coerced_df = numerical_df[non_numeric_columns].apply(pd.to_numeric,errors="coerce")
+                invalid_type_df[non_numeric_columns] = coerced_df.isna() & numerical_df[non_numeric_columns].notna()
+                numerical_df = numerical_df.assign(**coerced_df)
+                validated_df = validated_df.assign(**coerced_df)
+
+            null_df = numerical_df.isna() & ~invalid_type_df
+            out_of_range_df = numerical_df.lt(self.min_values[numerical_columns],axis=1) | \
+                numerical_df.gt(self.max_values[numerical_columns],axis=1)
+            checked_null_columns = [column for column in numerical_columns
+                                    if not allow_nulls and column not in self.nullable_columns]
+            invalid_df = invalid_type_df | out_of_range_df
+            if len(checked_null_columns) > 0:
+                invalid_df[checked_null_columns] = invalid_df[checked_null_columns] | null_df[checked_null_columns]
+
+            null_counts = null_df.sum().to_dict()
+            invalid_type_counts = invalid_type_df.sum().to_dict()
+            out_of_range_counts = out_of_range_df.sum().to_dict()
+            invalid_columns = set(invalid_df.columns[invalid_df.any().to_numpy()])
+
+            column_reports = dict()
+            for column in numerical_columns:
+                errors = []
+                if column in checked_null_columns and null_counts[column] > 0:
+                    errors.append("value is missing")
+                if invalid_type_counts[column] > 0:
+                    errors.append("value is not numeric")
+                if out_of_range_counts[column] > 0:
+                    errors.append(f"value is not {self.get_range_text(column)}")
+                invalid_rows = dataframe.index[invalid_df[column].to_numpy()][:max_invalid_rows].tolist() \
+                    if column in invalid_columns else []
+                column_reports[column] = ColumnValidationReport(column=column,
+                                                                expected_dtype=self.schema_columns[column],
+                                                                dtype=str(dataframe[column].dtype),
+                                                                null_count=int(null_counts[column]),
+                                                                invalid_type_count=int(invalid_type_counts[column]),
+                                                                out_of_range_count=int(out_of_range_counts[column]),
+                                                                out_of_domain_count=0,
+                                                                invalid_rows=invalid_rows,
+                                                                errors=errors)
+
+            for column in present_columns:
+                if column in numerical_columns:
+                    continue
+                series = validated_df[column]
+                null_mask = series.isna().to_numpy()
+                invalid_mask = np.zeros(len(series),dtype=bool)
+                errors = []
+                if not allow_nulls and column not in self.nullable_columns and null_mask.any():
+                    invalid_mask |= null_mask
+                    errors.append("value is missing")
+                out_of_domain_count = 0
+                if column in self.domain_value:
+                    out_of_domain_mask = self.get_out_of_domain_mask(series,self.domain_value[column])
+                    out_of_domain_count = int(out_of_domain_mask.sum())
+                    if out_of_domain_count > 0:
+                        invalid_mask |= out_of_domain_mask
+                        errors.append(f"value is not one of {self.domain_value[column]}")
+                column_reports[column] = ColumnValidationReport(column=column,
+                                                                expected_dtype=self.schema_columns[column],
+                                                                dtype=str(dataframe[column].dtype),
+                                                                null_count=int(null_mask.sum()),
+                                                                invalid_type_count=0,
+                                                                out_of_range_count=0,
+                                                                out_of_domain_count=out_of_domain_count,
+                                                                invalid_rows=dataframe.index[invalid_mask]
+                                                                [:max_invalid_rows].tolist(),
+                                                                errors=errors)
+
+            column_reports = {column:column_reports[column] for column in present_columns}
+            is_valid = len(missing_columns) == 0 and len(unexpected_columns) == 0 and \
+                all(len(column_report.errors) == 0 for column_report in column_reports.values())
+            report = SchemaValidationReport(is_valid=is_valid,
+                                            row_count=len(dataframe),
+                                            missing_columns=missing_columns,
+                                            unexpected_columns=unexpected_columns,
+                                            column_reports=column_reports)
+            return validated_df,report
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    @staticmethod
+    def merge_reports(reports:list,max_invalid_rows:int=10)->SchemaValidationReport:
+        """
+        Combines the reports of the chunks of one dataset
+        """
+        try:
+            column_reports = dict()
+            for report in reports:
+                for column,column_report in report.column_reports.items():
+                    merged_report = column_reports.get(column)
+                    if merged_report is None:
+                        column_reports[column] = column_report
+                        continue
+                    column_reports[column] = merged_report._replace(
+                        null_count=merged_report.null_count+column_report.null_count,
+                        invalid_type_count=merged_report.invalid_type_count+column_report.invalid_type_count,
+                        out_of_range_count=merged_report.out_of_range_count+column_report.out_of_range_count,
+                        out_of_domain_count=merged_report.out_of_domain_count+column_report.out_of_domain_count,
+                        invalid_rows=(merged_report.invalid_rows+column_report.invalid_rows)[:max_invalid_rows],
+                        errors=merged_report.errors+[error for error in column_report.errors
+                                                     if error not in merged_report.errors])
+            missing_columns = list(dict.fromkeys(column for report in reports for column in report.missing_columns))
+            unexpected_columns = list(dict.fromkeys(column for report in reports
+                                                    for column in report.unexpected_columns))
+            return SchemaValidationReport(is_valid=all(report.is_valid for report in reports),
+                                          row_count=sum(report.row_count for report in reports),
+                                          missing_columns=missing_columns,
+                                          unexpected_columns=unexpected_columns,
+                                          column_reports=column_reports)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    @staticmethod
+    def get_errors(report:SchemaValidationReport)->dict:
+        """
+        Errors of report keyed by column, empty if the data is valid
+        """
+        errors = dict()
+        if len(report.missing_columns) > 0:
+            errors["missing_columns"] = report.missing_columns
+        if len(report.unexpected_columns) > 0:
+            errors["unexpected_columns"] = report.unexpected_columns
+        for column,column_report in report.column_reports.items():
+            if len(column_report.errors) > 0:
+                errors[column] = {"message":", ".join(column_report.errors),"rows":column_report.invalid_rows}
+        return errors
@@ -0,0 +1,104 @@
+import os,sys
+import json
+import joblib
+from housing.exception import HousingException
+from housing.logger import logging
+from housing.util.util import load_object, save_object
+
+FIT_SCORE_JOURNAL_FILE_NAME = "fit_scores.jsonl"
+SEARCH_RESULT_DIR_NAME = "search_results"
+
+
+class SearchCheckpoint:
+    """
+    Durable progress of the parameter search of one training run.
+    Every completed (parameters, fold) fit score is appended to a journal and every finished
+    model search is saved, so a resumed run only fits what is still missing.
+    """
+
+    def __init__(self,checkpoint_dir:str):
+        try:
+            self.checkpoint_dir = checkpoint_dir
+            self.journal_file_path = os.path.join(checkpoint_dir,FIT_SCORE_JOURNAL_FILE_NAME)
+            self.fit_scores = self.read_journal()
+            if len(self.fit_scores) > 0:
+                logging.info(f"Resuming search with [{len(self.fit_scores)}] completed fits "
+                             f"from [{self.journal_file_path}]")
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def read_journal(self)->dict:
+        try:
+            fit_scores = {}
+            if not os.path.exists(self.journal_file_path):
+                return fit_scores
+            with open(self.journal_file_path) as journal_file:
+                for line in journal_file:
+                    try:
+                        fit_score = json.loads(line)
+                    except json.JSONDecodeError:
+                        # last line of a run killed mid write
+                        continue
+                    fit_scores[fit_score["key"]] = fit_score["score"]
+            return fit_scores
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_fit_result(self,key:str):
+        """
+        Returns the journaled cv score of a fit or None
+        """
+        try:
+            return self.fit_scores.get(key)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def put_fit_result(self,key:str,score:float):
+        try:
+            os.makedirs(self.checkpoint_dir,exist_ok=True)
+            with open(self.journal_file_path,"a") as journal_file:
+                journal_file.write(json.dumps({"key":key,"score":float(score)})+"\n")
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
+            self.fit_scores[key] = float(score)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    @staticmethod
+    def get_search_key(initialized_model,search_strategy:dict,data_fingerprint:str)->str:
+        """
+        Identifies the search of one model so a checkpoint is not reused once model.yaml or the data changed
+        """
+        return joblib.hash({
+            "model_serial_number":initialized_model.model_serial_number,
+            "model_name":initialized_model.model_name,
+            "params":sorted((name,repr(value)) for name,value in initialized_model.model.get_params(deep=False).items()),
+            "param_grid_search":repr(initialized_model.param_grid_search),
+            "search_strategy":repr(search_strategy),
+            "warm_start":repr(initialized_model.warm_start),
+            "data":data_fingerprint
+        })
+
+    def get_search_result_file_path(self,key:str)->str:
+        return os.path.join(self.checkpoint_dir,SEARCH_RESULT_DIR_NAME,f"{key}.pkl")
+
+    def get_search_result(self,key:str):
+        """
+        Returns the checkpointed GridSearchedBestModel of a finished model search or None
+        """
+        try:
+            search_result_file_path = self.get_search_result_file_path(key)
+            if not os.path.exists(search_result_file_path):
+                return None
+            logging.info(f"Reusing checkpointed search result [{search_result_file_path}]")
+            return load_object(file_path=search_result_file_path)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def put_search_result(self,key:str,grid_searched_best_model):
+        try:
+            search_result_file_path = self.get_search_result_file_path(key)
+            save_object(file_path=f"{search_result_file_path}.tmp",obj=grid_searched_best_model)
+            os.replace(f"{search_result_file_path}.tmp",search_result_file_path)
+        except Exception as e:
+            raise HousingException(e,sys) from e
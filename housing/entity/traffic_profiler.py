@@ -0,0 +1,173 @@
+import atexit
+import os,sys
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+import pandas as pd
+from housing.exception import HousingException
+from housing.logger import logging
+from housing.entity.data_sketch import DatasetSketch
+from housing.entity.schema_validator import SchemaValidator
+
+PROFILE_FILE_EXTENSION = ".json"
+
+
+def get_window_start(timestamp:float,window_seconds:int)->int:
+    return int(timestamp//window_seconds*window_seconds)
+
+
+class TrafficProfiler:
+    """
+    Accumulates column sketches of the feature values sent for prediction in fixed time windows.
+    Request threads only append their dataframe to a deque, which needs no lock. A background thread
+    of each serving process is the single writer of that process' sketches and rewrites them as
+    profile_dir/<window start>/<process id>.json every flush_interval seconds, so the windows of
+    all serving processes are merged by whoever reads them.
+    """
+
+    def __init__(self,profile_dir:str,numerical_columns:list,categorical_columns:list,
+                 window_seconds:int=3600,flush_interval:float=30.0,max_pending:int=10000):
+        try:
+            self.profile_dir = profile_dir
+            self.numerical_columns = list(numerical_columns)
+            self.categorical_columns = list(categorical_columns)
+            self.window_seconds = int(window_seconds)
+            self.flush_interval = flush_interval
+            # oldest dataframes are dropped if the flusher falls behind, requests never wait for it
+            self.pending = deque(maxlen=max_pending)
+            self.window_sketches = dict()
+            self.worker = None
+            self.worker_pid = None
+            self.worker_id = None
+            self.worker_lock = threading.Lock()
+            self.flush_lock = threading.Lock()
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    @classmethod
+    def from_schema_file(cls,profile_dir:str,schema_file_path:str,**kwargs)->"TrafficProfiler":
+        """
+        Profiler of the model input columns of schema_file_path
+        """
+        try:
+            schema_validator = SchemaValidator.from_schema_file(schema_file_path)
+            return cls(profile_dir=profile_dir,
+                       numerical_columns=[column for column in schema_validator.input_columns
+                                          if column in schema_validator.numerical_columns],
+                       categorical_columns=[column for column in schema_validator.input_columns
+                                            if column in schema_validator.categorical_columns],
+                       **kwargs)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def ensure_worker(self):
+        # flusher thread is started lazily and per process, so the profiler survives a gunicorn fork
+        if self.worker is not None and self.worker_pid == os.getpid() and self.worker.is_alive():
+            return
+        with self.worker_lock:
+            if self.worker is not None and self.worker_pid == os.getpid() and self.worker.is_alive():
+                return
+            if self.worker_pid != os.getpid():
+                # sketches inherited from the parent process are flushed by the parent
+                self.pending.clear()
+                self.window_sketches = dict()
+                self.worker_id = f"{os.getpid()}_{uuid.uuid4().hex[:8]}"
+                atexit.register(self.flush)
+            self.worker_pid = os.getpid()
+            self.worker = threading.Thread(target=self.run,daemon=True,name="traffic_profiler")
+            self.worker.start()
+            logging.info(f"Traffic profiler [{self.worker_id}] started with window_seconds:[{self.window_seconds}] "
+                         f"flush_interval:[{self.flush_interval}]")
+
+    def observe(self,dataframe:pd.DataFrame):
+        """
+        Records the feature values of one prediction request
+        """
+        try:
+            self.ensure_worker()
+            self.pending.append((time.time(),dataframe))
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_window_file_path(self,window_start:int)->str:
+        return os.path.join(self.profile_dir,str(window_start),f"{self.worker_id}{PROFILE_FILE_EXTENSION}")
+
+    def get_window_sketch(self,window_start:int)->DatasetSketch:
+        window_sketch = self.window_sketches.get(window_start)
+        if window_sketch is None:
+            # a window already flushed and released is continued from its file
+            window_file_path = self.get_window_file_path(window_start)
+            if os.path.exists(window_file_path):
+                window_sketch = DatasetSketch.load(window_file_path)
+            else:
+                window_sketch = DatasetSketch(numerical_columns=self.numerical_columns,
+                                              categorical_columns=self.categorical_columns)
+            self.window_sketches[window_start] = window_sketch
+        return window_sketch
+
+    def flush(self):
+        """
+        Sketches the pending dataframes and saves every window which received rows
+        """
+        try:
+            if self.worker_pid != os.getpid():
+                # nothing was observed by this process yet
+                return
+            with self.flush_lock:
+                window_dataframes = defaultdict(list)
+                while True:
+                    try:
+                        observed_at,dataframe = self.pending.popleft()
+                    except IndexError:
+                        break
+                    window_dataframes[get_window_start(observed_at,self.window_seconds)].append(dataframe)
+
+                for window_start,dataframes in window_dataframes.items():
+                    window_sketch = self.get_window_sketch(window_start)
+                    # one sketch update per window amortizes the per column cost over all requests
+                    window_sketch.update(pd.concat(dataframes,ignore_index=True) if len(dataframes) > 1
+                                         else dataframes[0])
+                    window_sketch.save(self.get_window_file_path(window_start))
+
+                current_window_start = get_window_start(time.time(),self.window_seconds)
+                for window_start in [window_start for window_start in self.window_sketches
+                                     if window_start < current_window_start]:
+                    del self.window_sketches[window_start]
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                logging.exception(f"Traffic profiler [{self.worker_id}] failed to flush")
+
+    @staticmethod
+    def load_traffic_sketch(profile_dir:str,start_time:float,stop_time:float=None):
+        """
+        Merges the sketches of every serving process in the windows starting within [start_time, stop_time)
+        return: (DatasetSketch or None if no window was found, list of merged window starts)
+        """
+        try:
+            stop_time = time.time() if stop_time is None else stop_time
+            if not os.path.isdir(profile_dir):
+                return None,[]
+            window_starts = sorted(int(name) for name in os.listdir(profile_dir)
+                                   if name.isdigit() and start_time <= int(name) < stop_time)
+            traffic_sketch = None
+            for window_start in window_starts:
+                window_dir = os.path.join(profile_dir,str(window_start))
+                for file_name in sorted(os.listdir(window_dir)):
+                    if not file_name.endswith(PROFILE_FILE_EXTENSION):
+                        continue
+                    window_sketch = DatasetSketch.load(os.path.join(window_dir,file_name))
+                    if traffic_sketch is None:
+                        traffic_sketch = window_sketch
+                    else:
+                        traffic_sketch.merge(window_sketch)
+            return traffic_sketch,window_starts
+        except Exception as e:
+            raise HousingException(e,sys) from e
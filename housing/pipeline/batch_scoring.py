@@ -0,0 +1,136 @@
+import argparse
+import os,sys
+import time
+from collections import deque, namedtuple
+from multiprocessing import Pool
+
+import pandas as pd
+from housing.constant import ROOT_DIR
+from housing.entity.housing_predictor import HousingPredictor
+from housing.exception import HousingException
+from housing.logger import logging
+from housing.util.util import load_object, DataFrameChunkWriter
+
+SAVED_MODELS_DIR_NAME = "saved_models"
+PREDICTION_COLUMN_NAME = "predicted_median_house_value"
+DEFAULT_CHUNK_SIZE = 50000
+
+BatchScoringResult = namedtuple("BatchScoringResult", ["input_file_path", "output_file_path", "model_path",
+                                                       "rows", "execution_time", "rows_per_second"])
+
+# model loaded once per worker process by the pool initializer
+_worker_model = None
+
+
+def init_scoring_worker(model_path:str):
+    global _worker_model
+    _worker_model = load_object(file_path=model_path)
+
+
+def score_chunk(input_df:pd.DataFrame):
+    return _worker_model.predict(input_df)
+
+
+class BatchScorer:
+    """
+    Streams a csv/parquet file in fixed size chunks through the latest pushed model
+    and writes the input rows with a prediction column chunk by chunk.
+    """
+
+    def __init__(self,model_dir:str,chunk_size:int=DEFAULT_CHUNK_SIZE,n_workers:int=1):
+        try:
+            self.model_dir = model_dir
+            self.chunk_size = chunk_size
+            self.n_workers = n_workers
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_input_chunks(self,input_file_path:str):
+        try:
+            if input_file_path.endswith(".parquet"):
+                import pyarrow.parquet as pq
+                parquet_file = pq.ParquetFile(input_file_path)
+                for record_batch in parquet_file.iter_batches(batch_size=self.chunk_size):
+                    yield record_batch.to_pandas()
+            else:
+                for input_df in pd.read_csv(input_file_path,chunksize=self.chunk_size):
+                    yield input_df
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def score(self,input_file_path:str,output_file_path:str)->BatchScoringResult:
+        try:
+            # resolving the model once keeps every chunk on the same model even if a new one is pushed
+            model_path = HousingPredictor(model_dir=self.model_dir).get_latest_model_path()
+            logging.info(f"Scoring file:[{input_file_path}] with model:[{model_path}] "
+                         f"chunk size:[{self.chunk_size}] workers:[{self.n_workers}]")
+            start_time = time.perf_counter()
+            writer = DataFrameChunkWriter(file_path=output_file_path)
+            rows = 0
+            try:
+                if self.n_workers > 1:
+                    rows = self.score_with_pool(input_file_path,model_path,writer)
+                else:
+                    init_scoring_worker(model_path)
+                    for input_df in self.get_input_chunks(input_file_path):
+                        input_df[PREDICTION_COLUMN_NAME] = score_chunk(input_df)
+                        writer.write(input_df)
+                        rows += len(input_df)
+            finally:
+                writer.close()
+
+            execution_time = time.perf_counter() - start_time
+            batch_scoring_result = BatchScoringResult(input_file_path=input_file_path,
+                                                      output_file_path=output_file_path,
+                                                      model_path=model_path,
+                                                      rows=rows,
+                                                      execution_time=execution_time,
+                                                      rows_per_second=rows/execution_time if execution_time else 0)
+            logging.info(f"Batch scoring result:{batch_scoring_result}")
+            return batch_scoring_result
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def score_with_pool(self,input_file_path:str,model_path:str,writer:DataFrameChunkWriter)->int:
+        try:
+            rows = 0
+            # bounding the chunks in flight keeps memory flat while preserving output order
+            max_in_flight = 2*self.n_workers
+            in_flight = deque()
+            with Pool(processes=self.n_workers,initializer=init_scoring_worker,initargs=(model_path,)) as pool:
+                for input_df in self.get_input_chunks(input_file_path):
+                    in_flight.append((input_df,pool.apply_async(score_chunk,(input_df,))))
+                    if len(in_flight) >= max_in_flight:
+                        rows += BatchScorer.write_scored_chunk(writer,*in_flight.popleft())
+                while len(in_flight) > 0:
+                    rows += BatchScorer.write_scored_chunk(writer,*in_flight.popleft())
+            return rows
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    @staticmethod
+    def write_scored_chunk(writer:DataFrameChunkWriter,input_df:pd.DataFrame,async_result)->int:
+        input_df[PREDICTION_COLUMN_NAME] = async_result.get()
+        writer.write(input_df)
+        return len(input_df)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="housing-score",
+                                     description="Score a csv/parquet file with the latest pushed housing model")
+    parser.add_argument("input_file_path",help="csv or parquet file to score")
+    parser.add_argument("output_file_path",help="csv or parquet file to write predictions into")
+    parser.add_argument("--model-dir",default=os.path.join(ROOT_DIR,SAVED_MODELS_DIR_NAME),
+                        help="directory of pushed models")
+    parser.add_argument("--chunk-size",type=int,default=DEFAULT_CHUNK_SIZE,help="rows per chunk")
+    parser.add_argument("--workers",type=int,default=1,help="number of worker processes")
+    args = parser.parse_args(argv)
+
+    batch_scorer = BatchScorer(model_dir=args.model_dir,chunk_size=args.chunk_size,n_workers=args.workers)
+    result = batch_scorer.score(input_file_path=args.input_file_path,output_file_path=args.output_file_path)
+    print(f"Scored {result.rows} rows in {result.execution_time:.2f}s "
+          f"({result.rows_per_second:.0f} rows/sec) into {result.output_file_path}")
+
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,385 @@
+import os,sys
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timedelta
+import pandas as pd
+from housing.exception import HousingException
+from housing.logger import logging
+
+RUNNING_STATUS = "running"
+COMPLETED_STATUS = "completed"
+
+EXPERIMENT_ORDER_COLUMNS = {
+    "start_time":"start_time",
+    "accuracy":"accuracy",
+    "execution_time":"execution_time"
+}
+
+# columns shown on the experiment history pages
+EXPERIMENT_DISPLAY_COLUMNS = ["experiment_id","artifact_time_stamp","running_status","start_time","stop_time",
+                              "execution_time","message","accuracy","is_model_accepted","created_time_stamp"]
+
+SCHEMA_STATEMENTS = [
+    """CREATE TABLE IF NOT EXISTS experiments (
+        experiment_id TEXT PRIMARY KEY,
+        initialization_timestamp TEXT,
+        artifact_time_stamp TEXT,
+        running_status INTEGER NOT NULL,
+        start_time TEXT,
+        stop_time TEXT,
+        execution_time REAL,
+        message TEXT,
+        experiment_file_path TEXT,
+        accuracy REAL,
+        is_model_accepted INTEGER,
+        created_time_stamp TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS experiments_start_time ON experiments (start_time)",
+    "CREATE INDEX IF NOT EXISTS experiments_status_start_time ON experiments (running_status, start_time)",
+    "CREATE INDEX IF NOT EXISTS experiments_accuracy ON experiments (accuracy)",
+    """CREATE TABLE IF NOT EXISTS stage_timings (
+        experiment_id TEXT NOT NULL,
+        stage_name TEXT NOT NULL,
+        start_time TEXT,
+        stop_time TEXT,
+        execution_time REAL,
+        is_reused INTEGER,
+        cpu_time REAL,
+        peak_rss INTEGER,
+        rows_in INTEGER,
+        rows_out INTEGER,
+        read_bytes INTEGER,
+        write_bytes INTEGER,
+        PRIMARY KEY (experiment_id, stage_name)
+    )""",
+    """CREATE TABLE IF NOT EXISTS model_profiles (
+        experiment_id TEXT NOT NULL,
+        stage_name TEXT NOT NULL,
+        model_name TEXT NOT NULL,
+        execution_time REAL,
+        cpu_time REAL,
+        peak_rss INTEGER,
+        rows_in INTEGER,
+        rows_out INTEGER,
+        read_bytes INTEGER,
+        write_bytes INTEGER,
+        PRIMARY KEY (experiment_id, stage_name, model_name)
+    )""",
+    """CREATE TABLE IF NOT EXISTS metrics (
+        experiment_id TEXT NOT NULL,
+        name TEXT NOT NULL,
+        value REAL,
+        PRIMARY KEY (experiment_id, name)
+    )""",
+]
+
+# columns added to stage_timings after its first release, created on stores of earlier versions
+STAGE_PROFILE_COLUMNS = {
+    "cpu_time":"REAL",
+    "peak_rss":"INTEGER",
+    "rows_in":"INTEGER",
+    "rows_out":"INTEGER",
+    "read_bytes":"INTEGER",
+    "write_bytes":"INTEGER"
+}
+
+# resource columns shown on the experiment history page, memory and io in megabytes
+PROFILE_DISPLAY_COLUMNS = """ROUND(execution_time, 3) AS wall_time, ROUND(cpu_time, 3) AS cpu_time,
+    ROUND(peak_rss / 1048576.0, 1) AS peak_rss_mb, rows_in, rows_out,
+    ROUND(read_bytes / 1048576.0, 1) AS read_mb, ROUND(write_bytes / 1048576.0, 1) AS write_mb"""
+
+# latest experiment first, like the experiment history page
+EXPERIMENT_START_TIME_ORDER = """(SELECT experiments.start_time FROM experiments
+    WHERE experiments.experiment_id = {table}.experiment_id) DESC, {table}.experiment_id"""
+
+
+def to_text(value):
+    if value is None:
+        return None
+    if isinstance(value,datetime):
+        return value.isoformat(sep=" ")
+    return str(value)
+
+
+def to_seconds(value):
+    if value is None:
+        return None
+    if isinstance(value,timedelta):
+        return value.total_seconds()
+    return float(value)
+
+
+def to_flag(value):
+    return None if value is None else int(bool(value))
+
+
+class ExperimentStore:
+    """
+    SQLite store of pipeline experiments, the resource profiles of their stages and models, and metrics.
+    The database runs in WAL mode so the web app can page through history while a
+    pipeline thread writes to it; every query is served by an index and returns one page.
+    """
+
+    def __init__(self,db_file_path:str):
+        try:
+            self.db_file_path = db_file_path
+            os.makedirs(os.path.dirname(db_file_path),exist_ok=True)
+            with closing(self.connect()) as connection:
+                connection.execute("PRAGMA journal_mode=WAL")
+                with connection:
+                    for statement in SCHEMA_STATEMENTS:
+                        connection.execute(statement)
+                    stage_timing_columns = {row["name"] for row in
+                                            connection.execute("PRAGMA table_info(stage_timings)").fetchall()}
+                    for column,column_type in STAGE_PROFILE_COLUMNS.items():
+                        if column not in stage_timing_columns:
+                            connection.execute(f"ALTER TABLE stage_timings ADD COLUMN {column} {column_type}")
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def connect(self)->sqlite3.Connection:
+        # connections are short lived and per call, so the store can be shared across threads
+        connection = sqlite3.connect(self.db_file_path,timeout=30)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def execute(self,statement:str,parameters=()):
+        with closing(self.connect()) as connection:
+            with connection:
+                connection.execute(statement,parameters)
+
+    def query(self,statement:str,parameters=())->list:
+        with closing(self.connect()) as connection:
+            return [dict(row) for row in connection.execute(statement,parameters).fetchall()]
+
+    def save_experiment(self,experiment):
+        """
+        Inserts or updates the experiment namedtuple of Pipeline
+        """
+        try:
+            self.execute(
+                """INSERT INTO experiments (experiment_id, initialization_timestamp, artifact_time_stamp,
+                    running_status, start_time, stop_time, execution_time, message, experiment_file_path,
+                    accuracy, is_model_accepted, created_time_stamp)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (experiment_id) DO UPDATE SET
+                    initialization_timestamp=excluded.initialization_timestamp,
+                    artifact_time_stamp=excluded.artifact_time_stamp,
+                    running_status=excluded.running_status,
+                    start_time=excluded.start_time,
+                    stop_time=excluded.stop_time,
+                    execution_time=excluded.execution_time,
+                    message=excluded.message,
+                    experiment_file_path=excluded.experiment_file_path,
+                    accuracy=excluded.accuracy,
+                    is_model_accepted=excluded.is_model_accepted,
+                    created_time_stamp=excluded.created_time_stamp""",
+                (experiment.experiment_id,
+                 to_text(experiment.Initialization_timestamp),
+                 to_text(experiment.artifact_time_stamp),
+                 to_flag(experiment.running_status),
+                 to_text(experiment.start_time),
+                 to_text(experiment.stop_time),
+                 to_seconds(experiment.execution_time),
+                 experiment.message,
+                 to_text(experiment.experiment_file_path),
+                 None if experiment.accuracy is None else float(experiment.accuracy),
+                 to_flag(experiment.is_model_accepted),
+                 to_text(datetime.now())))
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def save_stage_profile(self,experiment_id:str,stage_name:str,profile,is_reused:bool=False):
+        """
+        Saves the ResourceProfile of a pipeline stage and the profiles of the models it reported
+        """
+        try:
+            with closing(self.connect()) as connection:
+                with connection:
+                    connection.execute(
+                        """INSERT OR REPLACE INTO stage_timings
+                        (experiment_id, stage_name, start_time, stop_time, execution_time, is_reused, cpu_time,
+                        peak_rss, rows_in, rows_out, read_bytes, write_bytes)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                        (experiment_id,stage_name,to_text(profile.start_time),to_text(profile.stop_time),
+                         to_seconds(profile.wall_time),to_flag(is_reused),to_seconds(profile.cpu_time),
+                         profile.peak_rss,profile.rows_in,profile.rows_out,profile.read_bytes,profile.write_bytes))
+                    connection.executemany(
+                        """INSERT OR REPLACE INTO model_profiles
+                        (experiment_id, stage_name, model_name, execution_time, cpu_time, peak_rss, rows_in,
+                        rows_out, read_bytes, write_bytes)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                        [(experiment_id,stage_name,model_profile.name,to_seconds(model_profile.wall_time),
+                          to_seconds(model_profile.cpu_time),model_profile.peak_rss,model_profile.rows_in,
+                          model_profile.rows_out,model_profile.read_bytes,model_profile.write_bytes)
+                         for model_profile in profile.children])
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def save_metrics(self,experiment_id:str,metrics:dict):
+        try:
+            with closing(self.connect()) as connection:
+                with connection:
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO metrics (experiment_id, name, value) VALUES (?, ?, ?)",
+                        [(experiment_id,name,None if value is None else float(value))
+                         for name,value in metrics.items()])
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    @staticmethod
+    def get_filter_clause(status:str=None,min_accuracy:float=None,start_time_from:str=None,
+                          start_time_to:str=None):
+        conditions = []
+        parameters = []
+        if status == RUNNING_STATUS:
+            conditions.append("running_status = 1")
+        elif status == COMPLETED_STATUS:
+            conditions.append("running_status = 0")
+        if min_accuracy is not None:
+            conditions.append("accuracy >= ?")
+            parameters.append(float(min_accuracy))
+        if start_time_from is not None:
+            conditions.append("start_time >= ?")
+            parameters.append(start_time_from)
+        if start_time_to is not None:
+            conditions.append("start_time < ?")
+            parameters.append(start_time_to)
+        where_clause = f"WHERE {' AND '.join(conditions)}" if len(conditions) > 0 else ""
+        return where_clause,parameters
+
+    def get_experiments(self,limit:int=5,offset:int=0,status:str=None,min_accuracy:float=None,
+                        start_time_from:str=None,start_time_to:str=None,order_by:str="start_time",
+                        descending:bool=True)->pd.DataFrame:
+        """
+        Returns one page of experiments, latest first by default
+        status: running, completed or None for all
+        order_by: start_time, accuracy or execution_time
+        """
+        try:
+            if order_by not in EXPERIMENT_ORDER_COLUMNS:
+                raise Exception(f"Experiments can not be ordered by [{order_by}], "
+                                f"expected one of {list(EXPERIMENT_ORDER_COLUMNS)}")
+            where_clause,parameters = ExperimentStore.get_filter_clause(status=status,
+                                                                         min_accuracy=min_accuracy,
+                                                                         start_time_from=start_time_from,
+                                                                         start_time_to=start_time_to)
+            direction = "DESC" if descending else "ASC"
+            rows = self.query(
+                f"""SELECT {', '.join(EXPERIMENT_DISPLAY_COLUMNS)} FROM experiments {where_clause}
+                ORDER BY {EXPERIMENT_ORDER_COLUMNS[order_by]} {direction}, experiment_id {direction}
+                LIMIT ? OFFSET ?""",
+                parameters+[int(limit),int(offset)])
+            experiment_df = pd.DataFrame(rows,columns=EXPERIMENT_DISPLAY_COLUMNS)
+            for column in ["running_status","is_model_accepted"]:
+                experiment_df[column] = experiment_df[column].map({1:True,0:False})
+            return experiment_df
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def count_experiments(self,status:str=None,min_accuracy:float=None,start_time_from:str=None,
+                          start_time_to:str=None)->int:
+        try:
+            where_clause,parameters = ExperimentStore.get_filter_clause(status=status,
+                                                                         min_accuracy=min_accuracy,
+                                                                         start_time_from=start_time_from,
+                                                                         start_time_to=start_time_to)
+            return self.query(f"SELECT COUNT(*) AS count FROM experiments {where_clause}",parameters)[0]["count"]
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_experiment(self,experiment_id:str)->dict:
+        try:
+            rows = self.query("SELECT * FROM experiments WHERE experiment_id = ?",(experiment_id,))
+            return rows[0] if len(rows) > 0 else None
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_latest_running_experiment(self)->dict:
+        try:
+            rows = self.query("""SELECT * FROM experiments WHERE running_status = 1
+                              ORDER BY start_time DESC LIMIT 1""")
+            return rows[0] if len(rows) > 0 else None
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_stage_timings(self,experiment_id:str)->pd.DataFrame:
+        try:
+            return pd.DataFrame(self.query("""SELECT stage_name, start_time, stop_time, execution_time, is_reused
+                                           FROM stage_timings WHERE experiment_id = ? ORDER BY start_time""",
+                                           (experiment_id,)))
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    @staticmethod
+    def get_experiment_id_clause(experiment_ids:list):
+        experiment_ids = list(experiment_ids)
+        return f"experiment_id IN ({', '.join('?'*len(experiment_ids))})",experiment_ids
+
+    def get_stage_profiles(self,experiment_ids:list)->pd.DataFrame:
+        """
+        Stage profiles of experiment_ids, one row per experiment and stage in execution order
+        """
+        try:
+            experiment_id_clause,parameters = ExperimentStore.get_experiment_id_clause(experiment_ids)
+            return pd.DataFrame(self.query(
+                f"""SELECT experiment_id, stage_name, is_reused, {PROFILE_DISPLAY_COLUMNS}
+                FROM stage_timings WHERE {experiment_id_clause}
+                ORDER BY {EXPERIMENT_START_TIME_ORDER.format(table='stage_timings')}, start_time""",parameters))
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_model_profiles(self,experiment_ids:list)->pd.DataFrame:
+        try:
+            experiment_id_clause,parameters = ExperimentStore.get_experiment_id_clause(experiment_ids)
+            return pd.DataFrame(self.query(
+                f"""SELECT experiment_id, stage_name, model_name, {PROFILE_DISPLAY_COLUMNS}
+                FROM model_profiles WHERE {experiment_id_clause}
+                ORDER BY {EXPERIMENT_START_TIME_ORDER.format(table='model_profiles')}, model_name""",parameters))
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_metrics(self,experiment_id:str)->dict:
+        try:
+            return {row["name"]:row["value"]
+                    for row in self.query("SELECT name, value FROM metrics WHERE experiment_id = ?",
+                                          (experiment_id,))}
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def import_experiment_csv(self,csv_file_path:str)->int:
+        """
+        One time import of the experiment.csv written by earlier versions, last row per experiment wins
+        """
+        try:
+            experiment_df = pd.read_csv(csv_file_path)
+            experiment_df = experiment_df.drop_duplicates(subset=["experiment_id"],keep="last")
+            experiment_df = experiment_df.astype(object).where(experiment_df.notna(),None)
+            rows = []
+            for experiment in experiment_df.to_dict(orient="records"):
+                rows.append((experiment.get("experiment_id"),
+                             to_text(experiment.get("Initialization_timestamp")),
+                             to_text(experiment.get("artifact_time_stamp")),
+                             int(str(experiment.get("running_status")) == "True"),
+                             to_text(experiment.get("start_time")),
+                             to_text(experiment.get("stop_time")),
+                             to_seconds(pd.to_timedelta(experiment["execution_time"]))
+                             if experiment.get("execution_time") is not None else None,
+                             experiment.get("message"),
+                             to_text(experiment.get("experiment_file_path")),
+                             None if experiment.get("accuracy") is None else float(experiment["accuracy"]),
+                             None if experiment.get("is_model_accepted") is None
+                             else int(str(experiment["is_model_accepted"]) == "True"),
+                             to_text(experiment.get("created_time_stamp"))))
+            with closing(self.connect()) as connection:
+                with connection:
+                    connection.executemany(
+                        """INSERT OR IGNORE INTO experiments (experiment_id, initialization_timestamp,
+                        artifact_time_stamp, running_status, start_time, stop_time, execution_time, message,
+                        experiment_file_path, accuracy, is_model_accepted, created_time_stamp)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",rows)
+            logging.info(f"Imported [{len(rows)}] experiments from [{csv_file_path}]")
+            return len(rows)
+        except Exception as e:
+            raise HousingException(e,sys) from e
@@ -20,8 +20,17 @@ from housing.component.data_validation import DataValidation
 from housing.component.data_transformation import DataTransformation
 from housing.component.model_trainer import ModelTrainer
 from housing.component.model_evaluation import ModelEvaluation
+from housing.entity import model_factory, schema_validator, data_sketch, data_drift, preprocessor_cache,\
+    fit_result_cache, search_checkpoint
+from housing.util import util
+from housing.pipeline.stage_cache import StageCache
+from housing.pipeline.experiment_store import ExperimentStore
+from housing.util.util import get_code_version, get_file_hash, get_fingerprint, get_row_count
+from housing.util.resource_profiler import ResourceProfile, ResourceProfiler
 import os,sys
-from housing.constant import EXPERIMENT_DIR_NAME,EXPERIMENT_FILE_NAME
+from housing.constant import EXPERIMENT_DIR_NAME,EXPERIMENT_FILE_NAME,EXPERIMENT_DB_FILE_NAME,\
+    DATA_INGESTION_CONFIG_KEY,\
+    DATA_VALIDATION_CONFIG_KEY,DATA_TRANSFORMATION_CONFIG_KEY,MODEL_TRAINER_CONFIG_KEY
 
 Experiment = namedtuple("Experiment",["experiment_id","Initialization_timestamp","artifact_time_stamp",
                         "running_status","start_time","stop_time","execution_time",
@@ -32,24 +41,155 @@ class Pipeline(Thread):
     experiment : Experiment = Experiment(*([None]*11))
 
     experiment_file_path = None
+    experiment_store : ExperimentStore = None
 
-    def __init__(self,config:Configuartion = Configuartion())->None:
+    def __init__(self,config:Configuartion = Configuartion(),resume:bool=False)->None:
+        """
+        resume: continue the last experiment that never completed, reusing its artifact
+        timestamp so finished stages and checkpointed search fits are picked up again
+        """
         try:
             os.makedirs(config.training_pipeline_config.artifact_dir,exist_ok=True)
             Pipeline.experiment_file_path= os.path.join(config.training_pipeline_config.artifact_dir,
-                                EXPERIMENT_DIR_NAME,EXPERIMENT_FILE_NAME)
+                                EXPERIMENT_DIR_NAME,EXPERIMENT_DB_FILE_NAME)
+            Pipeline.get_experiment_store()
             super().__init__(daemon=False,name="pipeline")
+            self.resumed_experiment = Pipeline.get_resumable_experiment() if resume else None
+            if self.resumed_experiment is not None:
+                logging.info(f"Resuming experiment:{self.resumed_experiment}")
+                config.time_stamp = self.resumed_experiment["artifact_time_stamp"]
             self.config=config
+            self.stage_cache = StageCache(cache_dir=config.training_pipeline_config.stage_cache_dir)
+            # completed stages of this run, kept even when the shared stage cache is disabled
+            self.checkpoint = StageCache(cache_dir=os.path.join(config.training_pipeline_config.checkpoint_dir,
+                                                                config.time_stamp))
+            self.row_counts = {}
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    @classmethod
+    def get_experiment_store(cls)->ExperimentStore:
+        """
+        Opens the experiment store once per process, importing experiment.csv of earlier versions
+        """
+        try:
+            if Pipeline.experiment_file_path is None:
+                Pipeline.experiment_file_path = os.path.join(Configuartion().training_pipeline_config.artifact_dir,
+                                                             EXPERIMENT_DIR_NAME,EXPERIMENT_DB_FILE_NAME)
+            if Pipeline.experiment_store is None or \
+                    Pipeline.experiment_store.db_file_path != Pipeline.experiment_file_path:
+                is_new_store = not os.path.exists(Pipeline.experiment_file_path)
+                experiment_store = ExperimentStore(db_file_path=Pipeline.experiment_file_path)
+                csv_file_path = os.path.join(os.path.dirname(Pipeline.experiment_file_path),EXPERIMENT_FILE_NAME)
+                if is_new_store and os.path.exists(csv_file_path):
+                    experiment_store.import_experiment_csv(csv_file_path=csv_file_path)
+                Pipeline.experiment_store = experiment_store
+            return Pipeline.experiment_store
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    @classmethod
+    def get_resumable_experiment(cls)->dict:
+        """
+        Returns the latest experiment whose last recorded state is still running, or None
+        """
+        try:
+            return Pipeline.get_experiment_store().get_latest_running_experiment()
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def save_stage_profile(self,stage_name:str,profile:ResourceProfile,is_reused:bool=False):
+        try:
+            logging.info(f"Stage [{stage_name}] profile:{profile}")
+            if Pipeline.experiment.experiment_id is not None:
+                Pipeline.experiment_store.save_stage_profile(experiment_id=Pipeline.experiment.experiment_id,
+                                                             stage_name=stage_name,
+                                                             profile=profile,
+                                                             is_reused=is_reused)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_row_count(self,*file_paths)->int:
+        """
+        Total rows of the existing files among file_paths, None if there is none. Counts are kept per
+        file for the run, as the ingested files are the input of several stages.
+        """
+        try:
+            file_paths = [file_path for file_path in file_paths
+                          if isinstance(file_path,str) and os.path.isfile(file_path)]
+            if len(file_paths) == 0:
+                return None
+            for file_path in file_paths:
+                if file_path not in self.row_counts:
+                    self.row_counts[file_path] = get_row_count(file_path)
+            return sum(self.row_counts[file_path] for file_path in file_paths)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def run_stage(self,stage_name:str,artifact_cls,fingerprint_data:dict,initiate_stage,get_row_counts=None):
+        """
+        Reuses the artifact of stage_name checkpointed by this run or cached by a previous
+        run with the same fingerprint_data, otherwise calls initiate_stage and stores its artifact.
+        The stage is profiled either way, get_row_counts maps its artifact to (rows_in, rows_out).
+        """
+        try:
+            with ResourceProfiler(name=stage_name) as profiler:
+                fingerprint = get_fingerprint(fingerprint_data)
+                artifact = self.checkpoint.get(stage_name=stage_name,fingerprint=fingerprint,
+                                               artifact_cls=artifact_cls)
+                is_checkpointed = artifact is not None
+                if is_checkpointed:
+                    logging.info(f"Stage [{stage_name}] already completed in this run, resuming with:{artifact}")
+
+                use_stage_cache = self.config.training_pipeline_config.use_stage_cache
+                if artifact is None and use_stage_cache:
+                    artifact = self.stage_cache.get(stage_name=stage_name,fingerprint=fingerprint,
+                                                    artifact_cls=artifact_cls)
+                    if artifact is not None:
+                        logging.info(f"Inputs of stage [{stage_name}] unchanged, reusing cached artifact:{artifact}")
+
+                is_reused = artifact is not None
+                if artifact is None:
+                    artifact = initiate_stage()
+                    if use_stage_cache:
+                        self.stage_cache.put(stage_name=stage_name,fingerprint=fingerprint,artifact=artifact)
+                if not is_checkpointed:
+                    self.checkpoint.put(stage_name=stage_name,fingerprint=fingerprint,artifact=artifact)
+                if get_row_counts is not None:
+                    profiler.set_rows(*get_row_counts(artifact))
+            self.save_stage_profile(stage_name=stage_name,profile=profiler.profile,is_reused=is_reused)
+            return artifact
         except Exception as e:
             raise HousingException(e,sys) from e
 
     def start_data_ingestion(self)->DataIngestionArtifact:
         try:
+            data_ingestion_config = self.config.get_data_ingestion_config()
             data_ingestion=DataIngestion(
-                        data_ingestion_config=self.config.get_data_ingestion_config()
+                        data_ingestion_config=data_ingestion_config
                         )
+            # conditional download is cheap, so the dataset checksum can be part of the fingerprint
+            dataset_metadata = data_ingestion.fetch_dataset()
+            fingerprint_data = {
+                "config":self.config.config_info[DATA_INGESTION_CONFIG_KEY],
+                # helpers deciding the stage output are hashed with the stage module, so editing them
+                # invalidates the cached artifacts too
+                "code":get_code_version(DataIngestion,util),
+                # ingested files are cast to the schema dtypes, so a schema edit invalidates them
+                "schema":get_file_hash(data_ingestion_config.schema_file_path),
+                "dataset":dataset_metadata["sha256"]
+            }
+
+            def initiate_stage():
+                return data_ingestion.initiate_data_ingestion()
+
+            def get_row_counts(data_ingestion_artifact:DataIngestionArtifact):
+                return None,self.get_row_count(data_ingestion_artifact.train_file_path,
+                                               data_ingestion_artifact.test_file_path)
 
-            return data_ingestion.initiate_data_ingestion()
+            return self.run_stage(stage_name=DataIngestion.__name__,artifact_cls=DataIngestionArtifact,
+                                fingerprint_data=fingerprint_data,initiate_stage=initiate_stage,
+                                get_row_counts=get_row_counts)
         
         except Exception as e:
             raise HousingException(e,sys) from e
@@ -57,12 +197,27 @@ class Pipeline(Thread):
     def start_data_validation(self,data_ingestion_artifact:DataIngestionArtifact)\
     ->DataValidationArtifact:
         try:
-            data_validation = DataValidation(
-                            data_validation_config=self.config.get_data_validation_config(),
-                            data_ingestion_artifact= data_ingestion_artifact)
+            data_validation_config = self.config.get_data_validation_config()
+            fingerprint_data = {
+                "config":self.config.config_info[DATA_VALIDATION_CONFIG_KEY],
+                "code":get_code_version(data_validation,util,schema_validator,data_sketch,data_drift),
+                "schema":get_file_hash(data_validation_config.schema_file_path),
+                "inputs":StageCache.get_artifact_file_hashes(data_ingestion_artifact)
+            }
 
-    
-            return data_validation.initiate_data_validation()
+            def initiate_stage():
+                data_validation = DataValidation(
+                                data_validation_config=data_validation_config,
+                                data_ingestion_artifact= data_ingestion_artifact)
+                return data_validation.initiate_data_validation()
+
+            def get_row_counts(data_validation_artifact:DataValidationArtifact):
+                return self.get_row_count(data_ingestion_artifact.train_file_path,
+                                          data_ingestion_artifact.test_file_path),None
+
+            return self.run_stage(stage_name=DataValidation.__name__,artifact_cls=DataValidationArtifact,
+                                fingerprint_data=fingerprint_data,initiate_stage=initiate_stage,
+                                get_row_counts=get_row_counts)
         except Exception as e:
             raise HousingException(e,sys) from e
 
@@ -71,12 +226,30 @@ class Pipeline(Thread):
                                 data_validation_artifact:DataValidationArtifact
                                 )->DataTransformationArtifact:
         try:
-            data_transformation=DataTransformation(
-                data_transformation_config=self.config.get_data_transformation_config(),
-                           data_ingestion_artifact=data_ingestion_artifact,
-                           data_validation_artifact=data_validation_artifact)
-            
-            return data_transformation.initiate_data_transformation()
+            fingerprint_data = {
+                "config":self.config.config_info[DATA_TRANSFORMATION_CONFIG_KEY],
+                "code":get_code_version(data_transformation,util,preprocessor_cache),
+                "schema":get_file_hash(data_validation_artifact.schema_file_path),
+                "inputs":StageCache.get_artifact_file_hashes(data_ingestion_artifact)
+            }
+
+            def initiate_stage():
+                data_transformation=DataTransformation(
+                    data_transformation_config=self.config.get_data_transformation_config(),
+                               data_ingestion_artifact=data_ingestion_artifact,
+                               data_validation_artifact=data_validation_artifact)
+                return data_transformation.initiate_data_transformation()
+
+            def get_row_counts(data_transformation_artifact:DataTransformationArtifact):
+                return (self.get_row_count(data_ingestion_artifact.train_file_path,
+                                           data_ingestion_artifact.test_file_path),
+                        self.get_row_count(data_transformation_artifact.transformed_train_file_path,
+                                           data_transformation_artifact.transformed_test_file_path))
+
+            return self.run_stage(stage_name=DataTransformation.__name__,
+                                artifact_cls=DataTransformationArtifact,
+                                fingerprint_data=fingerprint_data,initiate_stage=initiate_stage,
+                                get_row_counts=get_row_counts)
         except Exception as e:
             raise HousingException(e,sys) from e
 
@@ -84,37 +257,65 @@ class Pipeline(Thread):
                         data_transformation_artifact:DataTransformationArtifact,
                         )->ModelTrainerArtifact:
         try:
-            model_trainer = ModelTrainer(
-                        model_trainer_config=self.config.get_model_trainer_config(),
-                        data_transformation_artifact=data_transformation_artifact)
-            
-            return model_trainer.initiate_model_trainer()        
+            model_trainer_config = self.config.get_model_trainer_config()
+            fingerprint_data = {
+                "config":self.config.config_info[MODEL_TRAINER_CONFIG_KEY],
+                "code":get_code_version(model_trainer,model_factory,util,fit_result_cache,search_checkpoint),
+                "model_config":get_file_hash(model_trainer_config.model_config_file_path),
+                "inputs":StageCache.get_artifact_file_hashes(data_transformation_artifact)
+            }
+
+            def initiate_stage():
+                model_trainer = ModelTrainer(
+                            model_trainer_config=model_trainer_config,
+                            data_transformation_artifact=data_transformation_artifact)
+                return model_trainer.initiate_model_trainer()
+
+            def get_row_counts(model_trainer_artifact:ModelTrainerArtifact):
+                return self.get_row_count(data_transformation_artifact.transformed_train_file_path,
+                                          data_transformation_artifact.transformed_test_file_path),None
+
+            return self.run_stage(stage_name=ModelTrainer.__name__,artifact_cls=ModelTrainerArtifact,
+                                fingerprint_data=fingerprint_data,initiate_stage=initiate_stage,
+                                get_row_counts=get_row_counts)
         except Exception as e:
             raise HousingException(e,sys) from e
 
     def start_model_evaluation(self,data_ingestion_artifact:DataIngestionArtifact,
                             data_validation_artifact:DataValidationArtifact,
-                            model_trainer_artifact:ModelTrainerArtifact
+                            model_trainer_artifact:ModelTrainerArtifact,
+                            data_transformation_artifact:DataTransformationArtifact=None
                             )->ModelEvaluationArtifact:
         try:
-            model_eval =    ModelEvaluation(
-                            model_evaluation_config= self.config.get_model_evaluation_config(),
-                            data_ingestion_artifact= data_ingestion_artifact,
-                            data_validation_artifact=data_validation_artifact,
-                            model_trainer_artifact= model_trainer_artifact)
-            return model_eval.initiate_model_evaluation()
+            with ResourceProfiler(name=ModelEvaluation.__name__) as profiler:
+                model_eval =    ModelEvaluation(
+                                model_evaluation_config= self.config.get_model_evaluation_config(),
+                                data_ingestion_artifact= data_ingestion_artifact,
+                                data_validation_artifact=data_validation_artifact,
+                                model_trainer_artifact= model_trainer_artifact,
+                                data_transformation_artifact=data_transformation_artifact)
+                model_evaluation_artifact = model_eval.initiate_model_evaluation()
+                profiler.set_rows(rows_in=self.get_row_count(data_ingestion_artifact.train_file_path,
+                                                             data_ingestion_artifact.test_file_path))
+            self.save_stage_profile(stage_name=ModelEvaluation.__name__,profile=profiler.profile)
+            return model_evaluation_artifact
 
         except Exception as e:
             raise HousingException(e,sys) from e
 
     def start_model_pusher(self,
-                    model_eval_artifact:ModelEvaluationArtifact)->ModelPusherArtifact:
+                    model_eval_artifact:ModelEvaluationArtifact,
+                    data_validation_artifact:DataValidationArtifact=None)->ModelPusherArtifact:
         try:
-            model_pusher = ModelPusher(
-                model_pusher_config=self.config.get_model_pusher_config(),
-                model_evaluation_artifact=model_eval_artifact
-                )
-            return model_pusher.initiate_model_pusher()
+            with ResourceProfiler(name=ModelPusher.__name__) as profiler:
+                model_pusher = ModelPusher(
+                    model_pusher_config=self.config.get_model_pusher_config(),
+                    model_evaluation_artifact=model_eval_artifact,
+                    data_validation_artifact=data_validation_artifact
+                    )
+                model_pusher_artifact = model_pusher.initiate_model_pusher()
+            self.save_stage_profile(stage_name=ModelPusher.__name__,profile=profiler.profile)
+            return model_pusher_artifact
         except Exception as e:
             raise HousingException(e,sys) from e
 
@@ -127,7 +328,10 @@ class Pipeline(Thread):
             
             #data ingestion
             logging.info("Pipeline starting")
-            experiment_id = str(uuid.uuid4())
+            if self.resumed_experiment is not None:
+                experiment_id = self.resumed_experiment["experiment_id"]
+            else:
+                experiment_id = str(uuid.uuid4())
 
             Pipeline.experiment = Experiment(experiment_id=experiment_id,
                                             Initialization_timestamp=self.config.time_stamp,
@@ -138,7 +342,8 @@ class Pipeline(Thread):
                                             execution_time=None,
                                             experiment_file_path=Pipeline.experiment_file_path,
                                             is_model_accepted=None,
-                                            message="Pipeline has been started",
+                                            message="Pipeline has been resumed" if self.resumed_experiment
+                                            else "Pipeline has been started",
                                             accuracy=None)
             logging.info(f":Pipeline experiment: {Pipeline.experiment}")
             self.save_experiment()
@@ -160,10 +365,12 @@ class Pipeline(Thread):
             #model evaluation
             model_evaluation_artifact = self.start_model_evaluation(data_ingestion_artifact=data_ingestion_artifact,
                                             data_validation_artifact=data_validation_artifact,
-                                            model_trainer_artifact=model_trainer_artifact)
+                                            model_trainer_artifact=model_trainer_artifact,
+                                            data_transformation_artifact=data_transformation_artifact)
 
             if model_evaluation_artifact.is_model_accepted:
-                model_pusher_artifact = self.start_model_pusher(model_eval_artifact=model_evaluation_artifact)
+                model_pusher_artifact = self.start_model_pusher(model_eval_artifact=model_evaluation_artifact,
+                                                    data_validation_artifact=data_validation_artifact)
                 logging.info(f"Model Pusher artifact:{model_pusher_artifact}")
             else:
                 logging.info("Trained model rejected")
@@ -174,7 +381,7 @@ class Pipeline(Thread):
                                     Initialization_timestamp=self.config.time_stamp,
                                     artifact_time_stamp=self.config.time_stamp,
                                     running_status=False,
-                                    start_time=Pipeline.experiment.experiment_id,
+                                    start_time=Pipeline.experiment.start_time,
                                     stop_time=stop_time,
                                     execution_time=stop_time-Pipeline.experiment.start_time,
                                     message="Pipeline has been completed",
@@ -184,6 +391,14 @@ class Pipeline(Thread):
             
             logging.info(f"Pipeline experiment:{Pipeline.experiment}")
             self.save_experiment()
+            Pipeline.experiment_store.save_metrics(experiment_id=Pipeline.experiment.experiment_id,
+                                                   metrics={
+                                                       "train_rmse":model_trainer_artifact.train_rmse,
+                                                       "test_rmse":model_trainer_artifact.test_rmse,
+                                                       "train_accuracy":model_trainer_artifact.train_accuracy,
+                                                       "test_accuracy":model_trainer_artifact.test_accuracy,
+                                                       "model_accuracy":model_trainer_artifact.model_accuracy
+                                                   })
 
         except Exception as e:
             raise HousingException(e,sys) from e
@@ -191,41 +406,58 @@ class Pipeline(Thread):
     def run(self):
         try:
             self.run_pipeline()
+        except Exception as e:
+            Pipeline.fail_experiment(message=f"Pipeline has failed: {e}")
+            raise HousingException(e,sys) from e
+
+    @classmethod
+    def fail_experiment(cls,message:str):
+        """
+        Records the running experiment as stopped with message, so neither resume nor the history page
+        takes it for a run in progress. Only a run killed before reaching this stays running and resumable.
+        """
+        try:
+            if not Pipeline.experiment.running_status:
+                return
+            stop_time = datetime.now()
+            Pipeline.experiment = Pipeline.experiment._replace(running_status=False,
+                                                               stop_time=stop_time,
+                                                               execution_time=stop_time-Pipeline.experiment.start_time,
+                                                               message=message)
+            logging.info(f"Pipeline experiment:{Pipeline.experiment}")
+            Pipeline.get_experiment_store().save_experiment(Pipeline.experiment)
         except Exception as e:
             raise HousingException(e,sys) from e
 
     def save_experiment(self):
         try:
             if Pipeline.experiment.experiment_id is not None:
-                experiment = Pipeline.experiment
-                experiment_dict = experiment._asdict()
-                experiment_dict: dict = {key:[value] for key,value in experiment_dict.items()}
-                experiment_dict:dict.update({
-                    "created_time_stamp":[datetime.now()],
-                    "experiment_file_path":[os.path.basename(Pipeline.experiment.experiment_file_path)]
-                    })
-                experiment_report = pd.DataFrame(experiment_dict)
-
-                os.makedirs(os.path.dirname(Pipeline.experiment_file_path),exist_ok=True)
-                if os.path.exists(Pipeline.experiment_file_path):
-                    experiment_report.to_csv(Pipeline.experiment_file_path,
-                                            index=False,header=False,mode="a")
-                else:
-                    experiment_report.to_csv(Pipeline.experiment_file_path,
-                                            index=False,header=True,mode="w")
+                Pipeline.get_experiment_store().save_experiment(Pipeline.experiment)
             else:
                 print("First start experiment")
         except Exception as e:
             raise HousingException(e,sys) from e
     
     @classmethod
-    def get_experiments_status(cls,limit:int=5)-> pd.DataFrame:
+    def get_experiment_profiles(cls,experiment_ids:list):
+        """
+        Returns (stage profiles, model profiles) dataframes of experiment_ids
+        """
         try:
-            if os.path.exists(Pipeline.experiment_file_path):
-                df = pd.read_csv(Pipeline.experiment_file_path)
-                limit=-1*int(limit)
-                return df[limit:].drop(columns=["experiment_file_path","Initialization_timestamp"],axis=1)
-            else:
-                return pd.DataFrame()
+            experiment_store = Pipeline.get_experiment_store()
+            return (experiment_store.get_stage_profiles(experiment_ids=experiment_ids),
+                    experiment_store.get_model_profiles(experiment_ids=experiment_ids))
         except Exception as e:
-            raise HousingException(e,sys) from e
\ No newline at end of file
+            raise HousingException(e,sys) from e
+
+    @classmethod
+    def get_experiments_status(cls,limit:int=5,offset:int=0,status:str=None,min_accuracy:float=None,
+                               order_by:str="start_time")-> pd.DataFrame:
+        """
+        Returns one page of experiments, latest first
+        """
+        try:
+            return Pipeline.get_experiment_store().get_experiments(limit=limit,offset=offset,status=status,
+                                                                   min_accuracy=min_accuracy,order_by=order_by)
+        except Exception as e:
+            raise HousingException(e,sys) from e
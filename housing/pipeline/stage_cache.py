@@ -0,0 +1,71 @@
+import os,sys
+from housing.exception import HousingException
+from housing.logger import logging
+from housing.util.util import get_file_hash, read_yaml_file, write_yaml_file
+
+FILE_PATH_FIELD_SUFFIX = "_file_path"
+
+
+class StageCache:
+    """
+    Content addressed store of pipeline stage artifacts.
+    Each entry maps a fingerprint of a stage's inputs (upstream artifact file hashes,
+    config section and code version) to the artifact the stage produced for them.
+    """
+
+    def __init__(self,cache_dir:str):
+        try:
+            self.cache_dir = cache_dir
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_entry_file_path(self,stage_name:str,fingerprint:str)->str:
+        return os.path.join(self.cache_dir,stage_name,f"{fingerprint}.yaml")
+
+    @staticmethod
+    def get_artifact_file_paths(artifact)->dict:
+        return {field:value for field,value in artifact._asdict().items()
+                if field.endswith(FILE_PATH_FIELD_SUFFIX) and isinstance(value,str)}
+
+    @staticmethod
+    def get_artifact_file_hashes(artifact)->dict:
+        """
+        Returns sha256 of every existing file referenced by the artifact
+        """
+        try:
+            return {field:get_file_hash(file_path)
+                    for field,file_path in StageCache.get_artifact_file_paths(artifact).items()
+                    if os.path.isfile(file_path)}
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get(self,stage_name:str,fingerprint:str,artifact_cls):
+        """
+        Returns the cached artifact or None if there is no entry or its files are gone
+        """
+        try:
+            entry_file_path = self.get_entry_file_path(stage_name,fingerprint)
+            if not os.path.exists(entry_file_path):
+                return None
+            artifact_data = read_yaml_file(file_path=entry_file_path)
+            if artifact_data is None or set(artifact_data.keys()) != set(artifact_cls._fields):
+                return None
+            artifact = artifact_cls(**artifact_data)
+            missing_files = [file_path for file_path in StageCache.get_artifact_file_paths(artifact).values()
+                             if not os.path.exists(file_path)]
+            if len(missing_files) > 0:
+                logging.info(f"Stage cache entry [{entry_file_path}] is stale, missing files:{missing_files}")
+                return None
+            return artifact
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def put(self,stage_name:str,fingerprint:str,artifact):
+        try:
+            entry_file_path = self.get_entry_file_path(stage_name,fingerprint)
+            artifact_data = {field:(value.item() if hasattr(value,"item") else value)
+                             for field,value in artifact._asdict().items()}
+            write_yaml_file(file_path=entry_file_path,data=artifact_data)
+            logging.info(f"Stage [{stage_name}] artifact cached at [{entry_file_path}]")
+        except Exception as e:
+            raise HousingException(e,sys) from e
@@ -0,0 +1,129 @@
+import argparse
+import os,sys
+import time
+from housing.config.configuration import Configuartion
+from housing.constant import MODEL_REFERENCE_PROFILE_FILE_NAME, TRAFFIC_DRIFT_REPORT_FILE_NAME,\
+    TRAFFIC_DRIFT_REPORT_PAGE_FILE_NAME, get_current_time_stamp
+from housing.entity.data_drift import DataDriftDetector, DataDriftReport
+from housing.entity.data_sketch import DatasetSketch
+from housing.entity.housing_predictor import HousingPredictor
+from housing.entity.schema_validator import SchemaValidator
+from housing.entity.traffic_profiler import TrafficProfiler
+from housing.exception import HousingException
+from housing.logger import logging
+
+ROOT_DIR = os.getcwd()
+SAVED_MODELS_DIR_NAME = "saved_models"
+
+
+class TrafficDriftMonitor:
+    """
+    Compares the prediction traffic profiled by TrafficProfiler with the training data profile
+    exported next to the served model. Only sketches are read, never the traffic or training rows.
+    """
+
+    def __init__(self,model_dir:str,config:Configuartion=None):
+        try:
+            self.model_dir = model_dir
+            self.config = Configuartion() if config is None else config
+            self.prediction_config = self.config.get_prediction_config()
+            self.data_validation_config = self.config.get_data_validation_config()
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_reference_sketch(self)->DatasetSketch:
+        """
+        Train sketch of the latest exported model, None if the model has none
+        """
+        try:
+            model_path = HousingPredictor(model_dir=self.model_dir).get_latest_model_path()
+            reference_profile_file_path = os.path.join(os.path.dirname(model_path),MODEL_REFERENCE_PROFILE_FILE_NAME)
+            if not os.path.exists(reference_profile_file_path):
+                logging.info(f"Model [{model_path}] was exported without reference profile")
+                return None
+            return DatasetSketch.load(reference_profile_file_path)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_data_drift_detector(self)->DataDriftDetector:
+        try:
+            schema_validator = SchemaValidator.from_schema_file(self.prediction_config.schema_file_path)
+            return DataDriftDetector(numerical_columns=[column for column in schema_validator.input_columns
+                                                        if column in schema_validator.numerical_columns],
+                                     categorical_columns=[column for column in schema_validator.input_columns
+                                                          if column in schema_validator.categorical_columns],
+                                     p_value_threshold=self.data_validation_config.drift_p_value_threshold,
+                                     drift_share_threshold=self.data_validation_config.drift_share_threshold,
+                                     bins=self.data_validation_config.drift_histogram_bins)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def run(self,lookback_seconds:int=None)->DataDriftReport:
+        """
+        Compares the traffic of the windows started in the last lookback_seconds with the reference profile
+        and saves the report under traffic_drift_report_dir/<time stamp>.
+        return: DataDriftReport, None if there is no reference profile or no traffic
+        """
+        try:
+            lookback_seconds = self.prediction_config.traffic_drift_lookback_seconds \
+                if lookback_seconds is None else lookback_seconds
+            reference_sketch = self.get_reference_sketch()
+            if reference_sketch is None:
+                return None
+            traffic_sketch,window_starts = TrafficProfiler.load_traffic_sketch(
+                profile_dir=self.prediction_config.traffic_profile_dir,
+                start_time=time.time()-lookback_seconds)
+            if traffic_sketch is None or traffic_sketch.row_count == 0:
+                logging.info(f"No prediction traffic profiled in the last [{lookback_seconds}] seconds")
+                return None
+
+            report = self.get_data_drift_detector().get_data_drift_report(reference_sketch=reference_sketch,
+                                                                           current_sketch=traffic_sketch)
+            report_dir = os.path.join(self.prediction_config.traffic_drift_report_dir,get_current_time_stamp())
+            DataDriftDetector.save_report(report=report,
+                                          report_file_path=os.path.join(report_dir,TRAFFIC_DRIFT_REPORT_FILE_NAME))
+            DataDriftDetector.save_report_page(report=report,
+                                               report_page_file_path=os.path.join(
+                                                   report_dir,TRAFFIC_DRIFT_REPORT_PAGE_FILE_NAME))
+            logging.info(f"Traffic drift found:[{report.dataset_drift}] over [{len(window_starts)}] windows "
+                         f"and [{traffic_sketch.row_count}] rows, report saved in [{report_dir}]")
+            return report
+        except Exception as e:
+            raise HousingException(e,sys) from e
+    @staticmethod
+    def get_latest_report_file_path(report_dir:str)->str:
+        """
+        Report file of the latest run saved under report_dir, None if no report was saved yet
+        """
+        try:
+            if not os.path.isdir(report_dir):
+                return None
+            # report dirs are named by time stamp, which sorts chronologically
+            for report_dir_name in sorted(os.listdir(report_dir),reverse=True):
+                report_file_path = os.path.join(report_dir,report_dir_name,TRAFFIC_DRIFT_REPORT_FILE_NAME)
+                if os.path.exists(report_file_path):
+                    return report_file_path
+            return None
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="housing-traffic-drift",
+                                     description="Compare profiled prediction traffic with the training data profile")
+    parser.add_argument("--model-dir",default=os.path.join(ROOT_DIR,SAVED_MODELS_DIR_NAME),
+                        help="directory of the exported models")
+    parser.add_argument("--lookback-seconds",type=int,default=None,
+                        help="compare the traffic of the windows started within this many seconds")
+    args = parser.parse_args(argv)
+
+    report = TrafficDriftMonitor(model_dir=args.model_dir).run(lookback_seconds=args.lookback_seconds)
+    if report is None:
+        print("No reference profile or no profiled traffic to compare")
+    else:
+        print(f"Drift found:{report.dataset_drift}, drifted columns:"
+              f"{report.number_of_drifted_columns}/{report.number_of_columns}")
+
+
+if __name__=="__main__":
+    main()
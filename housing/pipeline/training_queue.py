@@ -0,0 +1,306 @@
+import os,sys
+import errno
+import fcntl
+import hashlib
+import sqlite3
+import uuid
+from collections import namedtuple
+from contextlib import closing
+from datetime import datetime
+from housing.exception import HousingException
+from housing.logger import logging
+
+QUEUED_JOB_STATUS = "queued"
+RUNNING_JOB_STATUS = "running"
+COMPLETED_JOB_STATUS = "completed"
+FAILED_JOB_STATUS = "failed"
+
+TrainingJob = namedtuple("TrainingJob", ["job_id", "dataset_key", "resume", "status", "enqueued_at",
+                                         "started_at", "finished_at", "worker_pid", "message"])
+
+SCHEMA_STATEMENTS = [
+    """CREATE TABLE IF NOT EXISTS training_jobs (
+        job_id TEXT PRIMARY KEY,
+        dataset_key TEXT NOT NULL,
+        resume INTEGER NOT NULL,
+        status TEXT NOT NULL,
+        enqueued_at TEXT NOT NULL,
+        started_at TEXT,
+        finished_at TEXT,
+        worker_pid INTEGER,
+        message TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS training_jobs_status_enqueued_at ON training_jobs (status, enqueued_at)",
+    "CREATE INDEX IF NOT EXISTS training_jobs_dataset_key_status ON training_jobs (dataset_key, status)",
+    """CREATE TABLE IF NOT EXISTS training_workers (
+        worker_pid INTEGER PRIMARY KEY,
+        started_at TEXT NOT NULL
+    )""",
+]
+
+
+def get_dataset_key(dataset_download_url:str)->str:
+    return hashlib.sha256(dataset_download_url.encode()).hexdigest()[:16]
+
+
+def is_process_alive(pid:int)->bool:
+    try:
+        os.kill(pid,0)
+    except OSError as e:
+        return e.errno == errno.EPERM
+    return True
+
+
+class DatasetLock:
+    """
+    Exclusive, non blocking flock on one file per dataset. The lock is held by the worker
+    process running the pipeline and released by the kernel if that process dies.
+    """
+
+    def __init__(self,lock_dir:str,dataset_key:str):
+        self.lock_file_path = os.path.join(lock_dir,f"{dataset_key}.lock")
+        self.lock_file = None
+
+    def acquire(self)->bool:
+        try:
+            os.makedirs(os.path.dirname(self.lock_file_path),exist_ok=True)
+            lock_file = open(self.lock_file_path,"a")
+            try:
+                fcntl.flock(lock_file.fileno(),fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                return False
+            self.lock_file = lock_file
+            return True
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def release(self):
+        if self.lock_file is not None:
+            fcntl.flock(self.lock_file.fileno(),fcntl.LOCK_UN)
+            self.lock_file.close()
+            self.lock_file = None
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self,exc_type,exc_value,traceback):
+        self.release()
+
+
+class TrainingJobQueue:
+    """
+    Durable queue of training pipeline runs in SQLite, shared by the web workers which
+    enqueue jobs and the training worker processes which claim and execute them.
+    """
+
+    def __init__(self,db_file_path:str):
+        try:
+            self.db_file_path = db_file_path
+            os.makedirs(os.path.dirname(db_file_path),exist_ok=True)
+            with closing(self.connect()) as connection:
+                connection.execute("PRAGMA journal_mode=WAL")
+                with connection:
+                    for statement in SCHEMA_STATEMENTS:
+                        connection.execute(statement)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def connect(self)->sqlite3.Connection:
+        # autocommit mode, transactions are opened explicitly with BEGIN IMMEDIATE
+        connection = sqlite3.connect(self.db_file_path,timeout=30,isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    @staticmethod
+    def to_job(row)->TrainingJob:
+        job = dict(row)
+        job["resume"] = bool(job["resume"])
+        return TrainingJob(**job)
+
+    @staticmethod
+    def has_live_worker(connection:sqlite3.Connection)->bool:
+        """
+        True if a registered worker process is alive, registrations of dead workers are removed
+        """
+        worker_pids = [row["worker_pid"] for row in connection.execute("SELECT worker_pid FROM training_workers")]
+        dead_worker_pids = [worker_pid for worker_pid in worker_pids if not is_process_alive(worker_pid)]
+        for worker_pid in dead_worker_pids:
+            connection.execute("DELETE FROM training_workers WHERE worker_pid = ?",(worker_pid,))
+        return len(dead_worker_pids) < len(worker_pids)
+
+    def enqueue(self,dataset_key:str,resume:bool=False):
+        """
+        Queues a pipeline run for dataset_key unless one is already queued or running.
+        A running job whose worker died is queued again in resume mode.
+        return: (job, needs_worker) where needs_worker is True if the job is new, was requeued
+        or is queued while no worker process is alive, i.e. the caller has to start a worker
+        """
+        try:
+            with closing(self.connect()) as connection:
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    row = connection.execute(
+                        """SELECT * FROM training_jobs WHERE dataset_key = ? AND status IN (?, ?)
+                        ORDER BY enqueued_at LIMIT 1""",
+                        (dataset_key,QUEUED_JOB_STATUS,RUNNING_JOB_STATUS)).fetchone()
+                    if row is not None:
+                        job = TrainingJobQueue.to_job(row)
+                        needs_worker = False
+                        if job.status == RUNNING_JOB_STATUS and \
+                                (job.worker_pid is None or not is_process_alive(job.worker_pid)):
+                            connection.execute(
+                                """UPDATE training_jobs SET status = ?, resume = 1, started_at = NULL,
+                                worker_pid = NULL WHERE job_id = ?""",(QUEUED_JOB_STATUS,job.job_id))
+                            logging.info(f"Requeued abandoned training job:[{job.job_id}]")
+                            job = job._replace(status=QUEUED_JOB_STATUS,resume=True,started_at=None,
+                                               worker_pid=None)
+                            needs_worker = True
+                        elif job.status == QUEUED_JOB_STATUS:
+                            needs_worker = not TrainingJobQueue.has_live_worker(connection)
+                        connection.execute("COMMIT")
+                        return job,needs_worker
+                    job = TrainingJob(job_id=str(uuid.uuid4()),dataset_key=dataset_key,resume=resume,
+                                      status=QUEUED_JOB_STATUS,enqueued_at=datetime.now().isoformat(sep=" "),
+                                      started_at=None,finished_at=None,worker_pid=None,message=None)
+                    connection.execute(
+                        """INSERT INTO training_jobs (job_id, dataset_key, resume, status, enqueued_at)
+                        VALUES (?, ?, ?, ?, ?)""",
+                        (job.job_id,job.dataset_key,int(job.resume),job.status,job.enqueued_at))
+                    connection.execute("COMMIT")
+                except Exception:
+                    connection.execute("ROLLBACK")
+                    raise
+            logging.info(f"Training job queued:{job}")
+            return job,True
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def register_worker(self,worker_pid:int):
+        try:
+            with closing(self.connect()) as connection:
+                connection.execute("INSERT OR REPLACE INTO training_workers (worker_pid, started_at) VALUES (?, ?)",
+                                   (worker_pid,datetime.now().isoformat(sep=" ")))
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def unregister_worker(self,worker_pid:int):
+        try:
+            with closing(self.connect()) as connection:
+                connection.execute("DELETE FROM training_workers WHERE worker_pid = ?",(worker_pid,))
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def has_queued_jobs(self)->bool:
+        try:
+            with closing(self.connect()) as connection:
+                return connection.execute("SELECT 1 FROM training_jobs WHERE status = ? LIMIT 1",
+                                          (QUEUED_JOB_STATUS,)).fetchone() is not None
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def claim_next(self,worker_pid:int,skip_dataset_keys:list=None)->TrainingJob:
+        """
+        Atomically marks the oldest queued job as running by worker_pid and returns it, or None
+        """
+        try:
+            skip_dataset_keys = list(skip_dataset_keys or [])
+            skip_clause = ""
+            if len(skip_dataset_keys) > 0:
+                skip_clause = f"AND dataset_key NOT IN ({', '.join('?'*len(skip_dataset_keys))})"
+            with closing(self.connect()) as connection:
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    row = connection.execute(
+                        f"""SELECT * FROM training_jobs WHERE status = ? {skip_clause}
+                        ORDER BY enqueued_at LIMIT 1""",
+                        [QUEUED_JOB_STATUS]+skip_dataset_keys).fetchone()
+                    if row is None:
+                        connection.execute("COMMIT")
+                        return None
+                    started_at = datetime.now().isoformat(sep=" ")
+                    connection.execute(
+                        "UPDATE training_jobs SET status = ?, started_at = ?, worker_pid = ? WHERE job_id = ?",
+                        (RUNNING_JOB_STATUS,started_at,worker_pid,row["job_id"]))
+                    connection.execute("COMMIT")
+                except Exception:
+                    connection.execute("ROLLBACK")
+                    raise
+            return TrainingJobQueue.to_job(row)._replace(status=RUNNING_JOB_STATUS,started_at=started_at,
+                                                         worker_pid=worker_pid)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def release(self,job_id:str):
+        """
+        Puts a claimed job back in the queue
+        """
+        try:
+            with closing(self.connect()) as connection:
+                connection.execute(
+                    """UPDATE training_jobs SET status = ?, started_at = NULL, worker_pid = NULL
+                    WHERE job_id = ?""",(QUEUED_JOB_STATUS,job_id))
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def finish(self,job_id:str,status:str,message:str=None):
+        try:
+            with closing(self.connect()) as connection:
+                connection.execute("UPDATE training_jobs SET status = ?, finished_at = ?, message = ? WHERE job_id = ?",
+                                   (status,datetime.now().isoformat(sep=" "),message,job_id))
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def requeue_abandoned_jobs(self)->int:
+        """
+        Jobs left running by a worker process which died are queued again in resume mode
+        """
+        try:
+            with closing(self.connect()) as connection:
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    rows = connection.execute("SELECT job_id, worker_pid FROM training_jobs WHERE status = ?",
+                                              (RUNNING_JOB_STATUS,)).fetchall()
+                    abandoned_job_ids = [row["job_id"] for row in rows
+                                         if row["worker_pid"] is None or not is_process_alive(row["worker_pid"])]
+                    for job_id in abandoned_job_ids:
+                        connection.execute(
+                            """UPDATE training_jobs SET status = ?, resume = 1, started_at = NULL,
+                            worker_pid = NULL WHERE job_id = ?""",(QUEUED_JOB_STATUS,job_id))
+                    connection.execute("COMMIT")
+                except Exception:
+                    connection.execute("ROLLBACK")
+                    raise
+            if len(abandoned_job_ids) > 0:
+                logging.info(f"Requeued abandoned training jobs:{abandoned_job_ids}")
+            return len(abandoned_job_ids)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_job(self,job_id:str)->TrainingJob:
+        try:
+            with closing(self.connect()) as connection:
+                row = connection.execute("SELECT * FROM training_jobs WHERE job_id = ?",(job_id,)).fetchone()
+            return None if row is None else TrainingJobQueue.to_job(row)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_active_job(self,dataset_key:str)->TrainingJob:
+        try:
+            with closing(self.connect()) as connection:
+                row = connection.execute(
+                    """SELECT * FROM training_jobs WHERE dataset_key = ? AND status IN (?, ?)
+                    ORDER BY enqueued_at LIMIT 1""",
+                    (dataset_key,QUEUED_JOB_STATUS,RUNNING_JOB_STATUS)).fetchone()
+            return None if row is None else TrainingJobQueue.to_job(row)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_jobs(self,limit:int=10,offset:int=0)->list:
+        try:
+            with closing(self.connect()) as connection:
+                rows = connection.execute("SELECT * FROM training_jobs ORDER BY enqueued_at DESC LIMIT ? OFFSET ?",
+                                          (int(limit),int(offset))).fetchall()
+            return [TrainingJobQueue.to_job(row) for row in rows]
+        except Exception as e:
+            raise HousingException(e,sys) from e
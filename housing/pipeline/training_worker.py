@@ -0,0 +1,144 @@
+import argparse
+import os,sys
+import subprocess
+import time
+from housing.config.configuration import Configuartion
+from housing.constant import EXPERIMENT_DIR_NAME, TRAINING_JOB_QUEUE_FILE_NAME, TRAINING_LOCK_DIR_NAME,\
+    DATA_INGESTION_CONFIG_KEY, DATA_INGESTION_DOWNLOAD_URL_KEY, get_current_time_stamp
+from housing.exception import HousingException
+from housing.logger import logging
+from housing.pipeline.pipeline import Pipeline
+from housing.pipeline.training_queue import TrainingJobQueue, TrainingJob, DatasetLock, get_dataset_key,\
+    COMPLETED_JOB_STATUS, FAILED_JOB_STATUS
+
+DEFAULT_POLL_INTERVAL_SECONDS = 5
+
+
+def get_training_job_queue(config:Configuartion=None)->TrainingJobQueue:
+    config = Configuartion() if config is None else config
+    return TrainingJobQueue(db_file_path=os.path.join(config.training_pipeline_config.artifact_dir,
+                                                      EXPERIMENT_DIR_NAME,TRAINING_JOB_QUEUE_FILE_NAME))
+
+
+def get_config_dataset_key(config:Configuartion=None)->str:
+    config = Configuartion() if config is None else config
+    return get_dataset_key(config.config_info[DATA_INGESTION_CONFIG_KEY][DATA_INGESTION_DOWNLOAD_URL_KEY])
+
+
+def spawn_training_worker()->int:
+    """
+    Starts a detached worker process which drains the queue and exits, returns its pid
+    """
+    try:
+        worker_process = subprocess.Popen([sys.executable,"-m","housing.pipeline.training_worker","--drain"],
+                                          stdin=subprocess.DEVNULL,stdout=subprocess.DEVNULL,
+                                          stderr=subprocess.DEVNULL,start_new_session=True)
+        logging.info(f"Training worker started with pid:[{worker_process.pid}]")
+        return worker_process.pid
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+class TrainingWorker:
+    """
+    Executes queued pipeline runs in this process, one at a time. A run only starts
+    while this worker holds the file lock of its dataset, so at most one run per dataset
+    executes across all worker processes.
+    """
+
+    def __init__(self,job_queue:TrainingJobQueue,lock_dir:str,
+                 poll_interval:float=DEFAULT_POLL_INTERVAL_SECONDS):
+        try:
+            self.job_queue = job_queue
+            self.lock_dir = lock_dir
+            self.poll_interval = poll_interval
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def execute_job(self,job:TrainingJob):
+        try:
+            logging.info(f"Executing training job:{job}")
+            pipeline = Pipeline(config=Configuartion(current_time_stamp=get_current_time_stamp()),
+                                resume=job.resume)
+            # run in this process' main thread, the worker itself is the isolation from the web tier
+            pipeline.run()
+            self.job_queue.finish(job_id=job.job_id,status=COMPLETED_JOB_STATUS,
+                                  message=Pipeline.experiment.experiment_id)
+        except Exception as e:
+            logging.exception(f"Training job [{job.job_id}] failed")
+            # the experiment of the job is stopped with it, else resume and the history page take it as running
+            Pipeline.fail_experiment(message=f"Training job [{job.job_id}] failed: {e}")
+            self.job_queue.finish(job_id=job.job_id,status=FAILED_JOB_STATUS,message=str(e))
+
+    def run_once(self)->bool:
+        """
+        Claims and executes one job whose dataset is not locked by another worker.
+        return: True if a job was executed
+        """
+        try:
+            locked_dataset_keys = []
+            while True:
+                job = self.job_queue.claim_next(worker_pid=os.getpid(),skip_dataset_keys=locked_dataset_keys)
+                if job is None:
+                    return False
+                dataset_lock = DatasetLock(lock_dir=self.lock_dir,dataset_key=job.dataset_key)
+                if not dataset_lock.acquire():
+                    logging.info(f"Dataset [{job.dataset_key}] is being trained by another worker")
+                    self.job_queue.release(job_id=job.job_id)
+                    locked_dataset_keys.append(job.dataset_key)
+                    continue
+                try:
+                    self.execute_job(job)
+                finally:
+                    dataset_lock.release()
+                return True
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def run(self,drain:bool=False):
+        """
+        drain: exit once no job can be started instead of polling forever
+        """
+        try:
+            # registered workers tell the web tier that queued jobs will be picked up
+            self.job_queue.register_worker(worker_pid=os.getpid())
+            try:
+                self.job_queue.requeue_abandoned_jobs()
+                while True:
+                    if self.run_once():
+                        continue
+                    if drain:
+                        self.job_queue.unregister_worker(worker_pid=os.getpid())
+                        # a job queued while this worker was exiting saw it alive and started no worker
+                        if not self.job_queue.has_queued_jobs():
+                            logging.info("Training queue drained, worker exiting")
+                            return
+                        self.job_queue.register_worker(worker_pid=os.getpid())
+                    time.sleep(self.poll_interval)
+            finally:
+                self.job_queue.unregister_worker(worker_pid=os.getpid())
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="housing-train-worker",
+                                     description="Execute queued housing training pipeline runs")
+    parser.add_argument("--drain",action="store_true",help="exit when the queue is empty")
+    parser.add_argument("--poll-interval",type=float,default=DEFAULT_POLL_INTERVAL_SECONDS,
+                        help="seconds between queue polls")
+    parser.add_argument("--enqueue",action="store_true",help="queue a run of the configured dataset first")
+    parser.add_argument("--resume",action="store_true",help="queue the run in resume mode")
+    args = parser.parse_args(argv)
+
+    config = Configuartion()
+    job_queue = get_training_job_queue(config)
+    if args.enqueue:
+        job,_ = job_queue.enqueue(dataset_key=get_config_dataset_key(config),resume=args.resume)
+        print(f"Training job {job.job_id} is {job.status}")
+    lock_dir = os.path.join(config.training_pipeline_config.artifact_dir,EXPERIMENT_DIR_NAME,TRAINING_LOCK_DIR_NAME)
+    TrainingWorker(job_queue=job_queue,lock_dir=lock_dir,poll_interval=args.poll_interval).run(drain=args.drain)
+
+
+if __name__=="__main__":
+    main()
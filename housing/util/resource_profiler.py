@@ -0,0 +1,199 @@
+import os,sys
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from housing.exception import HousingException
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+PROC_STATUS_FILE_PATH = "/proc/self/status"
+PROC_CLEAR_REFS_FILE_PATH = "/proc/self/clear_refs"
+PROC_IO_FILE_PATH = "/proc/self/io"
+# writing 5 to clear_refs resets the peak resident set size (VmHWM) of the process
+RESET_PEAK_RSS_COMMAND = "5"
+
+ResourceUsage = namedtuple("ResourceUsage", ["wall_time", "cpu_time", "peak_rss", "read_bytes", "write_bytes"])
+
+# wall_time and cpu_time in seconds, peak_rss, read_bytes and write_bytes in bytes,
+# children: profiles of nested work such as the models searched by ModelFactory
+ResourceProfile = namedtuple("ResourceProfile", ["name", "start_time", "stop_time", "wall_time", "cpu_time",
+                                                 "peak_rss", "rows_in", "rows_out", "read_bytes", "write_bytes",
+                                                 "children"])
+
+
+def get_peak_rss():
+    """
+    Peak resident set size of this process in bytes since the last reset_peak_rss, None if unknown
+    """
+    try:
+        with open(PROC_STATUS_FILE_PATH) as status_file:
+            for line in status_file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])*1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macOS
+    return max_rss if sys.platform == "darwin" else max_rss*1024
+
+
+def reset_peak_rss()->bool:
+    try:
+        with open(PROC_CLEAR_REFS_FILE_PATH,"w") as clear_refs_file:
+            clear_refs_file.write(RESET_PEAK_RSS_COMMAND)
+        return True
+    except OSError:
+        # without clear_refs the peak covers the whole process lifetime
+        return False
+
+
+def get_io_bytes():
+    """
+    Bytes passed through read and write calls of this process as (read_bytes, write_bytes),
+    memory mapped reads are not included. (None, None) where /proc is not available.
+    """
+    try:
+        io_counters = {}
+        with open(PROC_IO_FILE_PATH) as io_file:
+            for line in io_file:
+                name,value = line.split(":")
+                io_counters[name] = int(value)
+        return io_counters["rchar"],io_counters["wchar"]
+    except (OSError,KeyError,ValueError):
+        return None,None
+
+
+def get_difference(stop_value,start_value):
+    if stop_value is None or start_value is None:
+        return None
+    return stop_value-start_value
+
+
+def run_profiled(function,*args,**kwargs):
+    """
+    Calls function, typically inside a joblib worker, and measures it in that process
+    return: (function result, ResourceUsage)
+    """
+    reset_peak_rss()
+    start_wall_time = time.perf_counter()
+    start_cpu_time = time.process_time()
+    start_read_bytes,start_write_bytes = get_io_bytes()
+    result = function(*args,**kwargs)
+    stop_read_bytes,stop_write_bytes = get_io_bytes()
+    return result,ResourceUsage(wall_time=time.perf_counter()-start_wall_time,
+                                cpu_time=time.process_time()-start_cpu_time,
+                                peak_rss=get_peak_rss(),
+                                read_bytes=get_difference(stop_read_bytes,start_read_bytes),
+                                write_bytes=get_difference(stop_write_bytes,start_write_bytes))
+
+
+def add_resource_usage(usage:ResourceUsage,other_usage:ResourceUsage)->ResourceUsage:
+    """
+    Totals of two usages, peak_rss is the larger of both peaks
+    """
+    if usage is None:
+        return other_usage
+
+    def add(value,other_value):
+        return value if other_value is None else other_value if value is None else value+other_value
+
+    peak_rss = [value for value in [usage.peak_rss,other_usage.peak_rss] if value is not None]
+    return ResourceUsage(wall_time=add(usage.wall_time,other_usage.wall_time),
+                         cpu_time=add(usage.cpu_time,other_usage.cpu_time),
+                         peak_rss=max(peak_rss) if len(peak_rss) > 0 else None,
+                         read_bytes=add(usage.read_bytes,other_usage.read_bytes),
+                         write_bytes=add(usage.write_bytes,other_usage.write_bytes))
+
+
+class ResourceProfiler:
+    """
+    Context manager measuring wall time, cpu time, peak rss and bytes read/written by this process
+    while a block runs. Profilers nest per thread: a profiler opened inside another one, or a profile
+    passed to add_child_profile, is reported as a child of the enclosing profiler.
+    cpu time covers every thread of the process but not joblib worker processes, whose work
+    is measured with run_profiled and reported as child profiles.
+    """
+    local = threading.local()
+
+    def __init__(self,name:str,rows_in:int=None,rows_out:int=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = rows_out
+        self.children = []
+        self.profile:ResourceProfile = None
+        self.peak_rss = None
+
+    @classmethod
+    def get_stack(cls)->list:
+        if not hasattr(ResourceProfiler.local,"stack"):
+            ResourceProfiler.local.stack = []
+        return ResourceProfiler.local.stack
+
+    @classmethod
+    def get_active_profiler(cls):
+        stack = ResourceProfiler.get_stack()
+        return stack[-1] if len(stack) > 0 else None
+
+    @classmethod
+    def add_child_profile(cls,profile:ResourceProfile):
+        """
+        Reports profile as child of the active profiler of this thread, does nothing without one
+        """
+        active_profiler = ResourceProfiler.get_active_profiler()
+        if active_profiler is not None:
+            active_profiler.children.append(profile)
+
+    def observe_peak_rss(self,peak_rss=None):
+        peak_rss = get_peak_rss() if peak_rss is None else peak_rss
+        if peak_rss is not None:
+            self.peak_rss = peak_rss if self.peak_rss is None else max(self.peak_rss,peak_rss)
+
+    def set_rows(self,rows_in:int=None,rows_out:int=None):
+        if rows_in is not None:
+            self.rows_in = rows_in
+        if rows_out is not None:
+            self.rows_out = rows_out
+
+    def __enter__(self):
+        try:
+            # the peak so far belongs to the enclosing profiler, it is lost once the peak is reset
+            for profiler in ResourceProfiler.get_stack():
+                profiler.observe_peak_rss()
+            ResourceProfiler.get_stack().append(self)
+            reset_peak_rss()
+            self.start_time = datetime.now()
+            self.start_wall_time = time.perf_counter()
+            self.start_cpu_time = time.process_time()
+            self.start_read_bytes,self.start_write_bytes = get_io_bytes()
+            return self
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def __exit__(self,exc_type,exc_value,traceback):
+        try:
+            stop_read_bytes,stop_write_bytes = get_io_bytes()
+            self.observe_peak_rss()
+            stack = ResourceProfiler.get_stack()
+            stack.remove(self)
+            self.profile = ResourceProfile(name=self.name,
+                                           start_time=self.start_time,
+                                           stop_time=datetime.now(),
+                                           wall_time=time.perf_counter()-self.start_wall_time,
+                                           cpu_time=time.process_time()-self.start_cpu_time,
+                                           peak_rss=self.peak_rss,
+                                           rows_in=self.rows_in,
+                                           rows_out=self.rows_out,
+                                           read_bytes=get_difference(stop_read_bytes,self.start_read_bytes),
+                                           write_bytes=get_difference(stop_write_bytes,self.start_write_bytes),
+                                           children=self.children)
+            if len(stack) > 0:
+                stack[-1].observe_peak_rss(self.peak_rss)
+                stack[-1].children.append(self.profile)
+        except Exception as e:
+            raise HousingException(e,sys) from e
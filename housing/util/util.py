@@ -1,6 +1,9 @@
 import yaml
 from housing.exception import HousingException
 import os,sys
+import hashlib
+import inspect
+import json
 import numpy as np
 import dill
 import pandas as pd
@@ -49,13 +52,41 @@ def save_numpy_array_data(file_path: str, array: np.array):
     except Exception as e:
         raise HousingException(e, sys) from e
 
-def load_numpy_array_data(file_path: str) -> np.array:
+def save_numpy_arrays(file_path: str, **arrays):
+    """
+    Save several named numpy arrays into one .npz file
+    file_path: str location of file to save
+    arrays: name=np.array pairs to save
+    """
+    try:
+        dir_path = os.path.dirname(file_path)
+        os.makedirs(dir_path, exist_ok=True)
+        with open(file_path, 'wb') as file_obj:
+            np.savez(file_obj, **arrays)
+    except Exception as e:
+        raise HousingException(e, sys) from e
+
+def load_numpy_arrays(file_path: str) -> dict:
+    """
+    load named numpy arrays saved by save_numpy_arrays
+    return: dict of name to np.array
+    """
+    try:
+        with np.load(file_path, allow_pickle=False) as npz_file:
+            return {name: npz_file[name] for name in npz_file.files}
+    except Exception as e:
+        raise HousingException(e, sys) from e
+
+def load_numpy_array_data(file_path: str, mmap_mode: str = None) -> np.array:
     """
     load numpy array data from file
     file_path: str location of file to load
+    mmap_mode: None to read the array into memory, "r" to memory-map it read only
     return: np.array data loaded
     """
     try:
+        if mmap_mode is not None:
+            return np.load(file_path, mmap_mode=mmap_mode)
         with open(file_path, 'rb') as file_obj:
             return np.load(file_obj)
     except Exception as e:
@@ -85,24 +116,225 @@ def load_object(file_path:str):
     except Exception as e:
         raise HousingException(e,sys) from e
 
+def get_dataframe_file_format(file_path:str)->str:
+    """
+    Returns the dataframe file format (csv, parquet or feather) from the file extension
+    """
+    file_format = os.path.splitext(file_path)[1].lstrip(".").lower()
+    if file_format not in DATAFRAME_FILE_FORMATS:
+        raise Exception(f"Unsupported dataframe file format:[{file_format}] of file:[{file_path}]")
+    return file_format
+
+
+def read_dataframe(file_path:str,columns:list=None)->pd.DataFrame:
+    """
+    Reads a csv, parquet or feather file as pandas dataframe
+    file_path: str location of file
+    columns: list of columns to read, all columns if None
+    """
+    try:
+        file_format = get_dataframe_file_format(file_path)
+        if file_format == PARQUET_FILE_FORMAT:
+            return pd.read_parquet(file_path,columns=columns)
+        if file_format == FEATHER_FILE_FORMAT:
+            return pd.read_feather(file_path,columns=columns)
+        return pd.read_csv(file_path,usecols=columns)
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+def read_dataframe_chunks(file_path:str,chunk_size:int,columns:list=None):
+    """
+    Yields a csv, parquet or feather file as pandas dataframes of at most chunk_size rows,
+    indexed by row position in the file
+    """
+    try:
+        file_format = get_dataframe_file_format(file_path)
+        if file_format == CSV_FILE_FORMAT:
+            for dataframe in pd.read_csv(file_path,usecols=columns,chunksize=chunk_size):
+                yield dataframe
+            return
+        import pyarrow as pa
+        if file_format == PARQUET_FILE_FORMAT:
+            import pyarrow.parquet as pq
+            record_batches = pq.ParquetFile(file_path).iter_batches(batch_size=chunk_size,columns=columns)
+        else:
+            reader = pa.ipc.open_file(pa.memory_map(file_path,"r"))
+            record_batches = (record_batch.select(columns) if columns is not None else record_batch
+                              for batch_index in range(reader.num_record_batches)
+                              for record_batch in pa.Table.from_batches([reader.get_batch(batch_index)])
+                              .to_batches(max_chunksize=chunk_size))
+        row_offset = 0
+        for record_batch in record_batches:
+            dataframe = record_batch.to_pandas()
+            dataframe.index = pd.RangeIndex(row_offset,row_offset+len(dataframe))
+            row_offset += len(dataframe)
+            yield dataframe
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+def save_dataframe(file_path:str,dataframe:pd.DataFrame):
+    """
+    Saves pandas dataframe as csv, parquet or feather file based on the file extension
+    """
+    try:
+        file_format = get_dataframe_file_format(file_path)
+        os.makedirs(os.path.dirname(file_path),exist_ok=True)
+        if file_format == PARQUET_FILE_FORMAT:
+            dataframe.to_parquet(file_path,index=False)
+        elif file_format == FEATHER_FILE_FORMAT:
+            dataframe.reset_index(drop=True).to_feather(file_path)
+        else:
+            dataframe.to_csv(file_path,index=False)
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+def cast_dataframe_to_schema(dataframe:pd.DataFrame,schema_columns:dict)->pd.DataFrame:
+    """
+    Casts columns of dataframe to the dtypes of schema.yaml columns section
+    """
+    try:
+        for column in dataframe.columns:
+            if column in schema_columns and dataframe[column].dtype != schema_columns[column]:
+                dataframe[column] = dataframe[column].astype(schema_columns[column])
+        return dataframe
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+class DataFrameChunkWriter:
+    """
+    Appends dataframe chunks to a csv or parquet file without holding previous chunks in memory.
+    With schema_columns every chunk is cast to the schema dtypes first, so a chunked file has the
+    same dtypes, categorical columns included, as the whole dataframe saved at once.
+    """
+
+    def __init__(self,file_path:str,schema_columns:dict=None):
+        try:
+            self.file_path = file_path
+            self.schema_columns = schema_columns
+            file_format = get_dataframe_file_format(file_path)
+            if file_format == FEATHER_FILE_FORMAT:
+                raise Exception(f"Chunked writing is not supported for [{file_path}], use csv or parquet")
+            self.is_parquet = file_format == PARQUET_FILE_FORMAT
+            self.parquet_writer = None
+            self.is_header_written = False
+            dir_path = os.path.dirname(file_path)
+            if dir_path:
+                os.makedirs(dir_path,exist_ok=True)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def write(self,dataframe:pd.DataFrame):
+        try:
+            if self.schema_columns is not None:
+                dataframe = cast_dataframe_to_schema(dataframe.copy(),self.schema_columns)
+            if self.is_parquet:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(dataframe,preserve_index=False)
+                if self.parquet_writer is None:
+                    self.parquet_writer = pq.ParquetWriter(self.file_path,table.schema)
+                elif not table.schema.equals(self.parquet_writer.schema,check_metadata=False):
+                    # categories are inferred per chunk, e.g. a chunk without any value of a
+                    # categorical column gets a null typed dictionary
+                    table = table.cast(self.parquet_writer.schema)
+                self.parquet_writer.write_table(table)
+            else:
+                dataframe.to_csv(self.file_path,index=False,header=not self.is_header_written,
+                                 mode="a" if self.is_header_written else "w")
+                self.is_header_written = True
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def close(self):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+            self.parquet_writer = None
+
+
 def load_data(file_path:str, schema_file_path:str)-> pd.DataFrame:
     try:
         dataset_schema=read_yaml_file(schema_file_path)
             
         schema = dataset_schema[DATASET_SCHEMA_COLUMNS_KEY]
 
-        dataframe = pd.read_csv(file_path)
+        dataframe = read_dataframe(file_path)
 
         error_message = ""
 
         for column in dataframe.columns:
-            if column in list(schema.keys()):
-                dataframe[column].astype(schema[column])
-            else:
+            if column not in list(schema.keys()):
                 error_message =f"{error_message} \nColumn:[{column}] is not in the schema."
         if len(error_message)>0:
             raise  Exception(error_message)
-        return dataframe
+        return cast_dataframe_to_schema(dataframe,schema)
+
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+def get_file_hash(file_path:str,chunk_size:int=1024*1024)->str:
+    """
+    Returns sha256 hex digest of file content
+    file_path: str location of file
+    """
+    try:
+        file_hash = hashlib.sha256()
+        with open(file_path,"rb") as file_obj:
+            for chunk in iter(lambda: file_obj.read(chunk_size),b""):
+                file_hash.update(chunk)
+        return file_hash.hexdigest()
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+def get_fingerprint(data)->str:
+    """
+    Returns sha256 hex digest of any json serializable data, independent of dict ordering
+    """
+    try:
+        serialized_data = json.dumps(data,sort_keys=True,default=str)
+        return hashlib.sha256(serialized_data.encode("utf-8")).hexdigest()
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
 
+def get_code_version(*objs)->str:
+    """
+    Returns a fingerprint of the source files defining the given modules/classes/functions
+    """
+    try:
+        return get_fingerprint([get_file_hash(inspect.getsourcefile(obj)) for obj in objs])
     except Exception as e:
-        raise HousingException(e,sys) from e    
\ No newline at end of file
+        raise HousingException(e,sys) from e
+
+
+def get_row_count(file_path:str)->int:
+    """
+    Returns the number of rows of a numpy array, csv, parquet or feather file without loading it.
+    Csv rows are counted as lines after the header, so quoted fields must not span lines.
+    """
+    try:
+        if file_path.endswith(".npy"):
+            return int(np.load(file_path,mmap_mode="r").shape[0])
+        file_format = get_dataframe_file_format(file_path)
+        if file_format == PARQUET_FILE_FORMAT:
+            import pyarrow.parquet as pq
+            return pq.read_metadata(file_path).num_rows
+        if file_format == FEATHER_FILE_FORMAT:
+            import pyarrow.feather as feather
+            return feather.read_table(file_path,columns=[0],memory_map=True).num_rows
+        line_count = 0
+        last_chunk = b""
+        with open(file_path,"rb") as file_obj:
+            for chunk in iter(lambda: file_obj.read(1024*1024),b""):
+                line_count += chunk.count(b"\n")
+                last_chunk = chunk
+        if len(last_chunk) > 0 and not last_chunk.endswith(b"\n"):
+            line_count += 1
+        return max(line_count-1,0)
+    except Exception as e:
+        raise HousingException(e,sys) from e
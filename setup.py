@@ -25,5 +25,12 @@ setup(
     author=AUTHOR,
     description=DESCRIPTION,
     packages=find_packages(),
-    install_requires=get_requirements_list()
+    install_requires=get_requirements_list(),
+    entry_points={
+        "console_scripts":[
+            "housing-score=housing.pipeline.batch_scoring:main",
+            "housing-train-worker=housing.pipeline.training_worker:main",
+            "housing-traffic-drift=housing.pipeline.traffic_drift:main",
+        ]
+    }
 )
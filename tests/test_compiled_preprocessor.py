@@ -0,0 +1,89 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from housing.component.data_transformation import CompiledPreprocessor, DataTransformation
+from housing.entity.artifact_entity import DataValidationArtifact
+from housing.entity.config_entity import DataTransformationConfig
+
+SCHEMA_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "schema.yaml")
+
+
+def get_housing_dataframe(rows:list)->pd.DataFrame:
+    columns = ["longitude", "latitude", "housing_median_age", "total_rooms", "total_bedrooms",
+               "population", "households", "median_income", "ocean_proximity"]
+    return pd.DataFrame(rows, columns=columns)
+
+
+TRAIN_ROWS = [
+    [-122.23, 37.88, 41.0, 880.0, 129.0, 322.0, 126.0, 8.3252, "NEAR BAY"],
+    [-122.22, 37.86, 21.0, 7099.0, 1106.0, 2401.0, 1138.0, 8.3014, "NEAR BAY"],
+    [-118.30, 34.26, 43.0, 1510.0, np.nan, 1246.0, 346.0, 2.7083, "<1H OCEAN"],
+    [-117.03, 32.71, 33.0, 3126.0, 627.0, 2300.0, 623.0, 3.2596, "NEAR OCEAN"],
+    [-121.89, 39.76, 15.0, 10265.0, 1860.0, 4591.0, 1906.0, 3.0700, "INLAND"],
+    [-119.78, 36.81, 52.0, 1485.0, 323.0, 796.0, 313.0, 1.9118, "INLAND"],
+    [-118.37, 33.93, 46.0, 442.0, 88.0, 255.0, 86.0, 4.9063, "<1H OCEAN"],
+    [-117.16, 32.72, 52.0, 1048.0, 332.0, 706.0, 308.0, 2.1458, "NEAR OCEAN"],
+]
+
+
+@pytest.fixture(scope="module")
+def preprocessing_obj():
+    data_transformation = DataTransformation(
+        data_transformation_config=DataTransformationConfig(add_bedroom_per_room=True,
+                                                            transformed_train_dir=None,
+                                                            transformed_test_dir=None,
+                                                            preprocessed_object_file_path=None,
+                                                            compiled_preprocessed_object_file_path=None,
+                                                            preprocessor_cache_dir=None),
+        data_ingestion_artifact=None,
+        data_validation_artifact=DataValidationArtifact(schema_file_path=SCHEMA_FILE_PATH,
+                                                        report_file_path=None,
+                                                        report_page_file_path=None,
+                                                        train_sketch_file_path=None,
+                                                        test_sketch_file_path=None,
+                                                        is_validated=True,
+                                                        message=None))
+    preprocessing_obj = data_transformation.get_data_transformer_object()
+    preprocessing_obj.fit(get_housing_dataframe(TRAIN_ROWS))
+    return preprocessing_obj
+
+
+@pytest.fixture(scope="module")
+def compiled_preprocessing_obj(preprocessing_obj):
+    return CompiledPreprocessor.compile(preprocessing_obj)
+
+
+def assert_same_output(preprocessing_obj, compiled_preprocessing_obj, dataframe:pd.DataFrame):
+    expected = DataTransformation.get_contiguous_array(preprocessing_obj.transform(dataframe))
+    actual = compiled_preprocessing_obj.transform(dataframe)
+    assert actual.shape == expected.shape
+    assert np.allclose(actual, expected, equal_nan=True)
+
+
+def test_multi_row_frame(preprocessing_obj, compiled_preprocessing_obj):
+    assert_same_output(preprocessing_obj, compiled_preprocessing_obj, get_housing_dataframe(TRAIN_ROWS))
+
+
+def test_single_row(preprocessing_obj, compiled_preprocessing_obj):
+    assert_same_output(preprocessing_obj, compiled_preprocessing_obj, get_housing_dataframe(TRAIN_ROWS[3:4]))
+
+
+def test_missing_total_bedrooms(preprocessing_obj, compiled_preprocessing_obj):
+    rows = [row.copy() for row in TRAIN_ROWS[:3]]
+    for row in rows:
+        row[4] = np.nan
+    assert_same_output(preprocessing_obj, compiled_preprocessing_obj, get_housing_dataframe(rows))
+
+
+def test_unseen_ocean_proximity(preprocessing_obj, compiled_preprocessing_obj):
+    # the encoder rejects unknown categories, both paths have to refuse the row alike
+    row = TRAIN_ROWS[0].copy()
+    row[8] = "ISLAND"
+    dataframe = get_housing_dataframe([row])
+    with pytest.raises(ValueError):
+        preprocessing_obj.transform(dataframe)
+    with pytest.raises(Exception, match="unknown categories"):
+        compiled_preprocessing_obj.transform(dataframe)